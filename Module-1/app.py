@@ -4,6 +4,7 @@ import logging
 import warnings
 import json
 import uuid
+import atexit
 from pathlib import Path
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
@@ -38,29 +39,98 @@ conversation = ConversationChain(llm=llm, memory=memory, return_final_only=False
 # Добавим системное сообщение в контекст с указанием инфомрации из FAQ и ORDERS
 faq_path = Path("data/faq.json")
 orders_path = Path("data/orders.json")
-if faq_path.exists():
-    with open(faq_path, "r") as f:
-        faq_data = json.load(f)
-if orders_path.exists():
-    with open(orders_path, "r") as f:
-        orders_data = json.load(f)
+faq_data, orders_data = [], {}
+# mtime файлов, из которых загружены текущие данные
+data_mtimes = {}
+
+def load_changed_data():
+    """Перечитывает faq.json и orders.json, если они изменились с прошлой загрузки. Возвращает True при изменении"""
+    global faq_data, orders_data
+    changed = False
+    for path in (faq_path, orders_path):
+        if not path.exists():
+            continue
+        mtime = path.stat().st_mtime_ns
+        if data_mtimes.get(path) == mtime:
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            # Файл мог быть записан не до конца — остаёмся на прежних данных и проверим на следующей реплике
+            logging.warning(f"Failed to reload {path}: {e}")
+            continue
+        # Новые данные подменяют прежние целиком, частично обновлённый словарь никто не видит
+        if path == faq_path:
+            faq_data = data
+        else:
+            orders_data = data
+        data_mtimes[path] = mtime
+        changed = True
+    return changed
+
+load_changed_data()
 
 def get_order_status(order_id):
     """Получает статус заказа по ID из orders.json"""
-    order_info = orders_data.get(order_id, "Заказ с номером {order_id} не найден. Пожалуйста, проверьте правильность номера заказа.")
+    order_info = orders_data.get(order_id, f"Заказ с номером {order_id} не найден. Пожалуйста, проверьте правильность номера заказа.")
     return order_info
 
+# Ответы, полностью определённые данными, формируем по шаблонам без вызова модели
+ORDER_TEMPLATES = {
+    "in_transit": "Заказ {order_id} в пути, его везёт {carrier}. Ожидаемый срок доставки — {eta_days} дн.",
+    "delivered": "Заказ {order_id} доставлен {delivered_at}.",
+    "processing": "Заказ {order_id} в обработке. {note}.",
+}
+
+def normalize_question(text):
+    """Нормализует вопрос для точного сравнения с FAQ: регистр, ё → е, пробелы, финальная пунктуация"""
+    return " ".join(text.lower().replace("ё", "е").split()).rstrip("?!. ")
+
+def build_faq_answers():
+    return {normalize_question(item["q"]): item["a"] for item in faq_data}
+
+faq_answers = build_faq_answers()
+
+def fast_reply(user_input):
+    """Ответ на /order <id> или точный вопрос из FAQ без вызова модели, иначе None"""
+    if user_input.startswith('/order '):
+        order_id = user_input[7:].strip()
+        order_info = orders_data.get(order_id)
+        if order_info is None:
+            return get_order_status(order_id)
+        fields = {k: v.rstrip(".") if isinstance(v, str) else v for k, v in order_info.items()}
+        try:
+            return ORDER_TEMPLATES[order_info.get("status")].format(order_id=order_id, **fields)
+        except KeyError:
+            return f"Текущий статус заказа {order_id}: {order_info.get('status', 'неизвестен')}."
+    return faq_answers.get(normalize_question(user_input))
+
+# Файл сессии открываем один раз и закрываем при выходе, а не на каждую реплику
+session_log = open(f"logs/session_{session_id}.jsonl", "a", encoding="utf-8")
+atexit.register(session_log.close)
+
 def save_session(user_input, bot_reply, total_tokens):
     """Сохраняет сессию в файл"""
-    with open(f"logs/session_{session_id}.jsonl", "a") as f:
-        json.dump({"dialog": f"User: {user_input}\nBot: {bot_reply}", "usage": total_tokens}, f, ensure_ascii=False)
-        f.write("\n")  # Добавляем перенос строки после каждой записи
+    record = json.dumps({"dialog": f"User: {user_input}\nBot: {bot_reply}", "usage": total_tokens}, ensure_ascii=False)
+    session_log.write(record + "\n")  # Добавляем перенос строки после каждой записи
+    session_log.flush()
+
+
+base_system_message = "Ты — полезный и лаконичный ассистент сервиса доставки и заказа. Ты помогаешь пользователю отвечать на вопросы. Ты отвечаешь только на вопросы о заказах, доставке и сообщениях из истории диалога. Для ответов на вопросы используй информацию из FAQ и ORDERS. Если ответ на вопрос пользователя есть в истории диалога, то ответь его. Если информации нет, ничего не придумыай сам, ответь вежливо что не можешь помочь.\nПользователи могут использовать команду /order <номер_заказа> для получения актуальной информации о статусе своих заказов.\n\n"
 
+def build_system_message():
+    return SystemMessage(content=base_system_message + f"FAQ: {faq_data}\nи ORDERS: {orders_data}")
 
-system_message = "Ты — полезный и лаконичный ассистент сервиса доставки и заказа. Ты помогаешь пользователю отвечать на вопросы. Ты отвечаешь только на вопросы о заказах, доставке и сообщениях из истории диалога. Для ответов на вопросы используй информацию из FAQ и ORDERS. Если ответ на вопрос пользователя есть в истории диалога, то ответь его. Если информации нет, ничего не придумыай сам, ответь вежливо что не можешь помочь.\nПользователи могут использовать команду /order <номер_заказа> для получения актуальной информации о статусе своих заказов.\n\n"
+conversation.memory.chat_memory.add_message(build_system_message())
 
-system_message =system_message + f"FAQ: {faq_data}\nи ORDERS: {orders_data}"
-conversation.memory.chat_memory.add_message(SystemMessage(content=system_message))
+def refresh_data():
+    """Применяет изменения faq.json и orders.json к быстрым ответам и системному сообщению без перезапуска"""
+    global faq_answers
+    if load_changed_data():
+        faq_answers = build_faq_answers()
+        conversation.memory.chat_memory.messages[0] = build_system_message()
+        logging.info("FAQ and orders reloaded")
 
 print("Чат-бот запущен! Можете задавать вопросы. Для выхода введите 'выход'.\n")
 
@@ -78,15 +148,23 @@ while True:
     if user_input == "":
         continue  # пустой ввод - пропускаем
     
+    # Подхватываем свежие статусы заказов и FAQ (проверка mtime, файлы читаются только при изменении)
+    refresh_data()
+    
     # Проверка команды /order <id>
-    if user_input.startswith('/order '):
-        order_id = user_input[7:].strip()  # убираем '/order ' и пробелы
-        if order_id:
-            order_status = get_order_status(order_id)
-            user_input = f"Пользователь интересуется статусом заказа {order_id}. Подготовь ответ на вопрос пользователя используя информацию по статусу заказа: {order_status}"
-        else:
-            print("Бот: Пожалуйста, укажите номер заказа после команды /order")
-            continue
+    if user_input.startswith('/order ') and not user_input[7:].strip():
+        print("Бот: Пожалуйста, укажите номер заказа после команды /order")
+        continue
+
+    # Статус заказа и точные вопросы из FAQ отвечаем по шаблону, модель не вызываем
+    bot_reply = fast_reply(user_input)
+    if bot_reply is not None:
+        logging.info(f"User: {user_input}")
+        logging.info(f"Bot (fast path): {bot_reply}")
+        print(f"Бот: {bot_reply}")
+        conversation.memory.save_context({"input": user_input}, {"response": bot_reply})
+        save_session(user_input, bot_reply, 0)
+        continue
     
     # Проверка команды выхода
     if user_input.lower() in ("выход", "quit", "exit"):
@@ -1,7 +1,6 @@
-import os
-import openai
 import logging
 import warnings
+import threading
 import json
 import uuid
 from pathlib import Path
@@ -12,9 +11,8 @@ from src.brand_chain import ChatBot
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
 # 1. Инициализация: загрузка переменных, настройка логов, создание бота
+# Ключ и OPENAI_API_BASE ChatOpenAI читает из окружения сам, модуль openai здесь не импортируем
 load_dotenv()  # загружаем .env, чтобы получить ключи
-openai.api_key = os.getenv("OPENAI_API_KEY")
-openai.api_base = os.getenv("OPENAI_API_BASE")
 
 # Настраиваем логирование в файл
 logs_dir = Path("logs")
@@ -29,6 +27,15 @@ chatbot = ChatBot()
 
 print("Чат-бот запущен! Можете задавать вопросы. Для выхода введите 'выход'.\n")
 
+def warmup():
+    """Создаёт клиент модели (и импортирует langchain_openai) в фоне, пока пользователь набирает вопрос"""
+    try:
+        chatbot.llm
+    except Exception as e:
+        logging.warning(f"LLM warmup failed: {e}")
+
+threading.Thread(target=warmup, name="llm-warmup", daemon=True).start()
+
 # 2. Главный цикл диалога
 while True:
     try:
@@ -53,10 +60,25 @@ while True:
     logging.info(f"User: {user_input}")
     # Генерация ответа с обработкой ошибок
     try:
-        # Используем метод chat из класса ChatBot
-        bot_reply, total_tokens = chatbot.chat(user_input)
-        logging.info(f"Bot: {bot_reply.answer}")
-        print(f"Бот: {bot_reply.answer}")
+        # Печатаем ответ по мере генерации, итоговый BotResponse доступен после окончания потока
+        stream = chatbot.chat_stream(user_input)
+        printed = False
+        try:
+            for delta in stream:
+                # Префикс печатается с первым фрагментом, чтобы ошибка до него не оставила пустое "Бот: "
+                if not printed:
+                    print("Бот: ", end="", flush=True)
+                    printed = True
+                print(delta, end="", flush=True)
+        finally:
+            if printed:
+                print()
+        bot_reply, total_tokens = stream.reply, stream.total_tokens
+        if not printed:
+            print(f"Бот: {bot_reply.answer}")
+        # Без фрагментов (пустой ответ) времени до первого фрагмента нет
+        ttft = f"{stream.ttft:.3f}s" if stream.ttft is not None else "n/a"
+        logging.info(f"Bot: {bot_reply.answer}. TTFT: {ttft}")
         chatbot.save_session(user_input, bot_reply, total_tokens)
     except Exception as e:
         # Логируем и выводим ошибку, продолжаем чат
@@ -0,0 +1,103 @@
+"""
+Бенчмарк объединения одинаковых запросов: всплеск новых сессий, которые одновременно задают
+несколько одинаковых вопросов (как во время инцидента с доставкой), с объединением и без него.
+Измеряются число вызовов модели, доля объединённых шагов, токены и задержка шага.
+
+Запуск:
+    uv run python -m benchmarks.coalesce --sessions 500 --questions 3 --waves 5
+"""
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import statistics
+from pathlib import Path
+
+from src.brand_chain import ChatBot
+from src.fake_llm import FakeChatModel
+from src.sessions import SessionManager
+from src.session_store import MemorySessionStore
+from src.telemetry import Telemetry
+
+BASE = Path(__file__).parent.parent
+REPORTS = BASE / "reports"
+QUESTIONS = (BASE / "data" / "eval_prompts.txt").read_text(encoding="utf-8").strip().splitlines()
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def run(coalesce: bool, args) -> dict:
+    llm = FakeChatModel(latency=args.latency, distribution="lognormal", seed=args.seed)
+    telemetry = Telemetry()
+    # Без маршрутизатора и кэша: каждый шаг, который не объединён, идёт в модель
+    bot = ChatBot(llm=llm, telemetry=telemetry, fast_path=False, coalesce=coalesce,
+                  session_store=MemorySessionStore())
+    manager = SessionManager(bot, max_sessions=args.sessions * args.waves)
+    rng = random.Random(args.seed)
+    questions = QUESTIONS[:args.questions]
+    latencies, tokens = [], 0
+
+    async def ask(session_id: str, question: str):
+        nonlocal tokens
+        # Сессии приходят в пределах --spread секунд
+        await asyncio.sleep(rng.uniform(0, args.spread))
+        start = time.perf_counter()
+        _, used = await manager.achat(session_id, question)
+        latencies.append(time.perf_counter() - start)
+        tokens += used
+
+    async def main():
+        for wave in range(args.waves):
+            await asyncio.gather(*(ask(f"w{wave}-s{i}", questions[i % len(questions)])
+                                   for i in range(args.sessions)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    turns = args.sessions * args.waves
+    stats = bot.single_flight.stats() if bot.single_flight is not None else None
+    return {
+        "turns": turns,
+        "elapsed_s": round(elapsed, 3),
+        "llm_calls": llm.calls,
+        "coalesced": stats["followers"] if stats else 0,
+        "collapsed_rate": stats["collapsed_rate"] if stats else 0.0,
+        "tokens": tokens,
+        "latency_ms_p50": round(percentile(latencies, 0.5) * 1000, 2),
+        "latency_ms_p99": round(percentile(latencies, 0.99) * 1000, 2),
+        "latency_ms_mean": round(statistics.mean(latencies) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк объединения одинаковых одновременных запросов")
+    parser.add_argument("--sessions", type=int, default=500, help="Новых сессий в одной волне")
+    parser.add_argument("--questions", type=int, default=3, help="Сколько разных вопросов задают сессии")
+    parser.add_argument("--waves", type=int, default=5, help="Сколько волн подряд")
+    parser.add_argument("--spread", type=float, default=0.05, help="За сколько секунд приходит волна")
+    parser.add_argument("--latency", type=float, default=0.3, help="Средняя задержка модели-заглушки, с")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генераторов задержек и прихода сессий")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    result = {
+        "sessions_per_wave": args.sessions,
+        "questions": args.questions,
+        "waves": args.waves,
+        "llm_latency_s": args.latency,
+        "runs": {"without_coalescing": run(False, args), "with_coalescing": run(True, args)},
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    REPORTS.mkdir(exist_ok=True)
+    out = REPORTS / "bench_coalesce.json"
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print("Отчёт:", out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Бенчмарк: полный FAQ в системном промпте против top-k записей из BM25-индекса.
+
+Запуск:
+    uv run python -m benchmarks.faq_retrieval --size 5000 --top-k 3
+"""
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+from src.retrieval import BM25Index, load_faq_index, format_faq
+from src.tokens import count_tokens
+
+BASE = Path(__file__).parent.parent
+REPORTS = BASE / "reports"
+
+CATEGORIES = ["электроника", "одежда", "обувь", "книги", "игрушки", "мебель", "косметика",
+              "продукты", "спорттовары", "зоотовары", "бытовая техника", "посуда"]
+TOPICS = [
+    ("Как оформить возврат товара", "Возврат оформляется в личном кабинете в течение {d} дней."),
+    ("Сколько идёт доставка", "Стандартная доставка {d} рабочих дней, экспресс — 24–48 часов."),
+    ("Какие способы оплаты доступны", "Карты, СБП и подарочные сертификаты, рассрочка на {d} месяцев."),
+    ("Как изменить адрес доставки", "Адрес можно изменить, пока заказ не отгружен, срок — {d} часов."),
+    ("Как применить промокод", "Промокод вводится в корзине, действует {d} дней."),
+    ("Можно ли ускорить доставку", "Экспресс-доставка доступна в {d} городах."),
+    ("Что делать с бракованным товаром", "Сообщите в чат в течение {d} дней и приложите фото."),
+    ("Где пункт самовывоза", "Пункты самовывоза работают с 9 до {d} часов."),
+]
+
+
+def synthetic_faq(size: int, seed: int = 42) -> list:
+    """Генерирует FAQ заданного размера на основе типовых тем"""
+    rnd = random.Random(seed)
+    faq = json.loads((BASE / "data" / "faq.json").read_text(encoding="utf-8"))
+    while len(faq) < size:
+        q, a = rnd.choice(TOPICS)
+        category = rnd.choice(CATEGORIES)
+        faq.append({"q": f"{q} в категории «{category}» (тема {len(faq)})?",
+                    "a": a.format(d=rnd.randint(2, 30))})
+    return faq[:size]
+
+
+def run(size: int, top_k: int, repeats: int) -> dict:
+    faq = synthetic_faq(size)
+    queries = (BASE / "data" / "eval_prompts.txt").read_text(encoding="utf-8").strip().splitlines()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        faq_path = Path(tmp) / "faq.json"
+        faq_path.write_text(json.dumps(faq, ensure_ascii=False), encoding="utf-8")
+
+        start = time.perf_counter()
+        load_faq_index(faq_path)  # строит и сохраняет индекс
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = load_faq_index(faq_path)  # читает сохранённый индекс
+        load_s = time.perf_counter() - start
+
+    # Так FAQ попадал бы в промпт при полной подстановке {faq}
+    full_dump_tokens = count_tokens(str(faq))
+
+    retrieval_ms, topk_tokens = [], []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            entries = [doc for doc, _ in index.search(query, top_k)]
+            retrieval_ms.append((time.perf_counter() - start) * 1000)
+            topk_tokens.append(count_tokens(format_faq(entries)))
+
+    start = time.perf_counter()
+    BM25Index(faq)
+    rebuild_s = time.perf_counter() - start
+
+    return {
+        "faq_size": size,
+        "top_k": top_k,
+        "full_dump_prompt_tokens": full_dump_tokens,
+        "topk_prompt_tokens_mean": round(statistics.mean(topk_tokens), 1),
+        "token_reduction_x": round(full_dump_tokens / max(statistics.mean(topk_tokens), 1), 1),
+        "retrieval_ms_p50": round(statistics.median(retrieval_ms), 3),
+        "retrieval_ms_max": round(max(retrieval_ms), 3),
+        "index_build_and_save_s": round(build_s, 3),
+        "index_load_s": round(load_s, 3),
+        "index_build_in_memory_s": round(rebuild_s, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=5000, help="Количество записей FAQ")
+    parser.add_argument("--top-k", type=int, default=3, help="Сколько записей добавлять в промпт")
+    parser.add_argument("--repeats", type=int, default=20, help="Повторы прогона запросов")
+    args = parser.parse_args()
+
+    result = run(args.size, args.top_k, args.repeats)
+    for key, value in result.items():
+        print(f"{key}: {value}")
+    REPORTS.mkdir(exist_ok=True)
+    out = REPORTS / "bench_faq_retrieval.json"
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print("Отчёт:", out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Бенчмарк холодного старта: время импорта src.brand_chain и style_eval по `python -X importtime`
+и время запуска app.py до приглашения ввода. Результат сравнивается с бюджетом
+из benchmarks/importtime_budget.json; при превышении скрипт завершается с кодом 1.
+
+Запуск:
+    uv run python -m benchmarks.importtime --repeat 5
+    uv run python -m benchmarks.importtime --update-budget   # записать текущие значения ×1.5 в бюджет
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+BASE = Path(__file__).parent.parent
+REPORTS = BASE / "reports"
+BUDGET_PATH = Path(__file__).parent / "importtime_budget.json"
+
+# Что замеряем: имя -> аргументы интерпретатора и stdin
+TARGETS = {
+    "src.brand_chain": (["-c", "import src.brand_chain"], None),
+    "style_eval": (["-c", "import style_eval"], None),
+    # Полный старт CLI: импорт, создание ChatBot, приглашение ввода и выход по команде
+    "app": ([str(BASE / "app.py")], "выход\n"),
+}
+
+
+def parse_importtime(stderr: str, top: int = 5) -> dict:
+    """Суммарное время импорта верхнего уровня и самые тяжёлые модули из вывода -X importtime"""
+    total_us, modules = 0, []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        # Модуль верхнего уровня: вложенные импорты выводятся с дополнительным отступом
+        if not name.startswith("   "):
+            total_us += int(cumulative_us)
+            modules.append((int(cumulative_us), name.strip()))
+    modules.sort(reverse=True)
+    return {"import_ms": round(total_us / 1000, 1), "heaviest": [f"{name}: {us / 1000:.1f} ms" for us, name in modules[:top]]}
+
+
+def measure(name: str, repeat: int) -> dict:
+    args, stdin = TARGETS[name]
+    env = {**os.environ, "PYTHONPATH": str(BASE)}
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            proc = subprocess.run([sys.executable, "-X", "importtime", *args], input=stdin, env=env,
+                                  cwd=tmp if name == "app" else BASE, capture_output=True, text=True)
+            wall_ms = (time.perf_counter() - start) * 1000
+            if proc.returncode != 0:
+                raise RuntimeError(f"{name} завершился с кодом {proc.returncode}:\n{proc.stderr[-2000:]}")
+            runs.append((parse_importtime(proc.stderr), wall_ms))
+    # Первый прогон прогревает кэш байткода и файловой системы, берём медиану остальных
+    measured = runs[1:] or runs
+    return {
+        "import_ms": round(statistics.median(r["import_ms"] for r, _ in measured), 1),
+        "wall_ms": round(statistics.median(w for _, w in measured), 1),
+        "heaviest": measured[-1][0]["heaviest"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк времени холодного старта")
+    parser.add_argument("--repeat", type=int, default=5, help="Запусков на цель")
+    parser.add_argument("--update-budget", action="store_true", help="Записать текущие значения ×1.5 как бюджет")
+    args = parser.parse_args()
+
+    result = {name: measure(name, args.repeat) for name in TARGETS}
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    REPORTS.mkdir(exist_ok=True)
+    (REPORTS / "bench_importtime.json").write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.update_budget:
+        budget = {name: {"import_ms": round(r["import_ms"] * 1.5), "wall_ms": round(r["wall_ms"] * 1.5)}
+                  for name, r in result.items()}
+        BUDGET_PATH.write_text(json.dumps(budget, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print("Бюджет обновлён:", BUDGET_PATH)
+        return
+
+    budget = json.loads(BUDGET_PATH.read_text(encoding="utf-8"))
+    over = [f"{name}.{metric}: {result[name][metric]} > {limit}"
+            for name, limits in budget.items() if name in result
+            for metric, limit in limits.items() if result[name][metric] > limit]
+    if over:
+        print("Превышен бюджет холодного старта:\n  " + "\n  ".join(over))
+        sys.exit(1)
+    print("Бюджет холодного старта соблюдён")
+
+
+if __name__ == "__main__":
+    main()
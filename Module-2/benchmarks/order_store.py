@@ -0,0 +1,120 @@
+"""
+Бенчмарк хранилищ заказов: время открытия, задержка поиска по номеру и RSS процесса.
+
+Каждый бэкенд измеряется в отдельном процессе, чтобы RSS не смешивался.
+
+Запуск:
+    uv run python -m benchmarks.order_store --orders 1000000
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import subprocess
+import statistics
+from pathlib import Path
+
+from src.order_store import open_order_store, import_json_orders
+
+BASE = Path(__file__).parent.parent
+REPORTS = BASE / "reports"
+STATUSES = [
+    {"status": "in_transit", "eta_days": 2, "carrier": "ShoplyExpress"},
+    {"status": "delivered", "delivered_at": "2025-08-10"},
+    {"status": "processing", "note": "Ожидает комплектации на складе"},
+]
+
+
+def current_rss_mb() -> float:
+    """Текущий RSS процесса в МБ (Linux), иначе пиковый RSS"""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_orders_json(path: Path, count: int):
+    """Пишет orders.json с заданным количеством заказов"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{\n")
+        for i in range(count):
+            sep = ",\n" if i < count - 1 else "\n"
+            f.write(f'  "{10_000_000 + i}": {json.dumps(STATUSES[i % 3], ensure_ascii=False)}{sep}')
+        f.write("}\n")
+
+
+def worker(path: Path, count: int, lookups: int) -> dict:
+    """Открывает хранилище и измеряет задержку поиска (выполняется в дочернем процессе)"""
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    store = open_order_store(path)
+    open_s = time.perf_counter() - start
+    rss_after_open = current_rss_mb()
+
+    rnd = random.Random(0)
+    latencies = []
+    for _ in range(lookups):
+        order_id = str(10_000_000 + rnd.randrange(count))
+        start = time.perf_counter()
+        assert store.get(order_id) is not None
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    store.close()
+    return {
+        "open_s": round(open_s, 3),
+        "rss_open_delta_mb": round(rss_after_open - rss_before, 1),
+        "rss_total_mb": round(current_rss_mb(), 1),
+        "lookup_us_p50": round(latencies[len(latencies) // 2], 2),
+        "lookup_us_p99": round(latencies[int(len(latencies) * 0.99)], 2),
+        "lookup_us_mean": round(statistics.mean(latencies), 2),
+    }
+
+
+def run_in_subprocess(path: Path, count: int, lookups: int) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.order_store", "--worker", str(path),
+         "--orders", str(count), "--lookups", str(lookups)],
+        cwd=BASE, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк хранилищ заказов")
+    parser.add_argument("--orders", type=int, default=1_000_000, help="Количество заказов")
+    parser.add_argument("--lookups", type=int, default=100_000, help="Количество поисков по номеру")
+    parser.add_argument("--worker", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.orders, args.lookups)))
+        return
+
+    result = {"orders": args.orders, "lookups": args.lookups}
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = Path(tmp) / "orders.json"
+        db_path = Path(tmp) / "orders.sqlite"
+        write_orders_json(json_path, args.orders)
+
+        start = time.perf_counter()
+        import_json_orders(json_path, db_path)
+        result["sqlite_import_s"] = round(time.perf_counter() - start, 2)
+
+        result["json"] = run_in_subprocess(json_path, args.orders, args.lookups)
+        result["sqlite"] = run_in_subprocess(db_path, args.orders, args.lookups)
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    REPORTS.mkdir(exist_ok=True)
+    out = REPORTS / "bench_order_store.json"
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print("Отчёт:", out)
+
+
+if __name__ == "__main__":
+    main()
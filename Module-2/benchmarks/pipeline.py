@@ -0,0 +1,168 @@
+"""
+Набор бенчмарков конвейера чат-бота на локальной модели-заглушке: задержка по этапам ChatBot.chat,
+шагов в секунду, рост памяти на длинной сессии и пропускная способность style_eval.
+
+Запуск:
+    uv run python -m benchmarks.pipeline --latency 0.05 --turns 200
+    uv run python -m benchmarks.pipeline --baseline reports/bench_pipeline_prev.json
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+from pathlib import Path
+
+BASE = Path(__file__).parent.parent
+REPORTS = BASE / "reports"
+QUESTIONS = (BASE / "data" / "eval_prompts.txt").read_text(encoding="utf-8").strip().splitlines()
+
+# Модель-заглушка подключается там же, где создается ChatOpenAI (create_llm)
+os.environ["LLM_BACKEND"] = "fake"
+
+from src.brand_chain import ChatBot  # noqa: E402
+from src.fake_llm import FakeChatModel  # noqa: E402
+from src.session_log import SessionLogSink  # noqa: E402
+
+
+def stats_ms(values: list) -> dict:
+    values = sorted(values)
+    return {
+        "mean": round(statistics.mean(values) * 1000, 3),
+        "p50": round(values[len(values) // 2] * 1000, 3),
+        "p99": round(values[min(len(values) - 1, int(len(values) * 0.99))] * 1000, 3),
+    }
+
+
+def bench_stages(llm: FakeChatModel, sink: SessionLogSink, turns: int) -> dict:
+    """Задержка каждого этапа шага диалога"""
+    # Без маршрутизатора и объединения запросов: каждый шаг доходит до промпта и модели
+    bot = ChatBot(llm=llm, log_sink=sink, fast_path=False, coalesce=False,
+                  persist_sessions=False)
+    stages = {name: [] for name in ("prepare", "llm", "parse", "memory", "log", "total")}
+    for i in range(turns):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        t0 = time.perf_counter()
+        turn = bot._prepare_turn(question)
+        t1 = time.perf_counter()
+        if turn.prompt is None:
+            # Ответ без модели (кэш, fallback при превышении бюджета промпта) — не шаг конвейера
+            continue
+        response = bot.llm_with_so.invoke(turn.prompt)
+        t2 = time.perf_counter()
+        bot._accept_response(turn, response, t2 - t1)
+        t3 = time.perf_counter()
+        bot._complete_turn(turn)
+        t4 = time.perf_counter()
+        bot.save_session(question, turn.reply, turn.total_tokens)
+        t5 = time.perf_counter()
+        for name, value in zip(stages, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t5 - t0)):
+            stages[name].append(value)
+    return {name: stats_ms(values) for name, values in stages.items() if values}
+
+
+def bench_throughput(llm: FakeChatModel, sink: SessionLogSink, turns: int) -> dict:
+    """Шагов диалога в секунду через ChatBot.chat"""
+    bot = ChatBot(llm=llm, log_sink=sink, fast_path=False, coalesce=False,
+                  persist_sessions=False)
+    start = time.perf_counter()
+    for i in range(turns):
+        bot.chat(QUESTIONS[i % len(QUESTIONS)])
+    elapsed = time.perf_counter() - start
+    return {"turns": turns, "turns_per_s": round(turns / elapsed, 1)}
+
+
+def bench_memory_growth(sink: SessionLogSink, turns: int, samples: int = 10) -> dict:
+    """Рост памяти процесса и токенов истории на длинной сессии без задержки модели"""
+    bot = ChatBot(llm=FakeChatModel(latency=0), log_sink=sink, fast_path=False, coalesce=False,
+                  persist_sessions=False)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    points = []
+    step = max(1, turns // samples)
+    for i in range(1, turns + 1):
+        bot.chat(QUESTIONS[i % len(QUESTIONS)])
+        if i % step == 0:
+            current = tracemalloc.get_traced_memory()[0]
+            points.append({
+                "turn": i,
+                "traced_kb": round((current - base) / 1024, 1),
+                "history_tokens": bot.memory.last_stats.history_tokens,
+            })
+    tracemalloc.stop()
+    return {"turns": turns, "points": points}
+
+
+def bench_eval(latency: float, prompts: int, workers: int) -> dict:
+    """Пропускная способность style_eval.eval_batch"""
+    os.environ["FAKE_LLM_LATENCY"] = str(latency)
+    import style_eval
+    items = [QUESTIONS[i % len(QUESTIONS)] for i in range(prompts)]
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        style_eval.eval_batch(items, workers=workers, report_path=Path(tmp) / "style_eval.json", store_path=None)
+        elapsed = time.perf_counter() - start
+    return {"prompts": prompts, "workers": workers, "items_per_s": round(prompts / elapsed, 2)}
+
+
+def flatten(data: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(current: dict, baseline: dict):
+    """Печатает относительное изменение числовых метрик относительно прошлого прогона"""
+    old, new = flatten(baseline), flatten(current)
+    print("\nСравнение с базовым прогоном:")
+    for key in sorted(new.keys() & old.keys()):
+        if old[key]:
+            change = (new[key] - old[key]) / abs(old[key]) * 100
+            print(f"  {key}: {old[key]} -> {new[key]} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки конвейера чат-бота")
+    parser.add_argument("--latency", type=float, default=0.05, help="Средняя задержка модели-заглушки, с")
+    parser.add_argument("--distribution", default="lognormal", help="Распределение задержки модели")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора задержек")
+    parser.add_argument("--turns", type=int, default=200, help="Шагов для замера этапов и пропускной способности")
+    parser.add_argument("--long-session", type=int, default=2000, help="Шагов в длинной сессии для замера памяти")
+    parser.add_argument("--eval-prompts", type=int, default=100, help="Промптов для замера style_eval")
+    parser.add_argument("--eval-workers", type=int, default=8, help="Потоков style_eval")
+    parser.add_argument("--output", type=Path, default=REPORTS / "bench_pipeline.json", help="Куда сохранить результат")
+    parser.add_argument("--baseline", type=Path, help="Результат прошлого прогона для сравнения")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = SessionLogSink(Path(tmp))
+        llm = FakeChatModel(latency=args.latency, distribution=args.distribution, seed=args.seed)
+        result = {
+            "config": {"latency_s": args.latency, "distribution": args.distribution, "seed": args.seed},
+            "stages_ms": bench_stages(llm, sink, args.turns),
+            "throughput": bench_throughput(llm, sink, args.turns),
+            "overhead_throughput": bench_throughput(FakeChatModel(latency=0), sink, args.turns),
+            "memory_growth": bench_memory_growth(sink, args.long_session),
+            "eval": bench_eval(args.latency, args.eval_prompts, args.eval_workers),
+        }
+        sink.close()
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print("Отчёт:", args.output)
+    if args.baseline:
+        compare(result, json.loads(args.baseline.read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
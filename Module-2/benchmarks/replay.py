@@ -0,0 +1,225 @@
+"""
+Нагрузочный прогон записанного трафика: шаги пользователей из логов сессий (logs/session_*.jsonl)
+или из файла промптов воспроизводятся конкурентными сессиями ChatBot на модели-заглушке.
+
+Воркер моделируется отдельным SessionManager с ограниченным числом одновременно
+обрабатываемых шагов (--slots); сессия закреплена за воркером по хэшу session_id.
+Задержка шага включает ожидание свободного слота, поэтому перегрузку видно по p99.
+
+Режимы нагрузки:
+    closed — --users виртуальных пользователей проигрывают сессии одну за другой с паузой --think
+    open   — сессии приходят пуассоновским потоком с интенсивностью --rate сессий в секунду
+
+Запуск:
+    uv run python -m benchmarks.replay --source logs --mode closed --users 200 --workers 1,2,4
+    uv run python -m benchmarks.replay --source data/eval_prompts.txt --mode open --rate 50 --sessions 2000
+"""
+import json
+import time
+import zlib
+import random
+import asyncio
+import logging
+import argparse
+import statistics
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from src.brand_chain import ChatBot
+from src.fake_llm import FakeChatModel, LATENCY_DISTRIBUTIONS
+from src.sessions import SessionManager
+from src.session_store import MemorySessionStore, iter_session_logs, read_session_files
+
+BASE = Path(__file__).parent.parent
+REPORTS = BASE / "reports"
+
+MODES = ("closed", "open")
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def load_traffic(source: Path) -> List[Tuple[str, List[str]]]:
+    """
+    Читает записанный трафик
+
+    Args:
+        source (Path): Каталог с session_*.jsonl, отдельный файл сессии .jsonl
+                       или текстовый файл (каждая строка — сессия из одного шага)
+
+    Returns:
+        List[Tuple[str, List[str]]]: Пары (session_id, вводы пользователя по порядку)
+    """
+    if source.is_dir():
+        sessions = []
+        for session_id, paths in iter_session_logs(source):
+            turns, _ = read_session_files(paths)
+            if turns:
+                sessions.append((session_id, [turn["user_input"] for turn in turns]))
+        return sessions
+    if source.suffix == ".jsonl":
+        turns, _ = read_session_files([source])
+        return [(source.stem, [turn["user_input"] for turn in turns])] if turns else []
+    lines = [line.strip() for line in source.read_text(encoding="utf-8").splitlines()]
+    return [(f"line{i}", [line]) for i, line in enumerate(lines) if line]
+
+
+@dataclass
+class ReplayStats:
+    """Результаты шагов одного прогона"""
+    latencies: List[float] = field(default_factory=list)
+    queue_waits: List[float] = field(default_factory=list)
+    errors: Dict[str, int] = field(default_factory=dict)
+    tokens: int = 0
+    turns: int = 0
+
+
+class Worker:
+    """Воркер: свои сессии и не более slots шагов одновременно"""
+
+    def __init__(self, bot: ChatBot, slots: int, max_sessions: int):
+        self.manager = SessionManager(bot, max_sessions=max_sessions)
+        self.slots = asyncio.Semaphore(slots)
+
+
+async def play_session(workers: List[Worker], session_id: str, turns: List[str], think: float,
+                       stats: ReplayStats, rng: random.Random):
+    """Проигрывает шаги одной сессии на закреплённом за ней воркере"""
+    worker = workers[zlib.crc32(session_id.encode("utf-8")) % len(workers)]
+    for i, user_input in enumerate(turns):
+        if i and think > 0:
+            await asyncio.sleep(rng.expovariate(1 / think))
+        start = time.perf_counter()
+        async with worker.slots:
+            acquired = time.perf_counter()
+            try:
+                _, tokens = await worker.manager.achat(session_id, user_input)
+                stats.tokens += tokens
+                # Ответ-заглушка вместо ответа модели — тоже ошибка шага. peek не создаёт заново
+                # уже вытесненную сессию: иначе fork и чтение истории попали бы в замер
+                bot = worker.manager.peek(session_id)
+                if bot is not None and bot.last_route == "fallback":
+                    stats.errors["fallback"] = stats.errors.get("fallback", 0) + 1
+            except Exception as e:
+                name = type(e).__name__
+                stats.errors[name] = stats.errors.get(name, 0) + 1
+        stats.queue_waits.append(acquired - start)
+        stats.latencies.append(time.perf_counter() - start)
+        stats.turns += 1
+    worker.manager.close(session_id)
+
+
+def schedule(traffic: List[Tuple[str, List[str]]], sessions: int) -> List[Tuple[str, List[str]]]:
+    """Повторяет записанные сессии по кругу до нужного количества, с уникальными session_id"""
+    return [(f"{traffic[i % len(traffic)][0]}-{i}", traffic[i % len(traffic)][1]) for i in range(sessions)]
+
+
+async def run_closed(workers: List[Worker], plan: list, users: int, think: float, stats: ReplayStats, seed: int):
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    async def user(i: int):
+        rng = random.Random(seed + i)
+        while not queue.empty():
+            session_id, turns = queue.get_nowait()
+            await play_session(workers, session_id, turns, think, stats, rng)
+
+    await asyncio.gather(*(user(i) for i in range(users)))
+
+
+async def run_open(workers: List[Worker], plan: list, rate: float, think: float, stats: ReplayStats, seed: int):
+    rng = random.Random(seed)
+    tasks = []
+    for session_id, turns in plan:
+        tasks.append(asyncio.create_task(play_session(workers, session_id, turns, think, stats, random.Random(rng.random()))))
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+
+
+def replay(plan: list, args, workers_count: int) -> dict:
+    """Один прогон плана сессий на workers_count воркерах"""
+    llms = [FakeChatModel(latency=args.latency, distribution=args.distribution, seed=args.seed + i)
+            for i in range(workers_count)]
+    stats = ReplayStats()
+
+    async def main():
+        workers = [Worker(ChatBot(llm=llm, session_store=MemorySessionStore()), args.slots, len(plan)) for llm in llms]
+        if args.mode == "closed":
+            await run_closed(workers, plan, args.users, args.think, stats, args.seed)
+        else:
+            await run_open(workers, plan, args.rate, args.think, stats, args.seed)
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    latencies = stats.latencies or [0.0]
+    return {
+        "workers": workers_count,
+        "sessions": len(plan),
+        "turns": stats.turns,
+        "elapsed_s": round(elapsed, 3),
+        "turns_per_s": round(stats.turns / elapsed, 1),
+        "sessions_per_s": round(len(plan) / elapsed, 1),
+        "latency_ms_mean": round(statistics.mean(latencies) * 1000, 2),
+        "latency_ms_p50": round(percentile(latencies, 0.5) * 1000, 2),
+        "latency_ms_p95": round(percentile(latencies, 0.95) * 1000, 2),
+        "latency_ms_p99": round(percentile(latencies, 0.99) * 1000, 2),
+        "queue_wait_ms_p99": round(percentile(stats.queue_waits or [0.0], 0.99) * 1000, 2),
+        "llm_calls": sum(llm.calls for llm in llms),
+        "errors": stats.errors,
+        "error_rate": round(sum(stats.errors.values()) / max(stats.turns, 1), 4),
+        "tokens": stats.tokens,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон записанного трафика")
+    parser.add_argument("--source", type=Path, default=BASE / "logs",
+                        help="Каталог логов сессий, файл сессии .jsonl или файл промптов .txt")
+    parser.add_argument("--mode", choices=MODES, default="closed", help="Замкнутая или открытая модель нагрузки")
+    parser.add_argument("--sessions", type=int, default=None, help="Сколько сессий проиграть. По умолчанию все записанные")
+    parser.add_argument("--users", type=int, default=100, help="Виртуальных пользователей (closed)")
+    parser.add_argument("--rate", type=float, default=20.0, help="Новых сессий в секунду (open)")
+    parser.add_argument("--think", type=float, default=0.0, help="Средняя пауза пользователя между шагами, с")
+    parser.add_argument("--workers", default="1", help="Число воркеров или список через запятую для сравнения")
+    parser.add_argument("--slots", type=int, default=32, help="Одновременно обрабатываемых шагов на воркер")
+    parser.add_argument("--latency", type=float, default=0.3, help="Средняя задержка модели-заглушки, с")
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal",
+                        help="Распределение задержки модели-заглушки")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генераторов задержек и прихода сессий")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    source = args.source
+    if not source.exists() or (source.is_dir() and not any(source.glob("session_*.jsonl*"))):
+        # Логов ещё нет — проигрываем набор промптов оценки
+        source = BASE / "data" / "eval_prompts.txt"
+        print(f"Логи сессий не найдены в {args.source}, используется {source}")
+    traffic = load_traffic(source)
+    if not traffic:
+        raise SystemExit(f"В {source} нет шагов для воспроизведения")
+    plan = schedule(traffic, args.sessions or len(traffic))
+
+    runs = [replay(plan, args, int(count)) for count in args.workers.split(",")]
+    result = {
+        "source": str(source),
+        "mode": args.mode,
+        "users": args.users if args.mode == "closed" else None,
+        "rate": args.rate if args.mode == "open" else None,
+        "slots_per_worker": args.slots,
+        "llm_latency_s": args.latency,
+        "runs": runs,
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    REPORTS.mkdir(exist_ok=True)
+    out = REPORTS / "bench_replay.json"
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print("Отчёт:", out)
+
+
+if __name__ == "__main__":
+    main()
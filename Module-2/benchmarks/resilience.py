@@ -0,0 +1,93 @@
+"""
+Бенчмарк устойчивости вызова модели: поток вопросов к модели-заглушке с внедрёнными сбоями
+и медленным хвостом задержки при разных CallPolicy. Измеряются доля ответов-заглушек,
+которые видит пользователь, p50/p99 задержки шага и число вызовов модели.
+
+Запуск:
+    uv run python -m benchmarks.resilience --turns 300 --error-rate 0.1 --slow-rate 0.05
+"""
+import json
+import time
+import logging
+import argparse
+import statistics
+from pathlib import Path
+
+from src.brand_chain import ChatBot
+from src.fake_llm import FakeChatModel
+from src.resilience import CallPolicy
+from src.session_store import MemorySessionStore
+from src.telemetry import Telemetry
+
+BASE = Path(__file__).parent.parent
+REPORTS = BASE / "reports"
+QUESTIONS = (BASE / "data" / "eval_prompts.txt").read_text(encoding="utf-8").strip().splitlines()
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def policies(latency: float) -> dict:
+    return {
+        "single_attempt": CallPolicy(max_attempts=1),
+        "retries": CallPolicy(max_attempts=3, backoff_base=latency),
+        "retries_hedged": CallPolicy(max_attempts=3, backoff_base=latency, hedge_quantile=0.9,
+                                     hedge_after=latency * 3, hedge_min_samples=20),
+    }
+
+
+def run(policy: CallPolicy, args) -> dict:
+    llm = FakeChatModel(latency=args.latency, distribution="lognormal", seed=args.seed,
+                        error_rate=args.error_rate, slow_rate=args.slow_rate, slow_factor=args.slow_factor)
+    telemetry = Telemetry()
+    # Без маршрутизатора: каждый шаг идёт в модель
+    bot = ChatBot(llm=llm, telemetry=telemetry, fast_path=False, llm_policy=policy,
+                  session_store=MemorySessionStore())
+    latencies = []
+    for i in range(args.turns):
+        session = bot.fork()
+        start = time.perf_counter()
+        session.chat(QUESTIONS[i % len(QUESTIONS)])
+        latencies.append(time.perf_counter() - start)
+    counters = telemetry.summary()["counters"]
+    fallbacks = sum(v for k, v in counters.items() if k.startswith("fallbacks"))
+    return {
+        "fallback_rate": round(fallbacks / args.turns, 4),
+        "latency_ms_p50": round(percentile(latencies, 0.5) * 1000, 2),
+        "latency_ms_p99": round(percentile(latencies, 0.99) * 1000, 2),
+        "latency_ms_mean": round(statistics.mean(latencies) * 1000, 2),
+        "llm_calls": llm.calls + llm.failures,
+        "retries": sum(v for k, v in counters.items() if k.startswith("llm_retries")),
+        "hedges": sum(v for k, v in counters.items() if k.startswith("llm_hedges{")),
+        "breaker_state": bot.llm_caller.breaker.state,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк повторов, дублирования и автомата отключения")
+    parser.add_argument("--turns", type=int, default=300, help="Шагов диалога на политику")
+    parser.add_argument("--latency", type=float, default=0.02, help="Средняя задержка модели-заглушки, с")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="Доля вызовов со сбоем")
+    parser.add_argument("--slow-rate", type=float, default=0.05, help="Доля медленных вызовов")
+    parser.add_argument("--slow-factor", type=float, default=20.0, help="Во сколько раз медленнее медленный вызов")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора задержек и сбоев")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    result = {
+        "turns": args.turns,
+        "error_rate": args.error_rate,
+        "slow_rate": args.slow_rate,
+        "policies": {name: run(policy, args) for name, policy in policies(args.latency).items()},
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    REPORTS.mkdir(exist_ok=True)
+    out = REPORTS / "bench_resilience.json"
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print("Отчёт:", out)
+
+
+if __name__ == "__main__":
+    main()
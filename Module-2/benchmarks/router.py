@@ -0,0 +1,95 @@
+"""
+Бенчмарк маршрутизатора: смешанный поток (/order, точные вопросы FAQ, свободные вопросы)
+с маршрутизатором и без него на модели-заглушке. Измеряются доля шагов без вызова модели
+и p50/p99 задержки шага.
+
+Запуск:
+    uv run python -m benchmarks.router --turns 300 --latency 0.3
+"""
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+from src.brand_chain import ChatBot
+from src.fake_llm import FakeChatModel
+from src.session_log import SessionLogSink
+from src.session_store import MemorySessionStore
+
+BASE = Path(__file__).parent.parent
+REPORTS = BASE / "reports"
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def make_traffic(turns: int, order_share: float, faq_share: float, seed: int) -> list:
+    """Смесь команд /order, вопросов из FAQ слово в слово и прочих вопросов"""
+    rng = random.Random(seed)
+    faq = [doc["q"] for doc in json.loads((BASE / "data" / "faq.json").read_text(encoding="utf-8"))]
+    orders = list(json.loads((BASE / "data" / "orders.json").read_text(encoding="utf-8"))) + ["00000"]
+    other = (BASE / "data" / "eval_prompts.txt").read_text(encoding="utf-8").strip().splitlines()
+    traffic = []
+    for _ in range(turns):
+        x = rng.random()
+        if x < order_share:
+            traffic.append(f"/order {rng.choice(orders)}")
+        elif x < order_share + faq_share:
+            traffic.append(rng.choice(faq))
+        else:
+            traffic.append(rng.choice(other))
+    return traffic
+
+
+def run(traffic: list, fast_path: bool, latency: float, seed: int, sink: SessionLogSink) -> dict:
+    bot = ChatBot(llm=FakeChatModel(latency=latency, distribution="lognormal", seed=seed),
+                  log_sink=sink, fast_path=fast_path, session_store=MemorySessionStore())
+    latencies, llm_calls = [], 0
+    for question in traffic:
+        calls = bot.llm.calls
+        start = time.perf_counter()
+        bot.chat(question)
+        latencies.append(time.perf_counter() - start)
+        llm_calls += bot.llm.calls - calls
+    return {
+        "turns": len(traffic),
+        "llm_calls": llm_calls,
+        "no_model_share": round(1 - llm_calls / len(traffic), 3),
+        "latency_ms_mean": round(statistics.mean(latencies) * 1000, 2),
+        "latency_ms_p50": round(percentile(latencies, 0.5) * 1000, 2),
+        "latency_ms_p99": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк маршрутизатора без вызова модели")
+    parser.add_argument("--turns", type=int, default=300, help="Шагов диалога")
+    parser.add_argument("--latency", type=float, default=0.3, help="Средняя задержка модели-заглушки, с")
+    parser.add_argument("--order-share", type=float, default=0.3, help="Доля команд /order")
+    parser.add_argument("--faq-share", type=float, default=0.2, help="Доля точных вопросов из FAQ")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора потока и задержек")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    traffic = make_traffic(args.turns, args.order_share, args.faq_share, args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = SessionLogSink(Path(tmp))
+        result = {
+            "llm_only": run(traffic, False, args.latency, args.seed, sink),
+            "fast_path": run(traffic, True, args.latency, args.seed, sink),
+        }
+        sink.close()
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    REPORTS.mkdir(exist_ok=True)
+    (REPORTS / "bench_router.json").write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Бенчмарк записи логов сессий: синхронная запись с открытием файла на каждый шаг
+против фонового SessionLogSink. Измеряется задержка, которую запись добавляет к шагу диалога.
+
+Запуск:
+    uv run python -m benchmarks.session_log --sessions 200 --turns 50
+"""
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+from src.schema import BotResponse
+from src.session_log import SessionLogSink
+
+REPORTS = Path(__file__).parent.parent / "reports"
+REPLY = BotResponse(
+    answer="Стандартная доставка 2–5 рабочих дней. Экспресс — в течение 24–48 часов.",
+    tone="да, вежливый и деловой тон без эмодзи и восклицаний",
+    actions=["Выберите способ доставки при оформлении заказа"],
+)
+
+
+def save_session_sync(logs_dir: Path, session_id: str, user_input: str, bot_reply: BotResponse, total_tokens: int):
+    """Прежняя реализация ChatBot.save_session"""
+    logs_dir.mkdir(exist_ok=True)
+    with open(logs_dir / f"session_{session_id}.jsonl", "a", encoding="utf-8") as f:
+        json.dump({
+            "dialog": f"User: {user_input}\nBot: {json.dumps(bot_reply.model_dump(), ensure_ascii=False, indent=4)}",
+            "usage": total_tokens
+        }, f, ensure_ascii=False)
+        f.write("\n")
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def summarize(latencies_us: list, total_s: float, turns: int) -> dict:
+    return {
+        "per_turn_us_mean": round(statistics.mean(latencies_us), 2),
+        "per_turn_us_p50": round(percentile(latencies_us, 0.5), 2),
+        "per_turn_us_p99": round(percentile(latencies_us, 0.99), 2),
+        "total_s_including_flush": round(total_s, 3),
+        "turns": turns,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк записи логов сессий")
+    parser.add_argument("--sessions", type=int, default=200, help="Количество сессий")
+    parser.add_argument("--turns", type=int, default=50, help="Шагов диалога в сессии")
+    parser.add_argument("--fsync", default="never", help="Политика fsync для SessionLogSink")
+    args = parser.parse_args()
+    turns = [(f"s{s}", f"Вопрос {t} про доставку") for t in range(args.turns) for s in range(args.sessions)]
+
+    result = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        logs_dir = Path(tmp) / "sync"
+        latencies, start = [], time.perf_counter()
+        for session_id, text in turns:
+            t0 = time.perf_counter()
+            save_session_sync(logs_dir, session_id, text, REPLY, 500)
+            latencies.append((time.perf_counter() - t0) * 1e6)
+        result["sync"] = summarize(latencies, time.perf_counter() - start, len(turns))
+
+        sink = SessionLogSink(Path(tmp) / "sink", fsync=args.fsync)
+        latencies, start = [], time.perf_counter()
+        for session_id, text in turns:
+            t0 = time.perf_counter()
+            sink.log(session_id, {"user_input": text, "bot_reply": REPLY.model_dump(), "usage": 500})
+            latencies.append((time.perf_counter() - t0) * 1e6)
+        sink.close()
+        result["sink"] = summarize(latencies, time.perf_counter() - start, len(turns))
+        result["sink"]["fsync"] = args.fsync
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    REPORTS.mkdir(exist_ok=True)
+    out = REPORTS / "bench_session_log.json"
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print("Отчёт:", out)
+
+
+if __name__ == "__main__":
+    main()
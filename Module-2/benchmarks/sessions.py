@@ -0,0 +1,85 @@
+"""
+Бенчмарк SessionManager: сколько сессий в секунду обслуживается конкурентно
+на локальной модели-заглушке против последовательного синхронного chat.
+
+Запуск:
+    uv run python -m benchmarks.sessions --sessions 2000 --turns 3 --latency 0.05
+"""
+import json
+import time
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+
+from src.brand_chain import ChatBot
+from src.fake_llm import FakeChatModel
+from src.sessions import SessionManager
+from src.session_store import MemorySessionStore
+
+BASE = Path(__file__).parent.parent
+REPORTS = BASE / "reports"
+QUESTIONS = (BASE / "data" / "eval_prompts.txt").read_text(encoding="utf-8").strip().splitlines()
+
+
+async def run_async(manager: SessionManager, sessions: int, turns: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def session(i: int):
+        async with semaphore:
+            for t in range(turns):
+                await manager.achat(f"s{i}", QUESTIONS[(i + t) % len(QUESTIONS)])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    return time.perf_counter() - start
+
+
+def run_sync(bot: ChatBot, sessions: int, turns: int) -> float:
+    start = time.perf_counter()
+    for i in range(sessions):
+        session = bot.fork()
+        for t in range(turns):
+            session.chat(QUESTIONS[(i + t) % len(QUESTIONS)])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк конкурентных сессий")
+    parser.add_argument("--sessions", type=int, default=2000, help="Количество сессий")
+    parser.add_argument("--turns", type=int, default=3, help="Шагов диалога в сессии")
+    parser.add_argument("--latency", type=float, default=0.05, help="Задержка модели-заглушки, с")
+    parser.add_argument("--concurrency", type=int, default=1000, help="Одновременно активных сессий")
+    parser.add_argument("--sync-sessions", type=int, default=20, help="Сессий для синхронного замера")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    # Без маршрутизатора и объединения запросов: одинаковые вопросы сессий не должны схлопываться
+    # в один вызов, иначе замер покажет не конкурентные шаги с моделью
+    base_bot = ChatBot(llm=FakeChatModel(latency=args.latency), session_store=MemorySessionStore(),
+                       fast_path=False, coalesce=False)
+    manager = SessionManager(base_bot, max_sessions=args.sessions)
+
+    async_s = asyncio.run(run_async(manager, args.sessions, args.turns, args.concurrency))
+    sync_s = run_sync(base_bot, args.sync_sessions, args.turns)
+
+    result = {
+        "sessions": args.sessions,
+        "turns_per_session": args.turns,
+        "llm_latency_s": args.latency,
+        "concurrency": args.concurrency,
+        "async_sessions_per_s": round(args.sessions / async_s, 1),
+        "async_turns_per_s": round(args.sessions * args.turns / async_s, 1),
+        "sync_sessions_per_s": round(args.sync_sessions / sync_s, 1),
+        "sync_turns_per_s": round(args.sync_sessions * args.turns / sync_s, 1),
+        "live_sessions": len(manager),
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    REPORTS.mkdir(exist_ok=True)
+    out = REPORTS / "bench_sessions.json"
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print("Отчёт:", out)
+
+
+if __name__ == "__main__":
+    main()
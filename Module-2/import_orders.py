@@ -0,0 +1,31 @@
+"""
+Импорт заказов из orders.json в индексированную базу SQLite.
+
+Запуск:
+    uv run python import_orders.py data/orders.json data/orders.sqlite
+    uv run python import_orders.py --delta data/orders.delta.jsonl   # применить обновления статусов к data/orders.sqlite
+"""
+import time
+import argparse
+from pathlib import Path
+
+from src.order_store import import_json_orders, apply_order_deltas, DEFAULT_ORDERS_JSON, DEFAULT_ORDERS_DB
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Импорт orders.json в SQLite")
+    parser.add_argument("source", nargs="?", type=Path, default=DEFAULT_ORDERS_JSON, help="Путь к orders.json")
+    parser.add_argument("target", nargs="?", type=Path, default=DEFAULT_ORDERS_DB, help="Путь к базе SQLite")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Размер пачки вставки")
+    parser.add_argument("--delta", type=Path, default=None,
+                        help="Применить файл дельт к существующей базе target вместо полного импорта")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.delta is not None:
+        total = apply_order_deltas(args.delta, args.target)
+        print(f"Применено обновлений: {total} за {time.perf_counter() - start:.2f} с")
+        print("База:", args.target)
+    else:
+        total = import_json_orders(args.source, args.target, batch_size=args.batch_size)
+        print(f"Импортировано заказов: {total} за {time.perf_counter() - start:.2f} с")
+        print("База:", args.target)
@@ -0,0 +1,27 @@
+"""
+Импорт логов сессий logs/session_<id>.jsonl в хранилище сессий SQLite.
+Повторный запуск дописывает только новые шаги.
+
+Запуск:
+    uv run python import_sessions.py logs logs/sessions.sqlite
+"""
+import time
+import argparse
+from pathlib import Path
+
+from src.session_log import LOGS_DIR
+from src.session_store import SqliteSessionStore, import_session_logs, DEFAULT_SESSIONS_DB
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Импорт логов сессий в SQLite")
+    parser.add_argument("source", nargs="?", type=Path, default=LOGS_DIR, help="Каталог с session_*.jsonl")
+    parser.add_argument("target", nargs="?", type=Path, default=DEFAULT_SESSIONS_DB, help="Путь к базе SQLite")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = SqliteSessionStore(args.target)
+    stats = import_session_logs(args.source, store)
+    store.close()
+    print(f"Сессий: {stats['sessions']}, шагов: {stats['turns']}, добавлено: {stats['imported']}, "
+          f"пропущено строк: {stats['skipped']} за {time.perf_counter() - start:.2f} с")
+    print("База:", args.target)
@@ -0,0 +1,113 @@
+"""
+Разбивка промптов по разделам (system, faq, examples, history, format, input) на наборе промптов оценки.
+Токены считаются локально, модель не вызывается; в режиме --dialog промпты проигрываются одним
+диалогом, чтобы видеть рост истории, и модель вызывается (LLM_BACKEND=fake — заглушка).
+
+Запуск:
+    uv run python profile_prompts.py
+    uv run python profile_prompts.py --max-tokens 1200 --dialog --strict
+"""
+import sys
+import json
+import logging
+import argparse
+import statistics
+from pathlib import Path
+
+from src.brand_chain import ChatBot
+from src.prompt_budget import SECTIONS
+
+BASE = Path(__file__).parent
+REPORTS = BASE / "reports"
+
+
+def profile_prompts(bot: ChatBot, prompts: list, dialog: bool) -> list:
+    """Разбивка промпта каждого шага"""
+    rows = []
+    for prompt in prompts:
+        if dialog:
+            bot.last_profile = None
+            bot.chat(prompt)
+            profile = bot.last_profile
+        else:
+            profile = bot.profile_prompt(prompt)
+        rows.append({"prompt": prompt, "profile": profile.to_dict()})
+    return rows
+
+
+def summarize(rows: list) -> dict:
+    """Средний и максимальный размер разделов по всем промптам"""
+    profiles = [row["profile"] for row in rows]
+    if not profiles:
+        return {}
+    totals = [p["total"] for p in profiles]
+    summary = {"total": {"mean": round(statistics.mean(totals), 1), "max": max(totals)}}
+    for section in SECTIONS:
+        values = [p["sections"][section] for p in profiles]
+        summary[section] = {
+            "mean": round(statistics.mean(values), 1),
+            "max": max(values),
+            "share": round(sum(values) / max(sum(totals), 1), 3),
+        }
+    return summary
+
+
+def print_table(rows: list, summary: dict):
+    header = f"{'prompt':<40} {'total':>6} " + " ".join(f"{s:>8}" for s in SECTIONS) + "  trimmed"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        prompt = row["prompt"] if len(row["prompt"]) <= 40 else row["prompt"][:39] + "…"
+        profile = row["profile"]
+        sections = " ".join(f"{profile['sections'][s]:>8}" for s in SECTIONS)
+        trimmed = ", ".join(f"{k}: {v}" for k, v in profile["trimmed"].items()) or "—"
+        if profile["over_budget"]:
+            trimmed += " — не уложился в бюджет"
+        print(f"{prompt:<40} {profile['total']:>6} {sections}  {trimmed}")
+    if summary:
+        print("-" * len(header))
+        print(f"{'среднее':<40} {summary['total']['mean']:>6} " + " ".join(f"{summary[s]['mean']:>8}" for s in SECTIONS))
+        print(f"{'максимум':<40} {summary['total']['max']:>6} " + " ".join(f"{summary[s]['max']:>8}" for s in SECTIONS))
+        print(f"{'доля':<40} {'':>6} " + " ".join(f"{summary[s]['share']:>8.1%}" for s in SECTIONS))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Разбивка промптов по разделам и проверка бюджета токенов")
+    parser.add_argument("--prompts", type=Path, default=BASE / "data" / "eval_prompts.txt",
+                        help="Файл промптов, по одному на строку")
+    parser.add_argument("--max-tokens", type=int, default=None,
+                        help="Бюджет токенов промпта. По умолчанию MAX_PROMPT_TOKENS или значение ChatBot")
+    parser.add_argument("--version", default="current", help="Версия промпта из prompts.yaml")
+    parser.add_argument("--model", default=None, help="Модель, по словарю которой считаются токены")
+    parser.add_argument("--dialog", action="store_true", help="Проиграть промпты одним диалогом с вызовом модели")
+    parser.add_argument("--strict", action="store_true",
+                        help="Код возврата 1, если какой-либо промпт пришлось сокращать или он не уложился в бюджет")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    prompts = [line.strip() for line in args.prompts.read_text(encoding="utf-8").splitlines() if line.strip()]
+    # Без маршрутизатора и кэша: каждый шаг доходит до промпта модели
+    bot = ChatBot(model_name=args.model, prompt_version=args.version, fast_path=False,
+                  max_prompt_tokens=args.max_tokens, persist_sessions=False)
+    rows = profile_prompts(bot, prompts, args.dialog)
+    summary = summarize(rows)
+    print_table(rows, summary)
+
+    result = {
+        "prompts": str(args.prompts),
+        "prompt_version": bot.registry.get(args.version).version,
+        "model": bot.model_name,
+        "max_tokens": bot.prompt_budget.max_tokens,
+        "dialog": args.dialog,
+        "summary": summary,
+        "rows": rows,
+    }
+    REPORTS.mkdir(exist_ok=True)
+    out = REPORTS / "prompt_profile.json"
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print("Отчёт:", out)
+
+    over = [row for row in rows if row["profile"]["over_budget"] or row["profile"]["trimmed"]]
+    if args.strict and over:
+        print(f"Промптов сверх бюджета: {len(over)}")
+        sys.exit(1)
@@ -1,27 +1,68 @@
-import yaml
+from __future__ import annotations
+
 import os
 import json
 import uuid
+import copy
+import time
+import asyncio
 import logging
+import threading
 from pathlib import Path
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate, MessagesPlaceholder
-from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferMemory
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Generator, Iterator, List, Optional, Tuple
 from src.schema import BotResponse
-from dotenv import load_dotenv
+from src.retrieval import BM25Index, FaqSource, format_faq
+from src.order_store import OrderStore, open_order_store
+from src.cache import ResponseCache, make_cache_key, stable_hash
+from src.memory import TokenBudgetMemory
+from src.session_log import SessionLogSink, get_session_sink
+from src.telemetry import Telemetry, get_telemetry
+from src.router import FastPathRouter, DEFAULT_TONE
+from src.resilience import CallPolicy, ResilientCaller
+from src.coalesce import SingleFlight
+from src.few_shots import FewShotSelector
+from src.prompt_budget import PromptBudget, PromptBudgetError, PromptParts, PromptProfile
+from src.session_store import SessionStore, make_turn, open_session_store
+
+# langchain, langchain_openai, yaml и dotenv импортируются при первом использовании:
+# импорт модуля не должен тянуть тяжёлые зависимости и читать файлы
+if TYPE_CHECKING:
+    from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+PROMPTS_PATH = DATA_DIR / "prompts.yaml"
+STYLE_GUIDE_PATH = DATA_DIR / "style_guide.yaml"
+
+# Максимум токенов промпта по умолчанию; переопределяется MAX_PROMPT_TOKENS
+DEFAULT_MAX_PROMPT_TOKENS = 8000
+
+NO_FAQ = "нет подходящих записей"
+
+_env_loaded = False
 
-load_dotenv(override=True)
 
-def load_style_guide() -> dict:
+def load_env():
+    """Загружает .env один раз за процесс, при первом создании модели или чат-бота"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv(override=True)
+        _env_loaded = True
+
+
+def load_style_guide(style_guide_path: Optional[Path] = None) -> dict:
     """
     Загружает данные из файла style_guide.yaml и возвращает словарь.
     
+    Args:
+        style_guide_path (Path): Путь к style_guide.yaml. По умолчанию data/style_guide.yaml
+    
     Returns:
         dict: Словарь с данными из style_guide.yaml
     """
-    current_dir = Path(__file__).parent
-    style_guide_path = current_dir.parent / "data" / "style_guide.yaml"
+    import yaml
+    style_guide_path = style_guide_path or STYLE_GUIDE_PATH
     
     try:
         with open(style_guide_path, 'r', encoding='utf-8') as file:
@@ -35,16 +76,18 @@ def load_style_guide() -> dict:
         raise Exception(f"Неожиданная ошибка при загрузке файла: {e}")
 
 
-def load_prompts() -> dict:
+def load_prompts(prompts_path: Optional[Path] = None) -> dict:
     """
     Загружает данные из файла prompts.yaml и возвращает словарь.
     
+    Args:
+        prompts_path (Path): Путь к prompts.yaml. По умолчанию data/prompts.yaml
+    
     Returns:
         dict: Словарь с данными из prompts.yaml
     """
-    # Получаем путь к файлу prompts.yaml относительно текущего файла
-    current_dir = Path(__file__).parent
-    prompts_path = current_dir.parent / "data" / "prompts.yaml"
+    import yaml
+    prompts_path = prompts_path or PROMPTS_PATH
     
     try:
         with open(prompts_path, 'r', encoding='utf-8') as file:
@@ -58,20 +101,58 @@ def load_prompts() -> dict:
         raise Exception(f"Неожиданная ошибка при загрузке файла: {e}")
 
 
-def create_system_prompt_template(prompt_version: str = "current") -> SystemMessagePromptTemplate:
+def create_llm(model_name: str, temperature: float = 0.2, request_timeout: Optional[float] = None,
+               max_retries: int = 0):
+    """
+    Создает модель чата. При LLM_BACKEND=fake вместо ChatOpenAI возвращается локальная
+    FakeChatModel, задержка которой задается переменными FAKE_LLM_LATENCY,
+    FAKE_LLM_DISTRIBUTION и FAKE_LLM_SEED, а внедряемые сбои — FAKE_LLM_ERROR_RATE и FAKE_LLM_SLOW_RATE.
+    
+    Args:
+        model_name (str): Название модели OpenAI
+        temperature (float): Температура для генерации
+        request_timeout (float): Таймаут запроса
+        max_retries (int): Повторы внутри клиента. По умолчанию 0: повторы и дедлайн вызова — в ResilientCaller
+    
+    Returns:
+        Модель чата
+    """
+    load_env()
+    if os.getenv("LLM_BACKEND", "openai") == "fake":
+        from src.fake_llm import FakeChatModel
+        seed = os.getenv("FAKE_LLM_SEED")
+        return FakeChatModel(
+            model_name=model_name,
+            latency=float(os.getenv("FAKE_LLM_LATENCY", "0.05")),
+            distribution=os.getenv("FAKE_LLM_DISTRIBUTION", "fixed"),
+            seed=int(seed) if seed else None,
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+            slow_rate=float(os.getenv("FAKE_LLM_SLOW_RATE", "0"))
+        )
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model_name=model_name, temperature=temperature, request_timeout=request_timeout,
+                      max_retries=max_retries)
+
+
+def create_system_prompt_template(prompt_version: str = "current", prompts_data: Optional[dict] = None,
+                                  style_guide: Optional[dict] = None) -> SystemMessagePromptTemplate:
     """
     Создает шаблон системного промпта на основе данных из prompts.yaml.
     
     Args:
         prompt_version (str): Версия промпта для использования. По умолчанию "current".
                              Если "current", используется версия из поля current.
+        prompts_data (dict): Уже загруженный prompts.yaml. По умолчанию читается с диска
+        style_guide (dict): Уже загруженный style_guide.yaml. По умолчанию читается с диска
     
     Returns:
         SystemMessagePromptTemplate: Объект SystemMessagePromptTemplate из LangChain
     """
-    # Загружаем данные промптов
-    prompts_data = load_prompts()
-    style_guide = load_style_guide()
+    from langchain_core.prompts import SystemMessagePromptTemplate
+    
+    # Загружаем данные промптов, если они не переданы
+    prompts_data = prompts_data or load_prompts()
+    style_guide = style_guide or load_style_guide()
 
     # Создаем словарь переменных для промпта
     prompt_variables = {
@@ -106,22 +187,31 @@ def create_system_prompt_template(prompt_version: str = "current") -> SystemMess
     return SystemMessagePromptTemplate.from_template(prompt_config["system"], partial_variables=prompt_variables)
 
 
-def create_user_prompt_template(prompt_version: str = "current") -> ChatPromptTemplate:
+def format_fields_json(style_guide: dict) -> str:
+    """Описание полей ответа из style_guide.yaml, которое подставляется в пользовательский промпт"""
+    return json.dumps(style_guide.get("format", {}).get("fields", {}), ensure_ascii=False, indent=4)
+
+
+def create_user_prompt_template(prompt_version: str = "current", prompts_data: Optional[dict] = None,
+                                style_guide: Optional[dict] = None) -> ChatPromptTemplate:
     """
     Создает шаблон пользовательского промпта на основе данных из prompts.yaml.
     
     Args:
         prompt_version (str): Версия промпта для использования. По умолчанию "current".
                              Если "current", используется версия из поля current.
+        prompts_data (dict): Уже загруженный prompts.yaml. По умолчанию читается с диска
+        style_guide (dict): Уже загруженный style_guide.yaml. По умолчанию читается с диска
     
     Returns:
         ChatBotTemplate: Объект ChatBotTemplate из LangChain
     """
-    # Загружаем данные промптов
-    prompts_data = load_prompts()
-    style_guide = load_style_guide()
-    format_fields = style_guide.get("format", {}).get("fields", {})
-    format_fields = json.dumps(format_fields, ensure_ascii=False, indent=4)
+    from langchain_core.prompts import HumanMessagePromptTemplate
+    
+    # Загружаем данные промптов, если они не переданы
+    prompts_data = prompts_data or load_prompts()
+    style_guide = style_guide or load_style_guide()
+    format_fields = format_fields_json(style_guide)
     
     # Определяем версию промпта
     if prompt_version == "current":
@@ -143,24 +233,35 @@ def create_user_prompt_template(prompt_version: str = "current") -> ChatPromptTe
     return HumanMessagePromptTemplate.from_template(prompt_config["user"], partial_variables={"format_fields":format_fields})
 
 
-def create_chat_prompt_template(prompt_version: str = "current") -> ChatPromptTemplate:
+def create_chat_prompt_template(prompt_version: str = "current", prompts_data: Optional[dict] = None,
+                                style_guide: Optional[dict] = None) -> ChatPromptTemplate:
     """
     Создает объект ChatPromptTemplate на основе данных из prompts.yaml.
     
     Args:
         prompt_version (str): Версия промпта для использования. По умолчанию "current".
                              Если "current", используется версия из поля current.
+        prompts_data (dict): Уже загруженный prompts.yaml. По умолчанию читается с диска
+        style_guide (dict): Уже загруженный style_guide.yaml. По умолчанию читается с диска
     
     Returns:
         ChatPromptTemplate: Объект ChatPromptTemplate из LangChain
     """
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+    
+    # Читаем YAML один раз для системного и пользовательского шаблонов
+    prompts_data = prompts_data or load_prompts()
+    style_guide = style_guide or load_style_guide()
+    
     # Создаем список сообщений для ChatPromptTemplate
     messages = []
     
     # Добавляем системное сообщение, если оно есть
     try:
-        system_template = create_system_prompt_template(prompt_version)
+        system_template = create_system_prompt_template(prompt_version, prompts_data, style_guide)
         messages.append(system_template)
+        # Примеры ответов, подобранные под ввод (FewShotSelector); без них блок пуст
+        messages.append(MessagesPlaceholder(variable_name="examples", optional=True))
         messages.append(MessagesPlaceholder(variable_name="history", optional=True))
     except ValueError:
         # Системный промпт не найден, пропускаем
@@ -168,7 +269,7 @@ def create_chat_prompt_template(prompt_version: str = "current") -> ChatPromptTe
     
     # Добавляем пользовательское сообщение, если оно есть
     try:
-        user_template = create_user_prompt_template(prompt_version)
+        user_template = create_user_prompt_template(prompt_version, prompts_data, style_guide)
         messages.append(user_template)
     except ValueError:
         # Пользовательский промпт не найден, пропускаем
@@ -181,90 +282,620 @@ def create_chat_prompt_template(prompt_version: str = "current") -> ChatPromptTe
     # Создаем и возвращаем ChatPromptTemplate
     return ChatPromptTemplate.from_messages(messages)
 
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """Скомпилированный шаблон одной версии промпта и его идентификаторы"""
+    version: str
+    prompt_hash: str
+    template: ChatPromptTemplate
+    # Инструкции по формату ответа (format_fields) — отдельный раздел в разбивке промпта
+    format_fields: str = ""
+
+
+@dataclass(frozen=True)
+class PromptSnapshot:
+    """Неизменяемый снимок prompts.yaml и style_guide.yaml со скомпилированными шаблонами"""
+    current: str
+    prompts: Dict[str, CompiledPrompt]
+    style_guide: dict
+    style_hash: str
+    mtimes: Tuple[int, int]
+
+
+class PromptRegistry:
+    """
+    Разбирает prompts.yaml и style_guide.yaml один раз, компилирует ChatPromptTemplate для
+    каждой версии и отдает их из памяти. При изменении файлов (по mtime) снимок пересобирается
+    и подменяется атомарно, без перезапуска процесса. Если новые файлы невалидны,
+    продолжает работать предыдущий снимок.
+    """
+    
+    def __init__(self, prompts_path: Optional[Path] = None, style_guide_path: Optional[Path] = None,
+                 check_interval: float = 1.0):
+        """
+        Args:
+            prompts_path (Path): Путь к prompts.yaml
+            style_guide_path (Path): Путь к style_guide.yaml
+            check_interval (float): Как часто (в секундах) проверять mtime файлов
+        """
+        self.prompts_path = Path(prompts_path or PROMPTS_PATH)
+        self.style_guide_path = Path(style_guide_path or STYLE_GUIDE_PATH)
+        self.check_interval = check_interval
+        self._reload_lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._failed_mtimes: Optional[Tuple[int, int]] = None
+        self._snapshot = self._build()
+    
+    def _mtimes(self) -> Tuple[int, int]:
+        return self.prompts_path.stat().st_mtime_ns, self.style_guide_path.stat().st_mtime_ns
+    
+    def _build(self) -> PromptSnapshot:
+        """Читает оба файла и компилирует шаблоны всех версий"""
+        mtimes = self._mtimes()
+        prompts_data = load_prompts(self.prompts_path)
+        style_guide = load_style_guide(self.style_guide_path)
+        style_hash = stable_hash(style_guide)
+        compiled = {}
+        for version, config in prompts_data["prompts"].items():
+            if version == "current":
+                continue
+            compiled[version] = CompiledPrompt(
+                version=version,
+                prompt_hash=stable_hash([config, style_hash])[:12],
+                template=create_chat_prompt_template(version, prompts_data, style_guide),
+                format_fields=format_fields_json(style_guide),
+            )
+        current = prompts_data["prompts"]["current"]
+        if current not in compiled:
+            raise ValueError(f"Версия промпта '{current}' не найдена в файле prompts.yaml")
+        return PromptSnapshot(current=current, prompts=compiled, style_guide=style_guide,
+                              style_hash=style_hash, mtimes=mtimes)
+    
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """
+        Пересобирает снимок, если файлы изменились с момента последней сборки
+        
+        Args:
+            force (bool): Проверить mtime независимо от check_interval
+        
+        Returns:
+            bool: True, если снимок был подменён
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        # Проверку выполняет один поток, остальные продолжают работать со старым снимком
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            self._checked_at = now
+            try:
+                mtimes = self._mtimes()
+                if mtimes in (self._snapshot.mtimes, self._failed_mtimes):
+                    return False
+                snapshot = self._build()
+            except Exception as e:
+                # Повторим попытку только после следующего изменения файлов
+                self._failed_mtimes = mtimes
+                logging.error(f"Prompt reload failed, keeping previous version: {e}")
+                return False
+            self._snapshot = snapshot
+            logging.info(f"Prompts reloaded, current version: {snapshot.current}")
+            return True
+        finally:
+            self._reload_lock.release()
+    
+    @property
+    def snapshot(self) -> PromptSnapshot:
+        """Актуальный снимок промптов"""
+        self.reload_if_changed()
+        return self._snapshot
+    
+    @property
+    def style_guide(self) -> dict:
+        return self.snapshot.style_guide
+    
+    def versions(self) -> List[str]:
+        """Список доступных версий промпта"""
+        return list(self.snapshot.prompts)
+    
+    def get(self, prompt_version: str = "current") -> CompiledPrompt:
+        """
+        Возвращает скомпилированный промпт нужной версии
+        
+        Args:
+            prompt_version (str): Версия промпта или "current"
+        
+        Returns:
+            CompiledPrompt: Шаблон, версия и хэш
+        """
+        snapshot = self.snapshot
+        version = snapshot.current if prompt_version == "current" else prompt_version
+        if version not in snapshot.prompts:
+            raise ValueError(f"Версия промпта '{version}' не найдена в файле prompts.yaml")
+        return snapshot.prompts[version]
+
+
+_registry: Optional[PromptRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> PromptRegistry:
+    """Возвращает общий для процесса реестр промптов, создавая его при первом обращении"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = PromptRegistry()
+    return _registry
+
+
+class LazyModel:
+    """
+    Модель чата и её обёртки (структурированный вывод, потоковый JSON), создаваемые при первом
+    обращении. Экземпляр общий для ChatBot и его форков, поэтому клиент создаётся один раз.
+    """
+    
+    def __init__(self, factory: Callable[[], Any], llm: Any = None):
+        """
+        Args:
+            factory (Callable): Создает модель, если готовая не передана
+            llm: Готовая модель
+        """
+        self._factory = factory
+        self._llm = llm
+        self._structured = None
+        self._stream = None
+        self._lock = threading.Lock()
+    
+    def _build(self):
+        with self._lock:
+            if self._stream is not None:
+                return
+            llm = self._llm if self._llm is not None else self._factory()
+            self._structured = llm.with_structured_output(BotResponse, include_raw=True)
+            # Для потоковой выдачи ответ запрашивается как JSON-объект и разбирается по мере поступления
+            stream = llm.bind(response_format={"type": "json_object"}, stream_usage=True)
+            self._llm = llm
+            self._stream = stream
+    
+    @property
+    def llm(self):
+        if self._stream is None:
+            self._build()
+        return self._llm
+    
+    @property
+    def structured(self):
+        if self._stream is None:
+            self._build()
+        return self._structured
+    
+    @property
+    def stream(self):
+        if self._stream is None:
+            self._build()
+        return self._stream
+
+
+@dataclass
+class ChatTurn:
+    """Состояние одного шага диалога между подготовкой промпта и сохранением в память"""
+    user_input: str
+    compiled: Optional[CompiledPrompt] = None
+    prompt: Optional[list] = None
+    cache_key: Optional[str] = None
+    # Ключ объединения одинаковых одновременных вызовов модели; None — вызов не объединяется
+    flight_key: Optional[str] = None
+    reply: Optional[BotResponse] = None
+    # Разбивка отправляемого промпта по разделам
+    profile: Optional[PromptProfile] = None
+    total_tokens: int = 0
+    # Кто ответил: "llm", "cache", "coalesced", "fallback" или интент маршрутизатора ("order", "faq")
+    route: str = "llm"
+
+
 class ChatBot:
     """
     Класс для работы с чат-ботом, использующий промпты из brand_chain.py
     """
     
-    def __init__(self, model_name: str = "gpt-4o-mini", temperature: float = 0.2, request_timeout: int = 15):
+    def __init__(self, model_name: str = "gpt-4o-mini", temperature: float = 0.2, request_timeout: int = 15,
+                 faq_top_k: int = 3, order_store: OrderStore = None, cache: ResponseCache = None,
+                 memory_max_tokens: int = 1500, memory_keep_turns: int = 6, llm=None,
+                 prompt_version: str = "current", registry: Optional[PromptRegistry] = None,
+                 log_sink: Optional[SessionLogSink] = None, telemetry: Optional[Telemetry] = None,
+                 fast_path: bool = True, few_shot_k: int = 2, few_shot_max_tokens: int = 300,
+                 session_store: Optional[SessionStore] = None, session_id: Optional[str] = None,
+                 resume_turns: int = 20, llm_policy: Optional[CallPolicy] = None, coalesce: bool = True,
+                 max_prompt_tokens: Optional[int] = None, persist_sessions: bool = True):
         """
         Инициализация чат-бота
         
         Args:
             model_name (str): Название модели OpenAI
             temperature (float): Температура для генерации
-            request_timeout (int): Таймаут запроса
+            request_timeout (int): Таймаут запроса к модели; не больше дедлайна и таймаута попытки llm_policy
+            faq_top_k (int): Сколько релевантных записей FAQ добавлять в промпт на каждом шаге
+            order_store (OrderStore): Хранилище заказов. По умолчанию выбирается open_order_store()
+            cache (ResponseCache): Кэш ответов. По умолчанию кэширование отключено
+            memory_max_tokens (int): Бюджет токенов истории диалога, отправляемой в LLM
+            memory_keep_turns (int): Сколько последних ходов хранить дословно
+            llm: Готовая модель. По умолчанию create_llm() — ChatOpenAI или FakeChatModel при LLM_BACKEND=fake
+            prompt_version (str): Версия промпта из prompts.yaml. "current" следует за полем current
+            registry (PromptRegistry): Реестр промптов. По умолчанию общий для процесса get_registry()
+            log_sink (SessionLogSink): Писатель логов сессий. По умолчанию общий для процесса get_session_sink()
+            telemetry (Telemetry): Сборщик спанов и метрик. По умолчанию общий для процесса get_telemetry()
+            fast_path (bool): Отвечать на /order и точные вопросы из FAQ по шаблонам, без вызова LLM
+            few_shot_k (int): Сколько похожих примеров из few_shots.jsonl добавлять в промпт. 0 — без примеров
+            few_shot_max_tokens (int): Бюджет токенов на блок примеров
+            session_store (SessionStore): Хранилище шагов диалога. По умолчанию open_session_store()
+                                          (переменная SESSION_STORE; без неё сессии не сохраняются)
+            session_id (str): Идентификатор сессии. Если сессия есть в хранилище, её история восстанавливается
+            resume_turns (int): Сколько последних шагов загружать в память при восстановлении сессии
+            llm_policy (CallPolicy): Повторы, дублирование запросов и автомат отключения для вызова модели.
+                                     По умолчанию CallPolicy(): 3 попытки в пределах 30 с и ответ fallback.no_data
+            coalesce (bool): Одинаковые одновременные запросы (тот же ввод, промпт, модель, FAQ и история)
+                             обслуживать одним вызовом модели
+            max_prompt_tokens (int): Максимум токенов промпта. Больший промпт сокращается до вызова модели:
+                                     примеры, затем старая история, затем записи FAQ. По умолчанию
+                                     MAX_PROMPT_TOKENS из окружения или DEFAULT_MAX_PROMPT_TOKENS; 0 — без ограничения
+            persist_sessions (bool): False — не сохранять шаги и не восстанавливать сессию: session_store
+                                     и SESSION_STORE игнорируются (бенчмарки, оценка, профилирование)
         """
-        self.session_id = str(uuid.uuid4())
+        load_env()
+        self.session_id = session_id or str(uuid.uuid4())
         self.model_name = model_name or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         self.temperature = temperature
-        self.request_timeout = request_timeout
+        self.faq_top_k = faq_top_k
         
         # Загружаем данные
-        self.style_guide = load_style_guide()
-        self.faq_data = self._load_faq_data()
-        self.orders_data = self._load_orders_data()
+        self.registry = registry or get_registry()
+        self.prompt_version = prompt_version
+        self.last_prompt: Optional[CompiledPrompt] = None
+        # Разбивка последнего промпта, отправленного в модель
+        self.last_profile: Optional[PromptProfile] = None
+        # Кто ответил на последний шаг (ChatTurn.route)
+        self.last_route: Optional[str] = None
+        # FAQ и заказы перечитываются при изменении файлов; форки разделяют один источник
+        self.faq_source = FaqSource(DATA_DIR / "faq.json")
+        self.few_shots = FewShotSelector(k=few_shot_k, max_tokens=few_shot_max_tokens, model_name=self.model_name)
+        self.order_store = order_store or open_order_store()
+        self.cache = cache
+        self.log_sink = log_sink
+        if not persist_sessions:
+            self.session_store = None
+        else:
+            self.session_store = session_store if session_store is not None else open_session_store()
+        self.resume_turns = resume_turns
+        self.telemetry = telemetry or get_telemetry()
+        # Автомат и окно задержек общие для форков: все сессии ходят к одной модели
+        self.llm_caller = ResilientCaller(llm_policy, name="chat", telemetry=self.telemetry)
+        # Вызов без дублирования идёт в текущем потоке, поэтому попытку ограничивает таймаут клиента:
+        # не дольше таймаута попытки и дедлайна политики
+        policy = self.llm_caller.policy
+        timeouts = [t for t in (request_timeout, policy.attempt_timeout, policy.deadline) if t is not None]
+        self.request_timeout = min(timeouts) if timeouts else None
+        self.single_flight = SingleFlight("chat", telemetry=self.telemetry) if coalesce else None
+        if max_prompt_tokens is None:
+            max_prompt_tokens = int(os.getenv("MAX_PROMPT_TOKENS", DEFAULT_MAX_PROMPT_TOKENS))
+        self.prompt_budget = PromptBudget(max_prompt_tokens or None, model_name=self.model_name)
+        registry = self.registry
+        faq_source = self.faq_source
+        self.router = FastPathRouter(lambda: faq_source.index.docs, self.order_store,
+                                     lambda: registry.style_guide) if fast_path else None
         
-        # Создаем модель и память
-        self.llm = ChatOpenAI(
-            model_name=self.model_name, 
-            temperature=self.temperature, 
-            request_timeout=self.request_timeout
-        )
-        self.llm_with_so = self.llm.with_structured_output(BotResponse, include_raw=True)
-        self.prompt = create_chat_prompt_template()
-        self.memory = ConversationBufferMemory(
-            memory_key="history",
-            return_messages=True
+        # Клиент модели создаётся при первом запросе к ней; память — сразу
+        self._model = LazyModel(lambda: create_llm(self.model_name, self.temperature, self.request_timeout), llm)
+        self.memory = TokenBudgetMemory(
+            max_tokens=memory_max_tokens,
+            keep_last_turns=memory_keep_turns,
+            model_name=self.model_name
         )
         
-        # Добавляем системное сообщение
-        # self._setup_system_message()
+        if self.resume():
+            logging.info(f"=== Resumed session {self.session_id} ===")
+        else:
+            logging.info(f"=== New session {self.session_id} ===")
+    
+    @property
+    def llm(self):
+        """Модель чата; создаётся при первом обращении"""
+        return self._model.llm
+    
+    @property
+    def llm_with_so(self):
+        """Модель со структурированным выводом BotResponse (include_raw=True)"""
+        return self._model.structured
+    
+    @property
+    def llm_stream(self):
+        """Модель, отдающая ответ потоком JSON-объекта"""
+        return self._model.stream
+    
+    @property
+    def style_guide(self) -> dict:
+        """Руководство по стилю из актуального снимка реестра"""
+        return self.registry.style_guide
+    
+    @property
+    def faq_index(self) -> BM25Index:
+        """Индекс FAQ из актуального снимка"""
+        return self.faq_source.index
+    
+    @property
+    def faq_data(self) -> List[dict]:
+        return self.faq_index.docs
+    
+    @property
+    def prompt(self) -> ChatPromptTemplate:
+        """Скомпилированный шаблон выбранной версии промпта"""
+        return self.registry.get(self.prompt_version).template
+    
+    def retrieve_faq(self, user_input: str, faq_index: Optional[BM25Index] = None) -> str:
+        """
+        Находит записи FAQ, релевантные вводу пользователя, и форматирует их для промпта
         
-        logging.info(f"=== New session {self.session_id} ===")
-    
-    def _load_faq_data(self) -> dict:
-        """Загружает данные FAQ из файла"""
-        faq_path = Path(__file__).parent.parent / "data" / "faq.json"
-        if faq_path.exists():
-            with open(faq_path, "r", encoding='utf-8') as f:
-                return json.load(f)
-        return {}
-    
-    def _load_orders_data(self) -> dict:
-        """Загружает данные заказов из файла"""
-        orders_path = Path(__file__).parent.parent / "data" / "orders.json"
-        if orders_path.exists():
-            with open(orders_path, "r", encoding='utf-8') as f:
-                return json.load(f)
-        return {}
-    
-    def _setup_system_message(self):
-        """Настраивает системное сообщение для чат-бота"""
-        # Создаем предзаполненный системный промпт
-        system_message = create_system_prompt_template()
-        system_message = system_message.format(faq=self.faq_data, orders=self.orders_data)
-        print(system_message)
-        self.memory.chat_memory.add_message(system_message)
+        Args:
+            user_input (str): Ввод пользователя
+            faq_index (BM25Index): Снимок индекса. По умолчанию актуальный
+            
+        Returns:
+            str: Top-k пар вопрос/ответ из FAQ
+        """
+        return format_faq(self._faq_entries(user_input, faq_index)) or NO_FAQ
+    
+    def _faq_entries(self, user_input: str, faq_index: Optional[BM25Index] = None) -> List[dict]:
+        """Top-k записей FAQ по убыванию релевантности"""
+        return [doc for doc, _ in (faq_index or self.faq_index).search(user_input, self.faq_top_k)]
+    
+    def answer_context(self, faq_index: Optional[BM25Index] = None) -> list:
+        """
+        Данные, кроме промпта и модели, от которых зависит ответ: версия FAQ, банк примеров
+        и их настройки, бюджет промпта. Входят в ключи кэша ответов и результатов оценки
+        """
+        return [
+            (faq_index or self.faq_index).source_hash,
+            [self.few_shots.source_hash, self.few_shots.k, self.few_shots.max_tokens],
+            self.prompt_budget.max_tokens,
+        ]
+    
+    def _cache_key(self, user_input: str, history: list, compiled: CompiledPrompt, faq_index: BM25Index) -> str:
+        """Строит ключ кэша с учётом версии промпта, модели, стиля, FAQ, примеров, бюджета промпта и истории диалога"""
+        context_hash = stable_hash([
+            *self.answer_context(faq_index),
+            [(message.type, message.content) for message in history],
+        ])
+        # prompt_hash учитывает и текст версии промпта, и руководство по стилю
+        return make_cache_key(user_input, compiled.version, self.model_name, compiled.prompt_hash, context_hash)
     
     def get_order_status(self, order_id: str) -> str:
-        """Получает статус заказа по ID из orders.json"""
-        order_info = self.orders_data.get(order_id, f"Заказ с номером {order_id} не найден. Пожалуйста, проверьте правильность номера заказа.")
+        """Получает статус заказа по ID из хранилища заказов"""
+        order_info = self.order_store.get(order_id)
+        if order_info is None:
+            return f"Заказ с номером {order_id} не найден. Пожалуйста, проверьте правильность номера заказа."
         return order_info
     
-    def save_session(self, user_input: str, bot_reply: str, total_tokens: int = 0):
-        """Сохраняет сессию в файл"""
-        logs_dir = Path(__file__).parent.parent / "logs"
-        logs_dir.mkdir(exist_ok=True)
+    def save_session(self, user_input: str, bot_reply: BotResponse, total_tokens: int = 0):
+        """Ставит шаг диалога в очередь фоновой записи logs/session_<id>.jsonl"""
+        sink = self.log_sink or get_session_sink()
+        with self.telemetry.span("log", session_id=self.session_id):
+            sink.log(self.session_id, {
+                "user_input": user_input,
+                "bot_reply": bot_reply.model_dump(),
+                "usage": total_tokens,
+                "prompt_version": self.last_prompt.version if self.last_prompt else None,
+                "prompt_hash": self.last_prompt.prompt_hash if self.last_prompt else None
+            })
+    
+    def fork(self, session_id: Optional[str] = None) -> "ChatBot":
+        """
+        Создает новую сессию, разделяющую с текущей неизменяемые данные (FAQ, заказы,
+        промпт, стиль, модель и кэш), но со своей памятью диалога
+        
+        Args:
+            session_id (str): Идентификатор новой сессии. По умолчанию генерируется uuid4
+            
+        Returns:
+            ChatBot: Новый экземпляр чат-бота
+        """
+        bot = copy.copy(self)
+        bot.session_id = session_id or str(uuid.uuid4())
+        bot.last_prompt = None
+        bot.last_profile = None
+        bot.last_route = None
+        bot.memory = TokenBudgetMemory(
+            max_tokens=self.memory.max_tokens,
+            keep_last_turns=self.memory.keep_last_turns,
+            model_name=self.model_name
+        )
+        bot.resume()
+        return bot
+    
+    def resume(self) -> int:
+        """
+        Загружает в память диалога последние resume_turns шагов сессии из хранилища.
+        Более старые шаги память сворачивает так же, как при живом диалоге.
         
-        with open(logs_dir / f"session_{self.session_id}.jsonl", "a", encoding='utf-8') as f:
-            json.dump({
-                "dialog": f"User: {user_input}\nBot: {json.dumps(bot_reply.model_dump(), ensure_ascii=False, indent=4)}", 
-                "usage": total_tokens
-            }, f, ensure_ascii=False)
-            f.write("\n")
-    
-    def chat(self, user_input: str) -> BotResponse:
+        Returns:
+            int: Количество восстановленных шагов
+        """
+        if self.session_store is None or self.resume_turns <= 0:
+            return 0
+        turns = self.session_store.load(self.session_id, self.resume_turns)
+        for turn in turns:
+            self.memory.chat_memory.add_user_message(turn["user_input"])
+            self.memory.chat_memory.add_ai_message(turn["answer"])
+        return len(turns)
+    
+    def _prepare_turn(self, user_input: str) -> ChatTurn:
+        """Собирает историю, проверяет кэш и форматирует промпт для одного шага диалога"""
+        turn = ChatTurn(user_input=user_input, compiled=self.registry.get(self.prompt_version))
+        
+        # Ответ полностью определён данными — модель не вызываем
+        if self.router is not None:
+            routed = self.router.route(user_input)
+            if routed is not None:
+                turn.reply, turn.route = routed.reply, routed.intent
+                return turn
+        
+        # Один снимок FAQ на шаг: ключ кэша и подсказки в промпте соответствуют одной версии
+        faq_index = self.faq_index
+        # Получаем историю диалога из памяти в пределах бюджета токенов
+        history = self.memory.load_memory_variables({})["history"]
+        logging.info(f"History tokens: {self.memory.last_stats.history_tokens} ({self.memory.last_stats})")
+        
+        # Ответы на /order зависят от актуального статуса заказа: не кэшируются и не объединяются
+        if user_input.startswith("/order "):
+            if self.cache is not None:
+                self.cache.skip()
+                self.telemetry.inc("cache", result="skip")
+        elif self.cache is not None or self.single_flight is not None:
+            # В ключ входит история, поэтому объединяются только запросы с одинаковым контекстом
+            key = self._cache_key(user_input, history, turn.compiled, faq_index)
+            if self.single_flight is not None:
+                turn.flight_key = key
+            if self.cache is not None:
+                turn.cache_key = key
+                cached = self.cache.get(key)
+                if cached is not None:
+                    # Ответ из кэша: вызова LLM нет, токены не тратятся
+                    turn.reply, turn.route = cached[0], "cache"
+                self.telemetry.inc("cache", result="miss" if cached is None else "hit")
+        
+        # Проверяем команду /order
+        if user_input.startswith("/order "):
+            order_id = user_input.replace("/order ", "").strip()
+            turn.user_input += f"\nИНФОРМАЦИЯ О ЗАКАЗЕ: {self.get_order_status(order_id)}"
+        
+        if turn.reply is None:
+            # Подбираем похожие примеры ответов в пределах бюджета токенов
+            examples = self.few_shots.select(user_input)
+            logging.info(f"Few-shot examples: {len(examples)}")
+            parts = PromptParts(examples=examples, history=list(history),
+                                faq=self._faq_entries(turn.user_input, faq_index))
+            try:
+                turn.prompt, turn.profile = self.prompt_budget.fit(parts, lambda parts: self._render_prompt(turn, parts))
+            except PromptBudgetError as e:
+                # Такой промпт модель всё равно отклонит
+                turn.profile = e.profile
+                self._record_profile(turn.profile)
+                self._fallback(turn, e)
+            else:
+                self._record_profile(turn.profile)
+        return turn
+    
+    def _render_prompt(self, turn: ChatTurn, parts: PromptParts) -> Tuple[list, dict]:
+        """Форматирует промпт с примерами, историей и пользовательским вводом; возвращает и содержимое разделов"""
+        faq = format_faq(parts.faq) or NO_FAQ
+        examples = self.few_shots.render(parts.examples)
+        messages = turn.compiled.template.format_messages(
+            examples=examples,
+            history=parts.history,
+            input=turn.user_input,
+            faq=faq
+        )
+        return messages, {"faq": faq, "examples": examples, "history": parts.history,
+                          "format": turn.compiled.format_fields, "input": turn.user_input}
+    
+    def _record_profile(self, profile: PromptProfile):
+        """Запоминает разбивку промпта шага и учитывает её в метриках"""
+        self.last_profile = profile
+        logging.info(f"Prompt tokens: {profile.total} {profile.sections}")
+        for section, tokens in profile.sections.items():
+            self.telemetry.inc("prompt_section_tokens", tokens, section=section)
+        for section, count in profile.trimmed.items():
+            self.telemetry.inc("prompt_trims", count, section=section)
+        if profile.trimmed:
+            logging.warning(f"Prompt trimmed from {profile.initial_total} to {profile.total} tokens: {profile.trimmed}")
+    
+    def profile_prompt(self, user_input: str) -> Optional[PromptProfile]:
+        """
+        Форматирует промпт шага так же, как chat, но без вызова модели и без записи в память
+        
+        Args:
+            user_input (str): Ввод пользователя
+            
+        Returns:
+            Optional[PromptProfile]: Разбивка промпта по разделам (over_budget — не уложился в бюджет);
+                                     None, если шаг обслуживается без модели (маршрутизатор или кэш)
+        """
+        return self._prepare_turn(user_input).profile
+    
+    def _invoke(self, turn: ChatTurn) -> Tuple[dict, bool]:
+        """Вызывает модель; одинаковые одновременные шаги разделяют один вызов"""
+        if turn.flight_key is None:
+            return self.llm_caller.call(self.llm_with_so.invoke, turn.prompt), False
+        return self.single_flight.do(turn.flight_key, self.llm_caller.call, self.llm_with_so.invoke, turn.prompt)
+    
+    async def _ainvoke(self, turn: ChatTurn) -> Tuple[dict, bool]:
+        """Асинхронная версия _invoke"""
+        if turn.flight_key is None:
+            return await self.llm_caller.acall(self.llm_with_so.ainvoke, turn.prompt), False
+        return await self.single_flight.ado(turn.flight_key, self.llm_caller.acall,
+                                            self.llm_with_so.ainvoke, turn.prompt)
+    
+    def _accept_response(self, turn: ChatTurn, response: dict, latency: float, shared: bool = False):
+        """Разбирает ответ LLM и сохраняет его в кэш"""
+        if shared:
+            # Ответ получен вызовом другой сессии: токены потратил и в кэш его положил ведущий шаг.
+            # Копия — чтобы сессии не делили один изменяемый объект
+            turn.reply, turn.route = response["parsed"].model_copy(deep=True), "coalesced"
+            return
+        usage = response["raw"].response_metadata["token_usage"]
+        total_tokens = usage["total_tokens"]
+        self.telemetry.count_tokens(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+        self._accept_reply(turn, response["parsed"], total_tokens, latency)
+    
+    def _accept_reply(self, turn: ChatTurn, reply: BotResponse, total_tokens: int, latency: float):
+        """Запоминает ответ шага и сохраняет его в кэш"""
+        turn.total_tokens = total_tokens
+        turn.reply = reply
+        if turn.cache_key:
+            self.cache.set(turn.cache_key, turn.reply, turn.total_tokens, latency)
+    
+    def _fallback(self, turn: ChatTurn, error: Exception):
+        """Отвечает fallback.no_data из руководства по стилю, если модель не ответила после всех попыток"""
+        if not self.llm_caller.policy.fallback:
+            raise error
+        logging.error(f"LLM unavailable, fallback reply: {type(error).__name__}: {error}")
+        style = self.style_guide
+        answer = style.get("fallback", {}).get("no_data", "У меня нет точной информации.")
+        tone = style.get("templates", {}).get("tone", DEFAULT_TONE)
+        # Ответ-заглушка не кэшируется: следующий такой же вопрос снова пойдёт в модель
+        turn.reply, turn.route = BotResponse(answer=answer, tone=tone, actions=[]), "fallback"
+        self.telemetry.inc("fallbacks", error=type(error).__name__)
+    
+    def _record_route(self, turn: ChatTurn, elapsed: float):
+        """Учитывает, кто ответил на шаг диалога, и полную задержку шага"""
+        self.last_route = turn.route
+        self.telemetry.inc("routes", route=turn.route)
+        self.telemetry.observe("turn_seconds", elapsed, route=turn.route)
+    
+    def _complete_turn(self, turn: ChatTurn, persist: bool = True) -> Tuple[BotResponse, int]:
+        """Сохраняет шаг диалога в память и, если persist, в хранилище сессий"""
+        self.last_prompt = turn.compiled
+        self.memory.chat_memory.add_user_message(turn.user_input)
+        self.memory.chat_memory.add_ai_message(turn.reply.answer)
+        if persist:
+            self._persist_turn(turn)
+        return turn.reply, turn.total_tokens
+    
+    def _persist_turn(self, turn: ChatTurn):
+        """Записывает шаг в хранилище сессий: сессию можно продолжить после перезапуска или в другом воркере"""
+        if self.session_store is None:
+            return
+        try:
+            self.session_store.append(self.session_id, make_turn(
+                turn.user_input, turn.reply.model_dump(), turn.total_tokens,
+                turn.compiled.version, turn.compiled.prompt_hash
+            ))
+        except Exception as e:
+            # Ответ пользователю уже готов, но шаг не попадёт в сохранённую историю — это видно в метриках
+            logging.error(f"Session store write failed: {e}")
+            self.telemetry.inc("session_store_errors", op="append", error=type(e).__name__)
+    
+    def chat(self, user_input: str) -> Tuple[BotResponse, int]:
         """
         Обрабатывает пользовательский ввод и возвращает структурированный ответ бота
         Использует пайплайн: prompt | llm
@@ -273,36 +904,163 @@ class ChatBot:
             user_input (str): Ввод пользователя
             
         Returns:
-            BotResponse: Структурированный ответ бота
+            Tuple[BotResponse, int]: Структурированный ответ бота и количество токенов
         """
-        # Проверяем команду /order
-        if user_input.startswith("/order "):
-            order_id = user_input.replace("/order ", "").strip()
-            user_input += f"\nИНФОРМАЦИЯ О ЗАКАЗЕ: {self.get_order_status(order_id)}"
+        telemetry = self.telemetry
+        turn_start = time.perf_counter()
+        with telemetry.trace("chat", session_id=self.session_id) as span:
+            with telemetry.span("prepare"):
+                turn = self._prepare_turn(user_input)
+            if turn.reply is None:
+                start = time.perf_counter()
+                try:
+                    with telemetry.span("llm", model=self.model_name):
+                        response, shared = self._invoke(turn)
+                except Exception as e:
+                    self._fallback(turn, e)
+                else:
+                    with telemetry.span("parse"):
+                        self._accept_response(turn, response, time.perf_counter() - start, shared)
+            with telemetry.span("memory"):
+                result = self._complete_turn(turn)
+            if span is not None:
+                span["route"] = turn.route
+        self._record_route(turn, time.perf_counter() - turn_start)
+        return result
+    
+    async def achat(self, user_input: str) -> Tuple[BotResponse, int]:
+        """
+        Асинхронная версия chat: не блокирует event loop на время запроса к LLM
         
-        # Получаем историю диалога из памяти
-        history = self.memory.chat_memory.messages
+        Args:
+            user_input (str): Ввод пользователя
+            
+        Returns:
+            Tuple[BotResponse, int]: Структурированный ответ бота и количество токенов
+        """
+        telemetry = self.telemetry
+        turn_start = time.perf_counter()
+        with telemetry.trace("chat", session_id=self.session_id) as span:
+            with telemetry.span("prepare"):
+                turn = self._prepare_turn(user_input)
+            if turn.reply is None:
+                start = time.perf_counter()
+                try:
+                    with telemetry.span("llm", model=self.model_name):
+                        response, shared = await self._ainvoke(turn)
+                except Exception as e:
+                    self._fallback(turn, e)
+                else:
+                    with telemetry.span("parse"):
+                        self._accept_response(turn, response, time.perf_counter() - start, shared)
+            with telemetry.span("memory"):
+                result = self._complete_turn(turn, persist=False)
+                if self.session_store is not None:
+                    # Запись в базу блокирующая: выполняется в потоке, не задерживая другие сессии
+                    await asyncio.to_thread(self._persist_turn, turn)
+            if span is not None:
+                span["route"] = turn.route
+        self._record_route(turn, time.perf_counter() - turn_start)
+        return result
+    
+    def chat_stream(self, user_input: str) -> "ReplyStream":
+        """
+        Обрабатывает пользовательский ввод, отдавая поле answer по мере генерации.
+        После завершения итерации в потоке доступны провалидированный BotResponse и токены.
         
-        # Создаем пайплайн: prompt | llm
-        # 1. Форматируем промпт с историей и пользовательским вводом
-        formatted_prompt = self.prompt.format_messages(
-            history=history,
-            input=user_input
-        )
+        Args:
+            user_input (str): Ввод пользователя
+            
+        Returns:
+            ReplyStream: Итератор по фрагментам ответа
+        """
+        return ReplyStream(self._stream_turn(user_input))
+    
+    def _stream_turn(self, user_input: str) -> Generator[str, None, Tuple[BotResponse, int]]:
+        """Генератор фрагментов answer из частично полученного JSON ответа модели"""
+        from langchain_core.utils.json import parse_partial_json
+        # Генератор прерывается на yield, поэтому спаны открываются только вокруг участков без yield,
+        # а время потокового вызова LLM замеряется вручную
+        telemetry = self.telemetry
+        turn_start = time.perf_counter()
+        with telemetry.span("prepare", session_id=self.session_id):
+            turn = self._prepare_turn(user_input)
+        start_wall, start = time.time(), time.perf_counter()
+        chunks = None
+        if turn.reply is None:
+            # Повторы возможны только до первого фрагмента: дальше ответ уже показывается пользователю
+            try:
+                chunks = self.llm_caller.open_stream(self.llm_stream.stream, turn.prompt)
+            except Exception as e:
+                self._fallback(turn, e)
+        if turn.reply is not None:
+            yield turn.reply.answer
+            with telemetry.span("memory", session_id=self.session_id):
+                result = self._complete_turn(turn)
+            self._record_route(turn, time.perf_counter() - turn_start)
+            return result
         
-        # 2. Вызываем LLM
-        response = self.llm_with_so.invoke(formatted_prompt)
-        total_tokens = response["raw"].response_metadata["token_usage"]["total_tokens"]
-        bot_replay = response["parsed"]
-
+        buffer, answer, total_tokens = "", "", 0
+        for chunk in chunks:
+            if chunk.usage_metadata:
+                total_tokens += chunk.usage_metadata.get("total_tokens", 0)
+                telemetry.count_tokens(chunk.usage_metadata.get("input_tokens", 0),
+                                       chunk.usage_metadata.get("output_tokens", 0))
+            if not isinstance(chunk.content, str) or not chunk.content:
+                continue
+            buffer += chunk.content
+            # Дописываем незакрытые скобки и кавычки, чтобы прочитать answer до конца генерации
+            partial = parse_partial_json(buffer)
+            current = partial.get("answer") if isinstance(partial, dict) else None
+            if isinstance(current, str) and len(current) > len(answer) and current.startswith(answer):
+                yield current[len(answer):]
+                answer = current
         
-        # 3. Сохраняем диалог в память
-        self.memory.chat_memory.add_user_message(user_input)
-        self.memory.chat_memory.add_ai_message(bot_replay.answer)
-                
-        return bot_replay, total_tokens
+        latency = time.perf_counter() - start
+        telemetry.record("llm", latency, start_wall, attrs={"session_id": self.session_id, "model": self.model_name})
+        with telemetry.span("parse", session_id=self.session_id):
+            reply = BotResponse.model_validate_json(buffer)
+        if reply.answer.startswith(answer) and len(reply.answer) > len(answer):
+            yield reply.answer[len(answer):]
+        self._accept_reply(turn, reply, total_tokens, latency)
+        with telemetry.span("memory", session_id=self.session_id):
+            result = self._complete_turn(turn)
+        self._record_route(turn, time.perf_counter() - turn_start)
+        return result
+
+
+class ReplyStream:
+    """
+    Итератор по фрагментам ответа бота. После окончания итерации содержит
+    итоговый BotResponse, количество токенов и время до первого фрагмента.
+    """
+    
+    def __init__(self, generator: Generator[str, None, Tuple[BotResponse, int]]):
+        self._generator = generator
+        self.reply: Optional[BotResponse] = None
+        self.total_tokens = 0
+        self.ttft: Optional[float] = None
+    
+    def __iter__(self) -> Iterator[str]:
+        start = time.perf_counter()
+        while True:
+            try:
+                delta = next(self._generator)
+            except StopIteration as stop:
+                self.reply, self.total_tokens = stop.value
+                return
+            if self.ttft is None:
+                self.ttft = time.perf_counter() - start
+                logging.info(f"Time to first token: {self.ttft:.3f}s")
+            yield delta
 
 
 BASE = Path(__file__).parent.parent
-STYLE = load_style_guide()
+
+
+def __getattr__(name: str):
+    # STYLE вычисляется при обращении, чтобы импорт модуля не читал style_guide.yaml
+    if name == "STYLE":
+        return get_registry().style_guide
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
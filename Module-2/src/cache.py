@@ -0,0 +1,220 @@
+"""
+Кэш ответов чат-бота: LRU+TTL в памяти и SQLite на диске
+"""
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Optional, Tuple
+
+from src.schema import BotResponse
+
+_SPACES_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s?!.,;:…]+$")
+
+
+def normalize_input(text: str) -> str:
+    """Нормализует вопрос для ключа кэша: регистр, ё → е, пробелы, финальная пунктуация"""
+    text = _SPACES_RE.sub(" ", text.lower().replace("ё", "е")).strip()
+    return _TRAILING_PUNCT_RE.sub("", text)
+
+
+def stable_hash(value) -> str:
+    """Возвращает sha1 от JSON-представления значения с сортировкой ключей"""
+    payload = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(user_input: str, prompt_version: str, model_name: str, style_hash: str,
+                   context_hash: str = "") -> str:
+    """
+    Строит ключ кэша ответа
+
+    Args:
+        user_input (str): Ввод пользователя
+        prompt_version (str): Версия промпта из prompts.yaml
+        model_name (str): Название модели
+        style_hash (str): Хэш руководства по стилю
+        context_hash (str): Хэш прочего контекста, влияющего на ответ (FAQ, история)
+
+    Returns:
+        str: Ключ кэша
+    """
+    return stable_hash([normalize_input(user_input), prompt_version, model_name, style_hash, context_hash])
+
+
+@dataclass
+class CacheStats:
+    """Статистика попаданий в кэш и сэкономленных ресурсов"""
+    hits: int = 0
+    misses: int = 0
+    skipped: int = 0
+    saved_tokens: int = 0
+    saved_latency_s: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 4)}
+
+
+class ResponseCache:
+    """
+    Базовый кэш ответов. Хранит BotResponse вместе с токенами и задержкой исходного вызова LLM.
+    """
+
+    def __init__(self, ttl: Optional[float] = 3600):
+        """
+        Args:
+            ttl (float): Время жизни записи в секундах. None — без ограничения
+        """
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._stats_lock = threading.Lock()
+
+    def _get_entry(self, key: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def _set_entry(self, key: str, entry: dict):
+        raise NotImplementedError
+
+    def _expired(self, entry: dict) -> bool:
+        return self.ttl is not None and time.time() - entry["created"] > self.ttl
+
+    def get(self, key: str) -> Optional[Tuple[BotResponse, int]]:
+        """
+        Возвращает закэшированный ответ и учитывает попадание/промах
+
+        Args:
+            key (str): Ключ кэша
+
+        Returns:
+            Optional[Tuple[BotResponse, int]]: Ответ и число токенов исходного вызова
+        """
+        entry = self._get_entry(key)
+        with self._stats_lock:
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self.stats.saved_tokens += entry["tokens"]
+            self.stats.saved_latency_s += entry["latency"]
+        return BotResponse.model_validate(entry["response"]), entry["tokens"]
+
+    def set(self, key: str, response: BotResponse, tokens: int = 0, latency: float = 0.0):
+        """
+        Сохраняет ответ в кэш
+
+        Args:
+            key (str): Ключ кэша
+            response (BotResponse): Ответ бота
+            tokens (int): Токены, потраченные на исходный вызов
+            latency (float): Задержка исходного вызова в секундах
+        """
+        self._set_entry(key, {
+            "response": response.model_dump(),
+            "tokens": tokens,
+            "latency": latency,
+            "created": time.time(),
+        })
+
+    def skip(self):
+        """Учитывает запрос, который не подлежит кэшированию"""
+        with self._stats_lock:
+            self.stats.skipped += 1
+
+
+class MemoryResponseCache(ResponseCache):
+    """
+    Кэш в памяти процесса с вытеснением по LRU и TTL
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 3600):
+        super().__init__(ttl)
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_entry(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _set_entry(self, key: str, entry: dict):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskResponseCache(ResponseCache):
+    """
+    Кэш на диске в SQLite: переживает перезапуск и разделяется между процессами
+    """
+
+    def __init__(self, path: Path, ttl: Optional[float] = 24 * 3600):
+        super().__init__(ttl)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, entry TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _get_entry(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT entry FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            entry = json.loads(row[0])
+            if self._expired(entry):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return entry
+
+    def _set_entry(self, key: str, entry: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (key, json.dumps(entry, ensure_ascii=False), entry["created"]),
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Удаляет устаревшие записи и возвращает их количество"""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+            return cur.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,148 @@
+"""
+Объединение одинаковых одновременных запросов (single flight): пока выполняется вызов с ключом K,
+остальные запросы с тем же ключом ждут его результат вместо собственного вызова
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from src.telemetry import Telemetry, get_telemetry
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """Ведущий запрос отменён до результата: один из ожидающих становится ведущим"""
+
+
+class _Call:
+    """Выполняющийся синхронный вызов и его результат"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Ведущий запрос выполняет вызов, ведомые с тем же ключом получают его результат или его исключение.
+    Ключ освобождается сразу по завершении вызова, поэтому результат не кэшируется: следующий
+    запрос после завершения снова вызовет модель (для этого есть ResponseCache).
+    """
+
+    def __init__(self, name: str = "chat", telemetry: Optional[Telemetry] = None):
+        """
+        Args:
+            name (str): Место вызова; метка метрик
+            telemetry (Telemetry): Сборщик метрик. По умолчанию общий для процесса get_telemetry()
+        """
+        self.name = name
+        self.telemetry = telemetry or get_telemetry()
+        self.leaders = 0
+        self.followers = 0
+        self._calls: Dict[str, _Call] = {}
+        self._futures: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, role: str):
+        with self._lock:
+            if role == "leader":
+                self.leaders += 1
+            else:
+                self.followers += 1
+        self.telemetry.inc("coalesce", site=self.name, role=role)
+
+    def stats(self) -> dict:
+        """Сколько вызовов выполнено и сколько запросов получили чужой результат"""
+        with self._lock:
+            total = self.leaders + self.followers
+            return {
+                "leaders": self.leaders,
+                "followers": self.followers,
+                "collapsed_rate": round(self.followers / total, 4) if total else 0.0,
+            }
+
+    def do(self, key: str, fn: Callable[..., T], *args, **kwargs) -> Tuple[T, bool]:
+        """
+        Синхронный вызов с объединением по ключу
+
+        Args:
+            key (str): Ключ запроса; одинаковый ключ означает одинаковый результат
+            fn (Callable): Вызов
+
+        Returns:
+            Tuple[T, bool]: Результат и True, если он получен вызовом другого запроса
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self._count("leader" if leader else "follower")
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    async def ado(self, key: str, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> Tuple[T, bool]:
+        """
+        Асинхронная версия do: fn возвращает корутину. Объединяются запросы одного event loop.
+        Отмена ведущего (клиент отключился, таймаут) не отменяет ожидающих: один из них
+        повторяет вызов уже как ведущий.
+        """
+        loop = asyncio.get_running_loop()
+        flight = (id(loop), key)
+        while True:
+            with self._lock:
+                future = self._futures.get(flight)
+                leader = future is None
+                if leader:
+                    future = self._futures[flight] = loop.create_future()
+            if leader:
+                break
+            try:
+                # shield: отмена ведомого не отменяет общий вызов
+                result = await asyncio.shield(future)
+            except _LeaderCancelled:
+                continue
+            except Exception:
+                self._count("follower")
+                raise
+            self._count("follower")
+            return result, True
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            self._finish(flight, future, _LeaderCancelled())
+            raise
+        except BaseException as e:
+            self._count("leader")
+            self._finish(flight, future, e)
+            raise
+        self._count("leader")
+        self._finish(flight, future, result=result)
+        return result, False
+
+    def _finish(self, flight: Tuple[int, str], future: asyncio.Future, error: Optional[BaseException] = None,
+                result: Any = None):
+        """Освобождает ключ и передаёт результат или исключение ожидающим"""
+        with self._lock:
+            del self._futures[flight]
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+            # Помечаем исключение полученным, даже если ожидающих не было
+            future.exception()
@@ -0,0 +1,104 @@
+"""
+Конкурентный прогон оценки: пул потоков, ограничение частоты, повторы с экспоненциальной задержкой
+"""
+import sys
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, TypeVar
+
+from src.rate_limit import RateLimiter
+
+T = TypeVar("T")
+
+
+def print_progress(done: int, total: int, elapsed: float):
+    """Печатает прогресс и пропускную способность прогона в stderr"""
+    rate = done / elapsed if elapsed > 0 else 0.0
+    eta = (total - done) / rate if rate > 0 else 0.0
+    print(f"\r[{done}/{total}] {rate:.2f} шт/с, осталось ~{eta:.0f} с", end="", file=sys.stderr, flush=True)
+    if done == total:
+        print(file=sys.stderr)
+
+
+class EvalRunner:
+    """
+    Выполняет задания в пуле потоков, пропуская каждый вызов LLM через общий RateLimiter
+    и повторяя неудачные вызовы с экспоненциальной задержкой и джиттером.
+    """
+
+    def __init__(self, workers: int = 4, limiter: Optional[RateLimiter] = None, retries: int = 3,
+                 backoff_base: float = 1.0, backoff_max: float = 30.0,
+                 progress: Optional[Callable[[int, int, float], None]] = print_progress):
+        """
+        Args:
+            workers (int): Количество параллельных потоков
+            limiter (RateLimiter): Ограничитель запросов и токенов в минуту
+            retries (int): Сколько раз повторять неудачный вызов
+            backoff_base (float): Начальная задержка перед повтором, с
+            backoff_max (float): Максимальная задержка перед повтором, с
+            progress (Callable): Обработчик прогресса (готово, всего, прошло секунд)
+        """
+        self.workers = workers
+        self.limiter = limiter or RateLimiter()
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.progress = progress
+
+    def call(self, fn: Callable[..., T], *args, tokens: int = 0, **kwargs) -> T:
+        """
+        Вызывает fn с учётом лимитов и повторами при ошибках
+
+        Args:
+            fn (Callable): Вызов LLM
+            tokens (int): Оценка токенов запроса для лимита tpm
+
+        Returns:
+            Результат fn
+        """
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(tokens)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+                logging.warning(f"LLM call failed ({e}), retry {attempt + 1}/{self.retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def map(self, fn: Callable[[T], dict], items: List[T]) -> List[dict]:
+        """
+        Применяет fn к каждому элементу параллельно и возвращает результаты в исходном порядке.
+        Ошибка в одном элементе не прерывает прогон: вместо результата сохраняется {"error": ...}
+
+        Args:
+            fn (Callable): Обработка одного элемента
+            items (List): Элементы для обработки
+
+        Returns:
+            List[dict]: Результаты в порядке items
+        """
+        results: List[Optional[dict]] = [None] * len(items)
+        done = 0
+        lock = threading.Lock()
+        start = time.perf_counter()
+
+        def run(index: int):
+            nonlocal done
+            try:
+                results[index] = fn(items[index])
+            except Exception as e:
+                logging.error(f"Evaluation of item {index} failed: {e}")
+                results[index] = {"error": str(e)}
+            with lock:
+                done += 1
+                if self.progress:
+                    self.progress(done, len(items), time.perf_counter() - start)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(run, range(len(items))))
+        return results
@@ -0,0 +1,79 @@
+"""
+Хранилище результатов оценки стиля с адресацией по содержимому
+"""
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from src.cache import stable_hash
+
+
+def make_eval_key(prompt: str, prompt_version: str, prompt_hash: str, model: str, grader_hash: str,
+                  context_hash: str = "") -> str:
+    """
+    Строит ключ результата оценки одного промпта
+
+    Args:
+        prompt (str): Текст промпта из набора оценки
+        prompt_version (str): Версия шаблона промпта чат-бота
+        prompt_hash (str): Хэш текста версии промпта и руководства по стилю
+        model (str): Модель (класс клиента и название), которая отвечала и оценивала
+        grader_hash (str): Хэш промптов грейдера
+        context_hash (str): Хэш прочих данных, влияющих на ответ (ChatBot.answer_context: FAQ, примеры, бюджет)
+
+    Returns:
+        str: Ключ результата
+    """
+    return stable_hash([prompt, prompt_version, prompt_hash, model, grader_hash, context_hash])
+
+
+class EvalStore:
+    """
+    Результаты оценки в SQLite по ключу make_eval_key: при повторном прогоне переиспользуются
+    элементы, у которых не изменились ни промпт, ни версия шаблона, ни стиль, ни модель, ни грейдер
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, item TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, dict]:
+        """Возвращает сохранённые результаты для тех ключей, что есть в хранилище"""
+        found = {}
+        with self._lock:
+            for key in set(keys):
+                row = self._conn.execute("SELECT item FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    found[key] = json.loads(row[0])
+        return found
+
+    def put_many(self, items: Dict[str, dict]):
+        """Сохраняет результаты одной транзакцией"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                [(key, json.dumps(item, ensure_ascii=False), now) for key, item in items.items()],
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.get_many([key]).get(key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,220 @@
+"""
+Локальная заглушка ChatOpenAI для бенчмарков и проверок без обращения к API
+"""
+import re
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from typing import Any, AsyncIterator, Iterator, List, Optional, get_args
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+from pydantic import BaseModel
+
+from src.schema import BotResponse
+from src.tokens import count_message_tokens, count_tokens
+
+FAKE_ANSWERS = [
+    "Стандартная доставка занимает 2–5 рабочих дней. Экспресс — 24–48 часов.",
+    "Вернуть товар можно в течение 14 дней. Сохраните чек и упаковку.",
+    "Промокод вводится в корзине перед оплатой. Один промокод на заказ.",
+    "У меня нет точной информации. Могу подключить оператора или оформить запрос.",
+]
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+_BATCH_ID_RE = re.compile(r"^\[(\d+)\]", re.MULTILINE)
+
+
+class FakeLLMError(RuntimeError):
+    """Внедрённый сбой модели-заглушки; по статусу похож на ответ API (по умолчанию 503)"""
+
+    def __init__(self, message: str, status_code: int = 503):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _digest(text: str) -> int:
+    return int(hashlib.sha1(text.encode("utf-8")).hexdigest(), 16)
+
+
+def _to_messages(value: Any) -> List[BaseMessage]:
+    """Приводит вход Runnable (PromptValue, список сообщений, строку) к списку сообщений"""
+    if hasattr(value, "to_messages"):
+        return value.to_messages()
+    if isinstance(value, str):
+        return [HumanMessage(content=value)]
+    return list(value)
+
+
+class FakeStructuredOutput(Runnable):
+    """
+    Аналог llm.with_structured_output(schema, include_raw=...): детерминированно по тексту
+    последнего сообщения заполняет BotResponse, Grade или пакет оценок и считает токены
+    """
+
+    def __init__(self, llm: "FakeChatModel", schema: type = BotResponse, include_raw: bool = False):
+        self.llm = llm
+        self.schema = schema
+        self.include_raw = include_raw
+
+    def _parsed(self, messages: List[BaseMessage]) -> BaseModel:
+        last = messages[-1].content if messages else ""
+        digest = _digest(last)
+        fields = self.schema.model_fields
+        if "answer" in fields:
+            return self.schema(
+                answer=FAKE_ANSWERS[digest % len(FAKE_ANSWERS)],
+                tone="да, вежливый и деловой тон",
+                actions=["Проверьте статус заказа командой /order <номер_заказа>"],
+            )
+        if "score" in fields:
+            return self.schema(score=70 + digest % 30, notes="Тон соответствует бренду")
+        if "grades" in fields:
+            item_schema = get_args(fields["grades"].annotation)[0]
+            grades = [item_schema(id=int(i), score=70 + _digest(f"{last}{i}") % 30, notes="Тон соответствует бренду")
+                      for i in _BATCH_ID_RE.findall(last)]
+            return self.schema(grades=grades)
+        raise ValueError(f"FakeChatModel не умеет заполнять схему {self.schema.__name__}")
+
+    def respond(self, messages: List[BaseMessage]) -> dict:
+        """Ответ без задержки в формате include_raw=True"""
+        parsed = self._parsed(messages)
+        prompt_tokens = count_message_tokens(messages, self.llm.model_name)
+        completion_tokens = count_tokens(parsed.model_dump_json(), self.llm.model_name)
+        raw = AIMessage(content="", response_metadata={
+            "model_name": self.llm.model_name,
+            "token_usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+        return {"raw": raw, "parsed": parsed, "parsing_error": None}
+
+    def _result(self, messages: List[BaseMessage]):
+        response = self.respond(messages)
+        self.llm.calls += 1
+        return response if self.include_raw else response["parsed"]
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        time.sleep(self.llm.sample_latency())
+        self.llm.maybe_fail()
+        return self._result(_to_messages(input))
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        await asyncio.sleep(self.llm.sample_latency())
+        self.llm.maybe_fail()
+        return self._result(_to_messages(input))
+
+
+class FakeChatModel:
+    """
+    Локальная модель с настраиваемым распределением задержки, совместимая с тем, как ChatBot
+    и style_eval используют ChatOpenAI: with_structured_output, bind, stream/astream
+    """
+
+    def __init__(self, model_name: str = "fake-gpt", latency: float = 0.05, distribution: str = "fixed",
+                 sigma: float = 0.5, seed: Optional[int] = None, stream_chunk_chars: int = 8,
+                 error_rate: float = 0.0, slow_rate: float = 0.0, slow_factor: float = 10.0,
+                 error_status: int = 503):
+        """
+        Args:
+            model_name (str): Название модели в метаданных ответа
+            latency (float): Средняя задержка ответа в секундах
+            distribution (str): Распределение задержки: "fixed", "uniform" (0..2×latency) или "lognormal"
+            sigma (float): Параметр разброса логнормального распределения
+            seed (int): Зерно генератора задержек для воспроизводимых прогонов
+            stream_chunk_chars (int): Размер фрагмента JSON при потоковой выдаче
+            error_rate (float): Доля вызовов, завершающихся FakeLLMError (после задержки)
+            slow_rate (float): Доля вызовов с задержкой, увеличенной в slow_factor раз (хвост задержки)
+            slow_factor (float): Во сколько раз медленнее «медленный» вызов
+            error_status (int): HTTP-статус внедрённого сбоя: 503/429 — временный, 4xx — ошибка запроса
+        """
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Неизвестное распределение '{distribution}', допустимые: {', '.join(LATENCY_DISTRIBUTIONS)}")
+        self.model_name = model_name
+        self.latency = latency
+        self.distribution = distribution
+        self.sigma = sigma
+        self.stream_chunk_chars = stream_chunk_chars
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.error_status = error_status
+        self.calls = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        """Случайная задержка одного вызова по выбранному распределению с учётом медленного хвоста"""
+        latency = self._base_latency()
+        if self.slow_rate > 0:
+            with self._random_lock:
+                if self._random.random() < self.slow_rate:
+                    latency *= self.slow_factor
+        return latency
+
+    def _base_latency(self) -> float:
+        if self.latency <= 0 or self.distribution == "fixed":
+            return max(self.latency, 0.0)
+        with self._random_lock:
+            if self.distribution == "uniform":
+                return self._random.uniform(0, 2 * self.latency)
+            # Среднее логнормального распределения равно latency
+            mu = -self.sigma ** 2 / 2
+            return self.latency * self._random.lognormvariate(mu, self.sigma)
+
+    def maybe_fail(self):
+        """Внедряет сбой с вероятностью error_rate"""
+        if self.error_rate <= 0:
+            return
+        with self._random_lock:
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.failures += 1
+        if failed:
+            raise FakeLLMError("Внедрённый сбой модели-заглушки", self.error_status)
+
+    def with_structured_output(self, schema: type, include_raw: bool = False, **kwargs) -> FakeStructuredOutput:
+        return FakeStructuredOutput(self, schema, include_raw)
+
+    def bind(self, **kwargs) -> "FakeChatModel":
+        return self
+
+    def _chunks(self, messages: List[BaseMessage]) -> List[AIMessageChunk]:
+        """Разбивает JSON ответа на фрагменты; последний фрагмент несёт usage_metadata"""
+        response = FakeStructuredOutput(self, BotResponse).respond(messages)
+        self.calls += 1
+        text = response["parsed"].model_dump_json()
+        usage = response["raw"].response_metadata["token_usage"]
+        step = self.stream_chunk_chars
+        chunks = [AIMessageChunk(content=text[i:i + step]) for i in range(0, len(text), step)]
+        chunks.append(AIMessageChunk(content="", usage_metadata={
+            "input_tokens": usage["prompt_tokens"],
+            "output_tokens": usage["completion_tokens"],
+            "total_tokens": usage["total_tokens"],
+        }))
+        return chunks
+
+    def stream(self, messages: List[BaseMessage], **kwargs) -> Iterator[AIMessageChunk]:
+        # Половина задержки — до первого фрагмента, остальное распределено по фрагментам
+        chunks = self._chunks(messages)
+        latency = self.sample_latency()
+        time.sleep(latency / 2)
+        self.maybe_fail()
+        for chunk in chunks:
+            yield chunk
+            time.sleep(latency / 2 / len(chunks))
+
+    async def astream(self, messages: List[BaseMessage], **kwargs) -> AsyncIterator[AIMessageChunk]:
+        chunks = self._chunks(messages)
+        latency = self.sample_latency()
+        await asyncio.sleep(latency / 2)
+        self.maybe_fail()
+        for chunk in chunks:
+            yield chunk
+            await asyncio.sleep(latency / 2 / len(chunks))
@@ -0,0 +1,98 @@
+"""
+Выбор примеров ответов (few-shot) из data/few_shots.jsonl по лексической близости к вводу
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
+
+from src.retrieval import BM25Index, load_index, read_jsonl
+from src.tokens import count_tokens, MESSAGE_OVERHEAD
+
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
+FEW_SHOTS_PATH = Path(__file__).parent.parent / "data" / "few_shots.jsonl"
+
+EXAMPLES_HEADER = "Примеры ответов в стиле бренда (ориентир по тону и формату, не по фактам):"
+
+
+def format_example(example: dict) -> str:
+    """Форматирует пару вопрос/ответ для подстановки в промпт"""
+    return f"В: {example.get('user', '')}\nО: {example.get('assistant', '')}"
+
+
+class FewShotSelector:
+    """
+    Индекс BM25 по вопросам из банка примеров. Индекс сохраняется рядом с файлом примеров
+    и перестраивается только при изменении файла. На каждом шаге в промпт попадают top-k
+    похожих примеров, пока они укладываются в бюджет токенов.
+    """
+
+    def __init__(self, path: Optional[Path] = None, k: int = 2, max_tokens: int = 300,
+                 model_name: Optional[str] = None, index_path: Optional[Path] = None):
+        """
+        Args:
+            path (Path): Путь к few_shots.jsonl. По умолчанию data/few_shots.jsonl
+            k (int): Сколько примеров добавлять на шаге
+            max_tokens (int): Бюджет токенов на блок примеров
+            model_name (str): Модель, по словарю которой считаются токены
+            index_path (Path): Путь к сохранённому индексу. По умолчанию рядом с файлом примеров
+        """
+        self.path = Path(path or FEW_SHOTS_PATH)
+        self.k = k
+        self.max_tokens = max_tokens
+        self.model_name = model_name
+        self.index: BM25Index = load_index(self.path, index_path, fields=("user",), reader=read_jsonl)
+        self.source_hash = self.index.source_hash
+        self._tokens: Optional[List[int]] = None
+        self._header_tokens = 0
+
+    def _example_tokens(self) -> List[int]:
+        # Стоимость примеров считается один раз и при первом шаге: подсчёт может подгрузить
+        # словарь tiktoken, а банк примеров неизменен до пересборки индекса
+        if self._tokens is None:
+            self._header_tokens = count_tokens(EXAMPLES_HEADER, self.model_name) + MESSAGE_OVERHEAD
+            self._tokens = [count_tokens(format_example(doc), self.model_name) for doc in self.index.docs]
+        return self._tokens
+
+    def select(self, user_input: str) -> List[dict]:
+        """
+        Подбирает примеры, похожие на ввод пользователя
+
+        Args:
+            user_input (str): Ввод пользователя
+
+        Returns:
+            List[dict]: Не более k примеров в порядке убывания близости, в пределах бюджета токенов
+        """
+        if self.k <= 0 or not self.index.docs:
+            return []
+        tokens = self._example_tokens()
+        ranked = sorted(self.index.scores(user_input).items(), key=lambda item: item[1], reverse=True)
+        selected, used = [], self._header_tokens
+        for doc_id, score in ranked:
+            if score <= 0 or len(selected) >= self.k:
+                break
+            if used + tokens[doc_id] > self.max_tokens:
+                # Длинный пример пропускаем: следующий по близости может уложиться в бюджет
+                continue
+            selected.append(self.index.docs[doc_id])
+            used += tokens[doc_id]
+        return selected
+
+    def render(self, examples: List[dict]) -> List[BaseMessage]:
+        """
+        Блок примеров для MessagesPlaceholder("examples") шаблона чата
+
+        Args:
+            examples (List[dict]): Примеры, выбранные select()
+
+        Returns:
+            List[BaseMessage]: Одно системное сообщение с примерами или пустой список
+        """
+        from langchain_core.messages import SystemMessage
+        if not examples:
+            return []
+        body = "\n\n".join(format_example(example) for example in examples)
+        return [SystemMessage(content=f"{EXAMPLES_HEADER}\n{body}")]
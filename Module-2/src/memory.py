@@ -0,0 +1,177 @@
+"""
+Память диалога с ограничением по токенам
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+# Сообщения langchain_core импортируются при первом использовании, а не при импорте модуля
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
+from src.tokens import count_tokens, MESSAGE_OVERHEAD
+
+SUMMARY_HEADER = "Краткое содержание предыдущей части диалога:"
+
+
+def extractive_summary(user_text: str, ai_text: str, max_chars: int = 160) -> str:
+    """Сжимает ход диалога в одну строку без обращения к LLM"""
+    def shorten(text: str) -> str:
+        text = " ".join(text.split())
+        return text if len(text) <= max_chars else text[: max_chars - 1] + "…"
+    return f"- Пользователь: {shorten(user_text)} → Бот: {shorten(ai_text)}"
+
+
+@dataclass
+class HistoryStats:
+    """Статистика истории, отправленной в LLM на последнем шаге"""
+    history_tokens: int = 0
+    messages_sent: int = 0
+    turns_verbatim: int = 0
+    turns_summarized: int = 0
+    turns_dropped: int = 0
+
+
+class TokenBudgetMemory:
+    """
+    Память диалога с бюджетом токенов: последние keep_last_turns ходов хранятся дословно,
+    более старые сворачиваются в краткое содержание, а при превышении бюджета
+    отбрасываются самые старые строки содержания и ходы.
+
+    Совместима с тем, как ChatBot использовал ConversationBufferMemory:
+    chat_memory.add_user_message / add_ai_message / messages и load_memory_variables.
+    """
+
+    memory_key = "history"
+
+    def __init__(self, max_tokens: int = 1500, keep_last_turns: int = 6, summarize: bool = True,
+                 summary_max_tokens: Optional[int] = None, model_name: Optional[str] = None,
+                 summarizer: Callable[[str, str], str] = extractive_summary):
+        """
+        Args:
+            max_tokens (int): Максимум токенов истории, отправляемой в LLM
+            keep_last_turns (int): Сколько последних ходов хранить дословно
+            summarize (bool): Сворачивать старые ходы в содержание (иначе — отбрасывать)
+            summary_max_tokens (int): Максимум токенов содержания. По умолчанию треть бюджета
+            model_name (str): Модель для подсчёта токенов
+            summarizer (Callable): Функция (вопрос, ответ) -> строка содержания
+        """
+        self.max_tokens = max_tokens
+        self.keep_last_turns = keep_last_turns
+        self.summarize = summarize
+        self.summary_max_tokens = summary_max_tokens if summary_max_tokens is not None else max_tokens // 3
+        self.model_name = model_name
+        self.summarizer = summarizer
+
+        # Каждый ход — список сообщений с уже посчитанными токенами: [(message, tokens), ...]
+        self._turns: deque = deque()
+        self._pending: List[tuple] = []
+        self._summary_lines: deque = deque()
+        self._summary_tokens = 0
+        self.turns_summarized = 0
+        self.turns_dropped = 0
+        self.last_stats = HistoryStats()
+
+    @property
+    def chat_memory(self) -> "TokenBudgetMemory":
+        """Совместимость с ConversationBufferMemory.chat_memory"""
+        return self
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        """Сообщения, которые будут отправлены в LLM в пределах бюджета"""
+        return self.load_memory_variables({})[self.memory_key]
+
+    def _count(self, message: BaseMessage) -> int:
+        return count_tokens(message.content, self.model_name) + MESSAGE_OVERHEAD
+
+    def add_message(self, message: BaseMessage):
+        """Добавляет сообщение; ответ бота завершает ход диалога"""
+        self._pending.append((message, self._count(message)))
+        if message.type == "ai":
+            self._turns.append(self._pending)
+            self._pending = []
+            self._compact()
+
+    def add_user_message(self, text: str):
+        from langchain_core.messages import HumanMessage
+        self.add_message(HumanMessage(content=text))
+
+    def add_ai_message(self, text: str):
+        from langchain_core.messages import AIMessage
+        self.add_message(AIMessage(content=text))
+
+    def clear(self):
+        self._turns.clear()
+        self._pending = []
+        self._summary_lines.clear()
+        self._summary_tokens = 0
+
+    def _compact(self):
+        """Сворачивает ходы, вышедшие за окно keep_last_turns"""
+        while len(self._turns) > self.keep_last_turns:
+            turn = self._turns.popleft()
+            if not self.summarize:
+                self.turns_dropped += 1
+                continue
+            user_text = " ".join(m.content for m, _ in turn if m.type == "human")
+            ai_text = " ".join(m.content for m, _ in turn if m.type == "ai")
+            line = self.summarizer(user_text, ai_text)
+            tokens = count_tokens(line, self.model_name)
+            self._summary_lines.append((line, tokens))
+            self._summary_tokens += tokens
+            self.turns_summarized += 1
+            while self._summary_tokens > self.summary_max_tokens and self._summary_lines:
+                _, dropped = self._summary_lines.popleft()
+                self._summary_tokens -= dropped
+                self.turns_dropped += 1
+
+    def load_memory_variables(self, inputs: dict) -> dict:
+        """
+        Возвращает историю в пределах бюджета токенов и обновляет last_stats.
+        Сначала в бюджет укладываются последние ходы, краткое содержание сокращается до остатка
+
+        Args:
+            inputs (dict): Не используется, нужен для совместимости с памятью LangChain
+
+        Returns:
+            dict: {"history": список сообщений}
+        """
+        # Берём ходы от последнего к первому, пока они помещаются в бюджет
+        selected, used = [], 0
+        for turn in reversed(self._turns):
+            turn_tokens = sum(tokens for _, tokens in turn)
+            if used + turn_tokens > self.max_tokens:
+                break
+            selected.append(turn)
+            used += turn_tokens
+
+        # Краткое содержание получает остаток бюджета: из него берутся самые новые строки, которые помещаются
+        summary_lines, summary_tokens = [], 0
+        if self._summary_lines:
+            header_tokens = count_tokens(SUMMARY_HEADER, self.model_name) + MESSAGE_OVERHEAD
+            budget = self.max_tokens - used - header_tokens
+            for line, tokens in reversed(self._summary_lines):
+                if summary_tokens + tokens > budget:
+                    break
+                summary_lines.append(line)
+                summary_tokens += tokens
+
+        messages = [message for turn in reversed(selected) for message, _ in turn]
+        if summary_lines:
+            from langchain_core.messages import SystemMessage
+            lines = "\n".join(reversed(summary_lines))
+            messages.insert(0, SystemMessage(content=f"{SUMMARY_HEADER}\n{lines}"))
+            summary_tokens += header_tokens
+
+        self.last_stats = HistoryStats(
+            history_tokens=used + summary_tokens,
+            messages_sent=len(messages),
+            turns_verbatim=len(selected),
+            turns_summarized=len(summary_lines),
+            turns_dropped=(self.turns_dropped + len(self._turns) - len(selected)
+                           + len(self._summary_lines) - len(summary_lines)),
+        )
+        return {self.memory_key: messages}
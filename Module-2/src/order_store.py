@@ -0,0 +1,390 @@
+"""
+Хранилища заказов: JSON-файл целиком в памяти и индексированная база SQLite на диске
+"""
+import os
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+
+from src.watch import PollingReloader, file_stamp
+
+DEFAULT_ORDERS_JSON = Path(__file__).parent.parent / "data" / "orders.json"
+DEFAULT_ORDERS_DB = Path(__file__).parent.parent / "data" / "orders.sqlite"
+
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+
+class OrderStore:
+    """
+    Базовый интерфейс хранилища заказов: поиск заказа по номеру
+    """
+
+    def get(self, order_id: str) -> Optional[dict]:
+        """
+        Возвращает данные заказа или None, если заказ не найден
+
+        Args:
+            order_id (str): Номер заказа
+
+        Returns:
+            Optional[dict]: Данные заказа
+        """
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, order_id: str) -> bool:
+        return self.get(order_id) is not None
+
+    def close(self):
+        """Освобождает ресурсы хранилища"""
+
+
+@dataclass(frozen=True)
+class OrdersSnapshot:
+    """
+    Неизменяемый снимок заказов: словарь из orders.json и небольшой слой обновлений из файла дельт
+    поверх него. None в слое обновлений означает удалённый заказ.
+    """
+    base: Dict[str, dict]
+    overlay: Dict[str, Optional[dict]]
+
+    def get(self, order_id: str) -> Optional[dict]:
+        if order_id in self.overlay:
+            return self.overlay[order_id]
+        return self.base.get(order_id)
+
+    def __len__(self) -> int:
+        added = sum(1 for k, v in self.overlay.items() if v is not None and k not in self.base)
+        removed = sum(1 for k, v in self.overlay.items() if v is None and k in self.base)
+        return len(self.base) + added - removed
+
+
+def apply_order_delta(orders: Dict[str, Optional[dict]], update: dict, current: Optional[dict]):
+    """
+    Применяет одну строку файла дельт к словарю обновлений
+
+    Args:
+        orders (dict): Изменяемая копия слоя обновлений
+        update (dict): {"id": ..., "order": {...} | null} — замена или удаление заказа,
+                       {"id": ..., "patch": {...}} — изменение отдельных полей
+        current (dict): Текущие данные заказа до обновления
+    """
+    order_id = str(update["id"])
+    if "patch" in update:
+        orders[order_id] = {**(current or {}), **update["patch"]}
+    elif "order" in update:
+        orders[order_id] = update["order"]
+    else:
+        raise ValueError(f"В обновлении заказа {order_id} нет поля order или patch")
+
+
+class JsonOrderStore(OrderStore, PollingReloader):
+    """
+    Заказы из orders.json, загруженные в словарь целиком (совместимый режим).
+
+    Обновления статусов дописываются в файл дельт (по умолчанию orders.delta.jsonl рядом с orders.json)
+    и применяются инкрементально: читаются только новые строки, слой обновлений копируется
+    и подменяется вместе со снимком. Переписанный orders.json перечитывается целиком.
+    Читатели не блокируются и всегда видят целый снимок.
+    """
+
+    def __init__(self, path: Path = DEFAULT_ORDERS_JSON, delta_path: Optional[Path] = None,
+                 check_interval: float = 1.0, compact_threshold: int = 10000):
+        """
+        Args:
+            path (Path): Путь к orders.json
+            delta_path (Path): Файл дельт. По умолчанию <orders>.delta.jsonl
+            check_interval (float): Как часто (в секундах) проверять файлы
+            compact_threshold (int): Размер слоя обновлений, после которого он вливается в основной словарь
+        """
+        PollingReloader.__init__(self, check_interval)
+        self.path = Path(path)
+        self.delta_path = Path(delta_path) if delta_path else self.path.with_suffix(".delta.jsonl")
+        self.compact_threshold = compact_threshold
+        self._base_stamp = None
+        self._delta_offset = 0
+        self._snapshot = OrdersSnapshot({}, {})
+        self._reload()
+
+    @property
+    def snapshot(self) -> OrdersSnapshot:
+        """Актуальный снимок заказов"""
+        self.refresh()
+        return self._snapshot
+
+    @property
+    def orders(self) -> Dict[str, dict]:
+        """Все заказы с учётом обновлений (копия)"""
+        snapshot = self.snapshot
+        merged = {**snapshot.base, **snapshot.overlay}
+        return {k: v for k, v in merged.items() if v is not None}
+
+    def get(self, order_id: str) -> Optional[dict]:
+        return self.snapshot.get(order_id)
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+    def _reload(self) -> bool:
+        snapshot, offset = self._snapshot, self._delta_offset
+        stamp = file_stamp(self.path)
+        if stamp != self._base_stamp:
+            base = {}
+            if stamp is not None:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    base = json.load(f)
+            # Новый orders.json: дельты применяются заново поверх него
+            snapshot, offset = OrdersSnapshot(base, {}), 0
+        delta_size = (file_stamp(self.delta_path) or (0, 0))[1]
+        if delta_size < offset:
+            # Файл дельт усечён или заменён — перечитываем его с начала
+            snapshot, offset = OrdersSnapshot(snapshot.base, {}), 0
+        if delta_size > offset:
+            snapshot, offset = self._apply_delta(snapshot, offset)
+        if snapshot is self._snapshot and offset == self._delta_offset:
+            return False
+        self._base_stamp = stamp
+        self._snapshot, self._delta_offset = snapshot, offset
+        return True
+
+    def _apply_delta(self, snapshot: OrdersSnapshot, offset: int) -> Tuple[OrdersSnapshot, int]:
+        """Применяет новые полные строки файла дельт, начиная с offset байт"""
+        with open(self.delta_path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # Последняя строка может быть дописана не до конца — она будет прочитана в следующий раз
+        complete = data[:data.rfind(b"\n") + 1]
+        if not complete:
+            return snapshot, offset
+        overlay = dict(snapshot.overlay)
+        for line in complete.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                update = json.loads(line)
+                order_id = str(update["id"])
+                current = overlay[order_id] if order_id in overlay else snapshot.base.get(order_id)
+                apply_order_delta(overlay, update, current)
+            except (ValueError, KeyError, TypeError) as e:
+                logging.warning(f"Skipping invalid order update in {self.delta_path}: {e}")
+        base = snapshot.base
+        if len(overlay) > self.compact_threshold:
+            # Слой обновлений разросся: вливаем его в новую копию основного словаря
+            merged = {**base, **overlay}
+            base, overlay = {k: v for k, v in merged.items() if v is not None}, {}
+        return OrdersSnapshot(base, overlay), offset + len(complete)
+
+
+class SqliteOrderStore(OrderStore):
+    """
+    Заказы в SQLite: таблица с первичным ключом по номеру заказа, поиск за O(log n)
+    без загрузки всей базы в память. Соединения открываются отдельно для каждого потока.
+    Каждый запрос читает текущие строки базы, поэтому обновления, записанные другим процессом
+    (import_orders.py --delta), видны без перезагрузки.
+    """
+
+    def __init__(self, path: Path = DEFAULT_ORDERS_DB):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"База заказов не найдена по пути: {self.path}")
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def get(self, order_id: str) -> Optional[dict]:
+        row = self._connection().execute("SELECT data FROM orders WHERE id = ?", (order_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def open_order_store(path: Optional[Path] = None) -> OrderStore:
+    """
+    Открывает хранилище заказов по пути, выбирая бэкенд по расширению файла.
+
+    По умолчанию используется путь из переменной окружения ORDERS_STORE, затем
+    data/orders.sqlite (если база уже импортирована) и, наконец, data/orders.json.
+
+    Args:
+        path (Path): Путь к orders.json или базе SQLite
+
+    Returns:
+        OrderStore: Хранилище заказов
+    """
+    if path is None:
+        env_path = os.getenv("ORDERS_STORE")
+        if env_path:
+            path = Path(env_path)
+        elif DEFAULT_ORDERS_DB.exists():
+            path = DEFAULT_ORDERS_DB
+        else:
+            path = DEFAULT_ORDERS_JSON
+    path = Path(path)
+    if path.suffix in SQLITE_SUFFIXES:
+        return SqliteOrderStore(path)
+    return JsonOrderStore(path)
+
+
+def iter_json_orders(path: Path, chunk_size: int = 1 << 20) -> Iterator[Tuple[str, dict]]:
+    """
+    Потоково читает orders.json вида {"<id>": {...}, ...}, не загружая файл целиком.
+
+    Args:
+        path (Path): Путь к orders.json
+        chunk_size (int): Размер читаемого блока в символах
+
+    Yields:
+        Tuple[str, dict]: Пары (номер заказа, данные заказа)
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_ws():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+
+        def expect(chars: str) -> str:
+            nonlocal pos
+            skip_ws()
+            if pos >= len(buf) or buf[pos] not in chars:
+                got = buf[pos] if pos < len(buf) else "конец файла"
+                raise ValueError(f"Ожидался один из символов {chars!r}, получено {got!r}")
+            pos += 1
+            return buf[pos - 1]
+
+        def decode():
+            nonlocal pos
+            skip_ws()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                    # Число на границе блока могло прочитаться не полностью
+                    if end < len(buf) or eof:
+                        pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                if not fill():
+                    continue
+
+        expect("{")
+        skip_ws()
+        if pos < len(buf) and buf[pos] == "}":
+            return
+        while True:
+            order_id = decode()
+            expect(":")
+            order = decode()
+            yield str(order_id), order
+            if expect(",}") == "}":
+                return
+
+
+def import_json_orders(json_path: Path, db_path: Path, batch_size: int = 10000) -> int:
+    """
+    Импортирует заказы из orders.json в базу SQLite. База собирается во временном
+    файле и атомарно подменяет существующую.
+
+    Args:
+        json_path (Path): Путь к orders.json
+        db_path (Path): Путь к создаваемой базе SQLite
+        batch_size (int): Количество заказов в одной пачке вставки
+
+    Returns:
+        int: Количество импортированных заказов
+    """
+    db_path = Path(db_path)
+    tmp_path = db_path.with_suffix(db_path.suffix + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("CREATE TABLE orders (id TEXT PRIMARY KEY, data TEXT NOT NULL) WITHOUT ROWID")
+        total, batch = 0, []
+        for order_id, order in iter_json_orders(json_path):
+            batch.append((order_id, json.dumps(order, ensure_ascii=False)))
+            if len(batch) >= batch_size:
+                conn.executemany("INSERT OR REPLACE INTO orders VALUES (?, ?)", batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            conn.executemany("INSERT OR REPLACE INTO orders VALUES (?, ?)", batch)
+            total += len(batch)
+        conn.commit()
+    finally:
+        conn.close()
+
+    tmp_path.replace(db_path)
+    return total
+
+
+def apply_order_deltas(delta_path: Path, db_path: Path) -> int:
+    """
+    Применяет файл дельт (формат JsonOrderStore) к базе SQLite одной транзакцией.
+    Читатели SqliteOrderStore видят либо старые, либо все новые статусы.
+
+    Args:
+        delta_path (Path): Путь к orders.delta.jsonl
+        db_path (Path): Путь к базе SQLite
+
+    Returns:
+        int: Количество применённых обновлений
+    """
+    conn = sqlite3.connect(db_path)
+    applied = 0
+    try:
+        with conn, open(delta_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                update = json.loads(line)
+                order_id = str(update["id"])
+                row = conn.execute("SELECT data FROM orders WHERE id = ?", (order_id,)).fetchone()
+                changes: Dict[str, Optional[dict]] = {}
+                apply_order_delta(changes, update, json.loads(row[0]) if row else None)
+                order = changes[order_id]
+                if order is None:
+                    conn.execute("DELETE FROM orders WHERE id = ?", (order_id,))
+                else:
+                    conn.execute("INSERT OR REPLACE INTO orders VALUES (?, ?)",
+                                 (order_id, json.dumps(order, ensure_ascii=False)))
+                applied += 1
+    finally:
+        conn.close()
+    return applied
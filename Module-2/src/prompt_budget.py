@@ -0,0 +1,171 @@
+"""
+Разбивка отформатированного промпта по разделам и ограничение его размера до вызова модели.
+Токены считаются локально (src/tokens.py).
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from src.tokens import count_tokens, count_message_tokens
+
+# Разделы промпта. "system" — персона, правила, ORDERS и текст шаблонов вокруг подстановок
+SECTIONS = ("system", "faq", "examples", "history", "format", "input")
+
+# Что сокращать, пока промпт не уложится в бюджет: сначала примеры (наименее похожие),
+# затем история (самые старые ходы целиком, краткое содержание — последним), затем FAQ (наименее релевантные записи).
+# Системные правила, формат ответа и ввод пользователя не сокращаются.
+TRIM_ORDER = ("examples", "history", "faq")
+
+
+class PromptBudgetError(ValueError):
+    """Промпт не укладывается в бюджет даже после сокращения всех разделов"""
+
+    def __init__(self, message: str, profile: "PromptProfile"):
+        super().__init__(message)
+        self.profile = profile
+
+
+@dataclass
+class PromptParts:
+    """Сокращаемые части промпта одного шага"""
+    # Примеры few-shot по убыванию близости
+    examples: List[dict] = field(default_factory=list)
+    # Сообщения истории от старых к новым; в начале может быть системное сообщение с кратким содержанием
+    history: list = field(default_factory=list)
+    # Записи FAQ по убыванию релевантности
+    faq: List[dict] = field(default_factory=list)
+
+    def trim(self, section: str) -> int:
+        """Убирает наименее ценный элемент раздела. Возвращает число убранных сообщений или записей; 0 — раздел уже пуст"""
+        items = getattr(self, section)
+        if not items:
+            return 0
+        if section == "history":
+            return self._trim_history()
+        # В примерах и FAQ ценнее первые по релевантности
+        items.pop()
+        return 1
+
+    def _trim_history(self) -> int:
+        """
+        Убирает самый старый ход целиком — вопрос и ответ на него, чтобы в истории не осталось ответа
+        без вопроса. Краткое содержание старой части диалога убирается, только когда ходов не осталось
+        """
+        history = self.history
+        start = 0
+        while start < len(history) and history[start].type == "system":
+            start += 1
+        if start == len(history):
+            history.pop(0)
+            return 1
+        end = start + 1
+        while end < len(history) and history[end].type != "human":
+            end += 1
+        del history[start:end]
+        return end - start
+
+
+@dataclass
+class PromptProfile:
+    """Размер промпта по разделам, в токенах"""
+    sections: Dict[str, int]
+    total: int
+    max_tokens: Optional[int] = None
+    # Размер до сокращения и сколько элементов (записей, сообщений истории) убрано из каждого раздела
+    initial_total: int = 0
+    trimmed: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def over_budget(self) -> bool:
+        return self.max_tokens is not None and self.total > self.max_tokens
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "max_tokens": self.max_tokens,
+            "initial_total": self.initial_total,
+            "sections": dict(self.sections),
+            "trimmed": dict(self.trimmed),
+            "over_budget": self.over_budget,
+        }
+
+
+# Содержимое разделов для подсчёта: строка (подстановка в шаблон) или список сообщений
+SectionContent = Union[str, list]
+Renderer = Callable[[PromptParts], Tuple[list, Dict[str, SectionContent]]]
+
+
+class PromptBudget:
+    """
+    Профилирует промпт по разделам и сокращает его до max_tokens в порядке trim_order
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, model_name: Optional[str] = None,
+                 trim_order: Tuple[str, ...] = TRIM_ORDER):
+        """
+        Args:
+            max_tokens (int): Максимум токенов промпта. None — только профилирование
+            model_name (str): Модель, по словарю которой считаются токены
+            trim_order (Tuple[str, ...]): Порядок сокращения разделов PromptParts
+        """
+        self.max_tokens = max_tokens
+        self.model_name = model_name
+        self.trim_order = trim_order
+
+    def profile(self, messages: list, sections: Dict[str, SectionContent]) -> PromptProfile:
+        """
+        Считает токены промпта и его разделов
+
+        Args:
+            messages (list): Отформатированные сообщения промпта
+            sections (Dict[str, SectionContent]): Содержимое разделов, кроме "system"
+
+        Returns:
+            PromptProfile: Разбивка; "system" — всё, что не вошло в остальные разделы,
+                           поэтому сумма разделов равна total
+        """
+        total = count_message_tokens(messages, self.model_name)
+        counts = {}
+        for name, content in sections.items():
+            if isinstance(content, str):
+                counts[name] = count_tokens(content, self.model_name)
+            else:
+                counts[name] = count_message_tokens(content, self.model_name)
+        ordered = {"system": max(total - sum(counts.values()), 0)}
+        ordered.update((name, counts.get(name, 0)) for name in SECTIONS[1:])
+        return PromptProfile(sections=ordered, total=total, max_tokens=self.max_tokens, initial_total=total)
+
+    def fit(self, parts: PromptParts, render: Renderer) -> Tuple[list, PromptProfile]:
+        """
+        Форматирует промпт и, если он больше max_tokens, сокращает части по одному элементу
+        (в истории — по одному ходу)
+
+        Args:
+            parts (PromptParts): Сокращаемые части; изменяются на месте
+            render (Renderer): Функция parts -> (сообщения, содержимое разделов для profile)
+
+        Returns:
+            Tuple[list, PromptProfile]: Сообщения, уложившиеся в бюджет, и их разбивка
+
+        Raises:
+            PromptBudgetError: Промпт больше max_tokens, а сокращать больше нечего
+        """
+        messages, sections = render(parts)
+        profile = self.profile(messages, sections)
+        if self.max_tokens is None or profile.total <= self.max_tokens:
+            return messages, profile
+        initial_total, trimmed = profile.total, {}
+        for section in self.trim_order:
+            # Токены разделов не складываются точно в токены промпта, поэтому после каждого шага
+            # промпт форматируется и считается заново; это происходит только при превышении бюджета
+            while profile.total > self.max_tokens and (removed := parts.trim(section)):
+                trimmed[section] = trimmed.get(section, 0) + removed
+                messages, sections = render(parts)
+                profile = self.profile(messages, sections)
+        profile.initial_total, profile.trimmed = initial_total, trimmed
+        if profile.over_budget:
+            raise PromptBudgetError(
+                f"Промпт занимает {profile.total} токенов при бюджете {self.max_tokens} "
+                f"после сокращения {', '.join(self.trim_order)}: {profile.sections}",
+                profile,
+            )
+        return messages, profile
@@ -0,0 +1,106 @@
+"""
+Ограничение частоты запросов к LLM: token bucket по запросам и токенам в минуту
+"""
+import time
+import threading
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Ведро токенов: вмещает capacity единиц и пополняется со скоростью rate единиц в секунду
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate_per_minute (float): Пополнение ведра в единицах в минуту
+            capacity (float): Ёмкость ведра. По умолчанию равна минутному лимиту
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Сколько секунд ждать, пока в ведре наберётся amount единиц"""
+        self._refill(now)
+        # Запрос больше ёмкости ведра пропускаем при полном ведре, иначе он ждал бы вечно
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= amount
+
+
+class RateLimiter:
+    """
+    Потокобезопасный ограничитель запросов в минуту (rpm) и токенов в минуту (tpm).
+    Лимит None отключает соответствующую проверку.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0):
+        """
+        Блокирует поток, пока не будет разрешён один запрос на tokens токенов
+
+        Args:
+            tokens (int): Оценка токенов запроса
+        """
+        while True:
+            wait = self._take(tokens)
+            if wait == 0.0:
+                return
+            time.sleep(wait)
+
+    def try_acquire(self, tokens: int = 0) -> bool:
+        """
+        Разрешает запрос на tokens токенов, только если лимит не требует ожидания
+
+        Args:
+            tokens (int): Оценка токенов запроса
+
+        Returns:
+            bool: True — запрос разрешён и учтён в лимите
+        """
+        return self._take(tokens) == 0.0
+
+    def _take(self, tokens: int) -> float:
+        """Учитывает запрос, если лимит позволяет; иначе возвращает, сколько секунд ждать"""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.requests is not None:
+                wait = max(wait, self.requests.wait_time(1, now))
+            if self.tokens is not None and tokens:
+                wait = max(wait, self.tokens.wait_time(tokens, now))
+            if wait == 0.0:
+                if self.requests is not None:
+                    self.requests.take(1)
+                if self.tokens is not None and tokens:
+                    self.tokens.take(tokens)
+            return wait
+
+    def settle(self, estimated: int, actual: int):
+        """
+        Корректирует бюджет токенов по фактическому расходу после ответа модели
+
+        Args:
+            estimated (int): Сколько токенов было зарезервировано в acquire
+            actual (int): Сколько токенов израсходовано на самом деле
+        """
+        if self.tokens is None:
+            return
+        with self._lock:
+            self.tokens._refill(time.monotonic())
+            self.tokens.take(actual - estimated)
@@ -0,0 +1,413 @@
+"""
+Устойчивость вызовов LLM: повторы с джиттером в пределах дедлайна, дублирующие (hedged)
+запросы после порога задержки и автомат отключения (circuit breaker)
+"""
+import time
+import random
+import asyncio
+import logging
+import threading
+import itertools
+import contextvars
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Iterator, Optional, Tuple, TypeVar
+
+from pydantic import ValidationError
+
+from src.telemetry import Telemetry, get_telemetry
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    """Автомат разомкнут: вызовы модели временно не выполняются"""
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    """
+    Настройки вызова модели в одном месте кода (ответ чат-бота, оценка грейдером)
+
+    Attributes:
+        max_attempts (int): Сколько всего попыток, включая первую
+        deadline (float): Общий бюджет времени на вызов со всеми повторами, с. None — без ограничения
+        attempt_timeout (float): Таймаут попытки с дублированием, с. Без дублирования вызов выполняется
+                                 в текущем потоке, и попытку ограничивает таймаут клиента модели
+        backoff_base (float): Начальная задержка перед повтором, с
+        backoff_max (float): Максимальная задержка перед повтором, с
+        hedge_quantile (float): Квантиль задержки успешных вызовов (например 0.95), после которого
+                                отправляется дублирующий запрос. None — без дублирования
+        hedge_after (float): Порог дублирования, пока не накоплено hedge_min_samples замеров. None — не дублировать
+        hedge_min_samples (int): Сколько замеров нужно, чтобы считать порог по квантилю
+        failure_threshold (int): Сколько ошибок подряд размыкают автомат
+        reset_timeout (float): Через сколько секунд разомкнутый автомат пропускает пробный вызов
+        fallback (bool): Отвечать fallback.no_data из руководства по стилю вместо ошибки
+    """
+    max_attempts: int = 3
+    deadline: Optional[float] = 30.0
+    attempt_timeout: Optional[float] = None
+    backoff_base: float = 0.25
+    backoff_max: float = 4.0
+    hedge_quantile: Optional[float] = None
+    hedge_after: Optional[float] = None
+    hedge_min_samples: int = 20
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    fallback: bool = True
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Ошибки клиента (4xx, кроме 429) и ошибки валидации повторять бессмысленно: запрос не изменится.
+    Остальные (таймауты, 429, 5xx, сетевые) считаются временными.
+    """
+    if isinstance(error, (CircuitOpenError, ValidationError)):
+        return False
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return not (isinstance(status, int) and 400 <= status < 500 and status != 429)
+
+
+class CircuitBreaker:
+    """
+    Автомат отключения: после failure_threshold ошибок подряд вызовы отклоняются сразу
+    на reset_timeout секунд, затем пропускается один пробный вызов. Успешная проба
+    замыкает автомат, ошибка снова размыкает.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, name: str = "llm",
+                 telemetry: Optional[Telemetry] = None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self.telemetry = telemetry or get_telemetry()
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Можно ли выполнить вызов сейчас"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._set_state("half_open")
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            if self.state != "closed":
+                self._set_state("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._set_state("open")
+
+    def _set_state(self, state: str):
+        logging.warning(f"Circuit breaker {self.name}: {self.state} -> {state}")
+        self.state = state
+        self.telemetry.inc("circuit_transitions", site=self.name, state=state)
+
+
+class LatencyTracker:
+    """Скользящее окно задержек успешных вызовов для порога дублирования"""
+
+    def __init__(self, window: int = 200):
+        self._values: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._values.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            values = sorted(self._values)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(len(values) * q))]
+
+
+EXECUTOR_WORKERS = 64
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Свободные потоки пула: попытки не встают в очередь пула, а зависшие и проигравшие попытки,
+# которые нельзя прервать, занимают не больше EXECUTOR_WORKERS потоков
+_executor_slots = threading.BoundedSemaphore(EXECUTOR_WORKERS)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Пул потоков для дублирующих запросов; создаётся при первом использовании"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="llm-call")
+    return _executor
+
+
+def _submit(fn: Callable[..., T], args: tuple, kwargs: dict) -> Optional[Future]:
+    """
+    Запускает вызов в пуле, если в нём есть свободный поток; None — пул занят.
+    Контекст копируется, чтобы спаны внутри вызова попали в текущую трассу
+    """
+    if not _executor_slots.acquire(blocking=False):
+        return None
+    try:
+        future = _get_executor().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+    except BaseException:
+        _executor_slots.release()
+        raise
+    future.add_done_callback(lambda _: _executor_slots.release())
+    return future
+
+
+def _close_result(future: Future):
+    """Закрывает результат ненужной попытки (например, открытый поток ответа)"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    close = getattr(future.result(), "close", None)
+    if callable(close):
+        close()
+
+
+def _discard(future: Future):
+    """Отменяет ненужную попытку, а если она уже выполняется — закрывает её результат по завершении"""
+    if not future.cancel():
+        future.add_done_callback(_close_result)
+
+
+class ResilientCaller:
+    """
+    Выполняет вызов модели по CallPolicy. Экземпляр хранит состояние автомата и окно задержек,
+    поэтому он общий для всех сессий, вызывающих модель в одном месте кода.
+    """
+
+    def __init__(self, policy: Optional[CallPolicy] = None, name: str = "llm", telemetry: Optional[Telemetry] = None):
+        """
+        Args:
+            policy (CallPolicy): Настройки повторов, дублирования и автомата
+            name (str): Место вызова; метка метрик и имя автомата в логах
+            telemetry (Telemetry): Сборщик метрик. По умолчанию общий для процесса get_telemetry()
+        """
+        self.policy = policy or CallPolicy()
+        self.name = name
+        self.telemetry = telemetry or get_telemetry()
+        self.breaker = CircuitBreaker(self.policy.failure_threshold, self.policy.reset_timeout, name, self.telemetry)
+        self.latencies = LatencyTracker()
+
+    def _hedge_delay(self) -> Optional[float]:
+        policy = self.policy
+        if policy.hedge_quantile is not None and len(self.latencies) >= policy.hedge_min_samples:
+            return self.latencies.quantile(policy.hedge_quantile)
+        return policy.hedge_after
+
+    def _backoff(self, attempt: int) -> float:
+        # Полный джиттер: повторы разных сессий не приходят к модели одновременно
+        return random.uniform(0, min(self.policy.backoff_max, self.policy.backoff_base * 2 ** (attempt - 1)))
+
+    def _remaining(self, deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else deadline - time.monotonic()
+
+    def _attempt_timeout(self, deadline: Optional[float]) -> Optional[float]:
+        timeouts = [t for t in (self.policy.attempt_timeout, self._remaining(deadline)) if t is not None]
+        return max(min(timeouts), 0.0) if timeouts else None
+
+    def _on_error(self, error: Exception, attempt: int, deadline: Optional[float]) -> float:
+        """Учитывает ошибку попытки и возвращает паузу перед повтором или пробрасывает ошибку"""
+        if not is_retryable(error):
+            # Модель ответила: ошибка в самом запросе, а не в доступности модели
+            self.breaker.record_success()
+            raise error
+        self.breaker.record_failure()
+        self.telemetry.inc("llm_failures", site=self.name, error=type(error).__name__)
+        if attempt >= self.policy.max_attempts:
+            raise error
+        delay = self._backoff(attempt)
+        remaining = self._remaining(deadline)
+        if remaining is not None and delay >= remaining:
+            raise error
+        self.telemetry.inc("llm_retries", site=self.name)
+        logging.warning(f"LLM call {self.name} failed ({type(error).__name__}: {error}), "
+                        f"retry {attempt}/{self.policy.max_attempts - 1} in {delay:.2f}s")
+        return delay
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            self.telemetry.inc("llm_rejected", site=self.name)
+            raise CircuitOpenError(f"Автомат {self.name} разомкнут, вызов модели пропущен")
+
+    def call(self, fn: Callable[..., T], *args, hedge: bool = True,
+             hedge_gate: Optional[Callable[[], bool]] = None, **kwargs) -> T:
+        """
+        Синхронный вызов с повторами, дублированием и автоматом
+
+        Args:
+            fn (Callable): Вызов модели
+            hedge (bool): Разрешить дублирующий запрос
+            hedge_gate (Callable): Вызывается перед дублирующим запросом; False — не отправлять его
+                                   (например, RateLimiter.try_acquire: дубль расходует тот же лимит)
+
+        Returns:
+            Результат fn
+
+        Raises:
+            CircuitOpenError: Автомат разомкнут
+            Exception: Ошибка последней попытки (TimeoutError при превышении таймаута)
+        """
+        deadline = time.monotonic() + self.policy.deadline if self.policy.deadline is not None else None
+        for attempt in itertools.count(1):
+            self._check_breaker()
+            start = time.perf_counter()
+            try:
+                result = self._attempt(fn, args, kwargs, deadline, hedge, hedge_gate)
+            except Exception as e:
+                time.sleep(self._on_error(e, attempt, deadline))
+                continue
+            self.breaker.record_success()
+            self.latencies.add(time.perf_counter() - start)
+            return result
+
+    def _attempt(self, fn: Callable[..., T], args: tuple, kwargs: dict, deadline: Optional[float], hedge: bool,
+                 hedge_gate: Optional[Callable[[], bool]] = None) -> T:
+        hedge_delay = self._hedge_delay() if hedge else None
+        if hedge_delay is None:
+            # Без дублирования вызов выполняется в текущем потоке: попытку и дедлайн ограничивает
+            # таймаут клиента модели, а число одновременных вызовов не упирается в размер пула
+            return fn(*args, **kwargs)
+
+        # С дублированием попытки выполняются в пуле, чтобы ждать первую из них
+        primary = _submit(fn, args, kwargs)
+        if primary is None:
+            self.telemetry.inc("llm_hedges_skipped", site=self.name, reason="pool")
+            return fn(*args, **kwargs)
+        timeout = self._attempt_timeout(deadline)
+        started = time.monotonic()
+        pending, hedge_at, hedged = {primary}, hedge_delay, False
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                limits = [t for t in (timeout, hedge_at) if t is not None]
+                wait_for = max(min(limits) - (time.monotonic() - started), 0.0) if limits else None
+                done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        self._count_hedge_result(hedged, future is primary)
+                        return future.result()
+                    error = future.exception()
+                elapsed = time.monotonic() - started
+                if pending and timeout is not None and elapsed >= timeout:
+                    raise TimeoutError(f"Вызов {self.name} не уложился в {timeout:.2f} с")
+                if pending and hedge_at is not None and elapsed >= hedge_at:
+                    hedge_at = None
+                    hedged = self._send_hedge(pending, hedge_gate, lambda: _submit(fn, args, kwargs))
+        finally:
+            # Поток нельзя прервать: проигравшая или зависшая попытка завершится по таймауту клиента,
+            # а её результат закрывается
+            for future in pending:
+                _discard(future)
+        raise error
+
+    def _send_hedge(self, pending: set, hedge_gate: Optional[Callable[[], bool]], start: Callable[[], Any]) -> bool:
+        """Отправляет дублирующий запрос, если его пропускают лимит и пул. Возвращает, отправлен ли он"""
+        if hedge_gate is not None and not hedge_gate():
+            self.telemetry.inc("llm_hedges_skipped", site=self.name, reason="rate_limit")
+            return False
+        task = start()
+        if task is None:
+            self.telemetry.inc("llm_hedges_skipped", site=self.name, reason="pool")
+            return False
+        pending.add(task)
+        self.telemetry.inc("llm_hedges", site=self.name)
+        return True
+
+    def _count_hedge_result(self, hedged: bool, primary_won: bool):
+        if hedged:
+            self.telemetry.inc("llm_hedge_results", site=self.name, winner="primary" if primary_won else "hedge")
+
+    async def acall(self, fn: Callable[..., Awaitable[T]], *args, hedge: bool = True,
+                    hedge_gate: Optional[Callable[[], bool]] = None, **kwargs) -> T:
+        """Асинхронная версия call: fn возвращает корутину (например, ainvoke)"""
+        deadline = time.monotonic() + self.policy.deadline if self.policy.deadline is not None else None
+        for attempt in itertools.count(1):
+            self._check_breaker()
+            start = time.perf_counter()
+            try:
+                result = await self._aattempt(fn, args, kwargs, deadline, hedge, hedge_gate)
+            except Exception as e:
+                await asyncio.sleep(self._on_error(e, attempt, deadline))
+                continue
+            self.breaker.record_success()
+            self.latencies.add(time.perf_counter() - start)
+            return result
+
+    async def _aattempt(self, fn: Callable[..., Awaitable[T]], args: tuple, kwargs: dict,
+                        deadline: Optional[float], hedge: bool, hedge_gate: Optional[Callable[[], bool]] = None) -> T:
+        timeout = self._attempt_timeout(deadline)
+        hedge_delay = self._hedge_delay() if hedge else None
+        if hedge_delay is None:
+            return await asyncio.wait_for(fn(*args, **kwargs), timeout)
+
+        started = time.monotonic()
+        primary = asyncio.ensure_future(fn(*args, **kwargs))
+        pending, hedge_at, hedged = {primary}, hedge_delay, False
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                limits = [t for t in (timeout, hedge_at) if t is not None]
+                wait_for = max(min(limits) - (time.monotonic() - started), 0.0) if limits else None
+                done, pending = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._count_hedge_result(hedged, task is primary)
+                        return task.result()
+                    error = task.exception()
+                elapsed = time.monotonic() - started
+                if pending and timeout is not None and elapsed >= timeout:
+                    raise TimeoutError(f"Вызов {self.name} не уложился в {timeout:.2f} с")
+                if pending and hedge_at is not None and elapsed >= hedge_at:
+                    hedge_at = None
+                    hedged = self._send_hedge(pending, hedge_gate, lambda: asyncio.ensure_future(fn(*args, **kwargs)))
+        finally:
+            # Проигравший запрос отменяется, чтобы не держать соединение
+            for task in pending:
+                task.cancel()
+        raise error
+
+    def open_stream(self, fn: Callable[..., Iterator[T]], *args, **kwargs) -> Iterator[T]:
+        """
+        Открывает потоковый вызов с повторами до получения первого фрагмента. Ошибка после
+        первого фрагмента пробрасывается: часть ответа уже показана пользователю. Поток не дублируется.
+        """
+        def first_chunk() -> Tuple[Any, Iterator[T]]:
+            iterator = iter(fn(*args, **kwargs))
+            try:
+                return next(iterator, None), iterator
+            except BaseException:
+                # Поток неудачной попытки закрывается до повтора, чтобы не держать два открытых ответа
+                close = getattr(iterator, "close", None)
+                if callable(close):
+                    close()
+                raise
+
+        # Без дублирования вызов выполняется в текущем потоке: поток ответа открывается там же, где читается
+        first, iterator = self.call(first_chunk, hedge=False)
+        return iterator if first is None else itertools.chain([first], iterator)
@@ -0,0 +1,278 @@
+"""
+Лексический поиск по FAQ (BM25) с токенизацией для русского языка
+"""
+import re
+import json
+import math
+import heapq
+import hashlib
+import logging
+from pathlib import Path
+from collections import Counter
+from typing import Callable, List, Dict, Optional, Sequence, Tuple
+
+from src.watch import PollingReloader, file_stamp
+
+INDEX_FORMAT_VERSION = 1
+
+FAQ_FIELDS = ("q", "a")
+
+_WORD_RE = re.compile(r"[a-zа-я0-9]+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+а без более бы был была были было быть в вам вас весь во вот все всё всего вы где да даже для до
+его ее её если есть еще ещё же за и из или им их к как какие какой когда ко кто ли либо мне может
+можно мой мы на над надо нас не него нее неё нет ни них но ну о об однако он она они оно от очень
+по под при про с со так также такой там те тем то того тоже той только том ты у уже хотя чего чей
+чем что чтобы чье чья эта эти это я
+""".split())
+
+# Окончания русских слов от длинных к коротким — облегчённый стеммер без внешних зависимостей
+_SUFFIXES = sorted(set("""
+иями ями ами ией иях ях ах ов ев ей ий ый ой ая яя ое ее ие ые ого его ому ему ым им ом ем ую юю
+ых их ешь ет ете ут ют ит ите ат ят ишь ила ило или ала ало али ать ять ить еть уть ться
+тся ия ья ье ью ию а я о е ы и у ю ь
+""".split()), key=len, reverse=True)
+
+MIN_STEM = 3
+
+
+def stem(word: str) -> str:
+    """Отсекает типичное окончание русского слова, оставляя основу не короче MIN_STEM"""
+    if not ("а" <= word[0] <= "я"):
+        return word
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Разбивает текст на нормализованные термы: нижний регистр, ё → е,
+    удаление стоп-слов и отсечение окончаний.
+
+    Args:
+        text (str): Исходный текст
+
+    Returns:
+        List[str]: Список термов
+    """
+    text = text.lower().replace("ё", "е")
+    return [stem(w) for w in _WORD_RE.findall(text) if w not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Инвертированный индекс BM25 по записям вида {"q": ..., "a": ...} (FAQ) или по другим текстовым полям
+    """
+
+    def __init__(self, docs: List[dict], k1: float = 1.5, b: float = 0.75, fields: Sequence[str] = FAQ_FIELDS):
+        """
+        Строит индекс по списку записей
+
+        Args:
+            docs (List[dict]): Записи FAQ
+            k1 (float): Параметр насыщения частоты терма
+            b (float): Параметр нормализации по длине документа
+            fields (Sequence[str]): Поля записи, по тексту которых ведётся поиск
+        """
+        self.docs = docs
+        self.k1 = k1
+        self.b = b
+        self.fields = list(fields)
+        self.source_hash = ""
+        self.doc_len: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        for doc_id, doc in enumerate(docs):
+            terms = tokenize(" ".join(str(doc.get(field, "")) for field in self.fields))
+            self.doc_len.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+        self._finalize()
+
+    def _finalize(self):
+        """Предвычисляет среднюю длину документа и IDF термов"""
+        n = len(self.docs)
+        self.avgdl = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[dict, float]]:
+        """
+        Возвращает top-k записей FAQ, релевантных запросу
+
+        Args:
+            query (str): Текст запроса
+            k (int): Количество результатов
+
+        Returns:
+            List[Tuple[dict, float]]: Пары (запись FAQ, score) по убыванию score
+        """
+        if k <= 0 or not self.docs:
+            return []
+        best = heapq.nlargest(k, self.scores(query).items(), key=lambda item: item[1])
+        return [(self.docs[doc_id], score) for doc_id, score in best]
+
+    def scores(self, query: str) -> Dict[int, float]:
+        """Score BM25 по номерам записей, в которых встречается хотя бы один терм запроса"""
+        avgdl = self.avgdl or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in plist:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def save(self, path: Path):
+        """Сохраняет индекс в JSON-файл"""
+        payload = {
+            "version": INDEX_FORMAT_VERSION,
+            "source_hash": self.source_hash,
+            "k1": self.k1,
+            "b": self.b,
+            "fields": self.fields,
+            "docs": self.docs,
+            "doc_len": self.doc_len,
+            "postings": self.postings,
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        """Загружает ранее сохранённый индекс без повторной токенизации"""
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        if payload.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия индекса: {payload.get('version')}")
+        index = cls.__new__(cls)
+        index.docs = payload["docs"]
+        index.k1 = payload["k1"]
+        index.b = payload["b"]
+        index.fields = payload.get("fields", list(FAQ_FIELDS))
+        index.source_hash = payload["source_hash"]
+        index.doc_len = payload["doc_len"]
+        index.postings = {term: [tuple(p) for p in plist] for term, plist in payload["postings"].items()}
+        index._finalize()
+        return index
+
+
+def file_hash(path: Path) -> str:
+    """Возвращает sha1 содержимого файла"""
+    return hashlib.sha1(path.read_bytes()).hexdigest()
+
+
+def read_jsonl(path: Path) -> List[dict]:
+    """Читает записи из JSONL-файла, пропуская пустые строки"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def read_json(path: Path) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_index(source_path: Path, index_path: Optional[Path] = None, fields: Sequence[str] = FAQ_FIELDS,
+               reader: Callable[[Path], List[dict]] = read_json) -> BM25Index:
+    """
+    Загружает сохранённый индекс или строит его заново, если исходный файл изменился.
+
+    Args:
+        source_path (Path): Путь к файлу с записями
+        index_path (Path): Путь к сохранённому индексу. По умолчанию рядом с исходным файлом
+        fields (Sequence[str]): Поля записей, по которым ведётся поиск
+        reader (Callable): Читает записи из исходного файла
+
+    Returns:
+        BM25Index: Готовый к поиску индекс
+    """
+    if index_path is None:
+        index_path = source_path.with_suffix(".index.json")
+    if not source_path.exists():
+        return BM25Index([], fields=fields)
+
+    source_hash = file_hash(source_path)
+    if index_path.exists():
+        try:
+            index = BM25Index.load(index_path)
+            if index.source_hash == source_hash and index.fields == list(fields):
+                return index
+        except (ValueError, KeyError, json.JSONDecodeError) as e:
+            logging.warning(f"Индекс {index_path} повреждён, перестраиваем: {e}")
+
+    index = BM25Index(reader(source_path), fields=fields)
+    index.source_hash = source_hash
+    try:
+        index.save(index_path)
+    except OSError as e:
+        logging.warning(f"Не удалось сохранить индекс {index_path}: {e}")
+    return index
+
+
+def load_faq_index(faq_path: Path, index_path: Optional[Path] = None) -> BM25Index:
+    """
+    Загружает индекс FAQ из файла или строит его заново, если FAQ изменился.
+
+    Args:
+        faq_path (Path): Путь к faq.json
+        index_path (Path): Путь к сохранённому индексу. По умолчанию рядом с faq.json
+
+    Returns:
+        BM25Index: Готовый к поиску индекс
+    """
+    return load_index(faq_path, index_path)
+
+
+class FaqSource(PollingReloader):
+    """
+    Индекс FAQ, который перестраивается при изменении faq.json без перезапуска процесса.
+    Новый индекс строится в потоке, заметившем изменение, и подменяется целиком; остальные
+    сессии в это время ищут по предыдущему.
+    """
+
+    def __init__(self, faq_path: Path, index_path: Optional[Path] = None, check_interval: float = 1.0):
+        """
+        Args:
+            faq_path (Path): Путь к faq.json
+            index_path (Path): Путь к сохранённому индексу. По умолчанию рядом с faq.json
+            check_interval (float): Как часто (в секундах) проверять faq.json
+        """
+        super().__init__(check_interval)
+        self.faq_path = Path(faq_path)
+        self.index_path = index_path
+        self._stamp = file_stamp(self.faq_path)
+        self._index = load_faq_index(self.faq_path, index_path)
+
+    @property
+    def index(self) -> BM25Index:
+        """Актуальный индекс FAQ"""
+        self.refresh()
+        return self._index
+
+    def _reload(self) -> bool:
+        stamp = file_stamp(self.faq_path)
+        if stamp == self._stamp:
+            return False
+        index = load_faq_index(self.faq_path, self.index_path)
+        self._stamp = stamp
+        if index.source_hash == self._index.source_hash:
+            # Файл перезаписан без изменений
+            return False
+        self._index = index
+        logging.info(f"FAQ reloaded: {len(index.docs)} entries")
+        return True
+
+
+def format_faq(entries: List[dict]) -> str:
+    """Форматирует записи FAQ для подстановки в системный промпт"""
+    return "\n".join(f"- В: {e.get('q', '')}\n  О: {e.get('a', '')}" for e in entries)
@@ -0,0 +1,153 @@
+"""
+Детерминированный маршрутизатор: отвечает без вызова LLM на /order и точные вопросы из FAQ
+"""
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from src.cache import normalize_input
+from src.order_store import OrderStore
+from src.schema import BotResponse
+
+ORDER_COMMAND = "/order"
+
+DEFAULT_TONE = "да, вежливый деловой тон"
+
+
+def _max_length(field: str) -> Optional[int]:
+    """Ограничение длины поля BotResponse из схемы"""
+    for constraint in BotResponse.model_fields[field].metadata:
+        if getattr(constraint, "max_length", None) is not None:
+            return constraint.max_length
+    return None
+
+
+# Более длинный ответ FAQ не пройдёт валидацию BotResponse: такой вопрос отвечает LLM
+ANSWER_MAX_LENGTH = _max_length("answer")
+
+DEFAULT_ORDER_TEMPLATES = {
+    "default": "Текущий статус заказа {order_id}: {status}.",
+    "not_found": "Заказ с номером {order_id} не найден. Пожалуйста, проверьте номер заказа.",
+    "missing_id": "Укажите номер заказа после команды: /order <номер_заказа>.",
+}
+
+
+@dataclass(frozen=True)
+class Route:
+    """Ответ, найденный без вызова модели"""
+    intent: str
+    reply: BotResponse
+
+
+def parse_order_command(user_input: str) -> Optional[str]:
+    """
+    Возвращает номер заказа из команды /order <номер>, "" для команды без номера
+    и None, если ввод не является командой /order
+    """
+    text = user_input.strip()
+    if text == ORDER_COMMAND:
+        return ""
+    if not text.startswith(ORDER_COMMAND + " "):
+        return None
+    return text[len(ORDER_COMMAND):].strip()
+
+
+def _render(template: str, fields: dict) -> Optional[str]:
+    try:
+        return template.format(**fields)
+    except (KeyError, IndexError, ValueError):
+        return None
+
+
+class FastPathRouter:
+    """
+    Отвечает по шаблонам из раздела templates руководства по стилю на интенты, ответ на которые
+    полностью определён данными: статус заказа из хранилища и ответ на точный вопрос из FAQ.
+    Остальной ввод возвращает None и уходит в LLM.
+    """
+
+    def __init__(self, faq_docs: Callable[[], List[dict]], order_store: OrderStore, style_guide: Callable[[], dict]):
+        """
+        Args:
+            faq_docs (Callable): Возвращает актуальные записи FAQ вида {"q": ..., "a": ...}; словарь точных
+                                 вопросов перестраивается, когда возвращается другой список
+            order_store (OrderStore): Хранилище заказов
+            style_guide (Callable): Возвращает актуальное руководство по стилю (шаблоны перечитываются
+                                    вместе с ним при горячей перезагрузке)
+        """
+        self.order_store = order_store
+        self.style_guide = style_guide
+        self.faq_docs = faq_docs
+        self._faq: Optional[Tuple[List[dict], Dict[str, str]]] = None
+
+    @property
+    def faq(self) -> Dict[str, str]:
+        """Ответы FAQ по нормализованному вопросу для актуального списка записей"""
+        docs = self.faq_docs()
+        cached = self._faq
+        if cached is None or cached[0] is not docs:
+            exact: Dict[str, str] = {}
+            for doc in docs:
+                answer = doc.get("a")
+                if not doc.get("q") or not answer:
+                    continue
+                if ANSWER_MAX_LENGTH is not None and len(answer) > ANSWER_MAX_LENGTH:
+                    continue
+                exact.setdefault(normalize_input(doc["q"]), answer)
+            # Пара (список, словарь) подменяется одним присваиванием
+            cached = self._faq = (docs, exact)
+        return cached[1]
+
+    def route(self, user_input: str) -> Optional[Route]:
+        """
+        Пытается ответить на ввод без вызова модели
+
+        Args:
+            user_input (str): Ввод пользователя
+
+        Returns:
+            Optional[Route]: Ответ и интент или None, если нужен вызов LLM
+        """
+        order_id = parse_order_command(user_input)
+        if order_id is not None:
+            reply, intent = self._order_reply(order_id), "order"
+        else:
+            answer = self.faq.get(normalize_input(user_input))
+            if answer is None:
+                return None
+            reply, intent = self._reply(answer, []), "faq"
+        return Route(intent, reply) if reply is not None else None
+
+    def _reply(self, answer: str, actions: List[str]) -> Optional[BotResponse]:
+        tone = self.style_guide().get("templates", {}).get("tone", DEFAULT_TONE)
+        try:
+            return BotResponse(answer=answer, tone=tone, actions=actions[:3])
+        except ValidationError as e:
+            # Шаблон из данных не уложился в схему ответа: отвечает LLM, а не ошибка пользователю
+            logging.warning(f"Fast path reply does not fit BotResponse, falling back to LLM: {e}")
+            return None
+
+    def _order_reply(self, order_id: str) -> Optional[BotResponse]:
+        templates = self.style_guide().get("templates", {})
+        texts = {**DEFAULT_ORDER_TEMPLATES, **templates.get("order", {})}
+        actions = templates.get("order_actions", {})
+        if not order_id:
+            return self._reply(texts["missing_id"], [])
+
+        order = self.order_store.get(order_id)
+        if order is None:
+            key, fields = "not_found", {"order_id": order_id}
+        else:
+            key = order.get("status", "default")
+            # Точка в конце значения не должна удваиваться с точкой шаблона
+            fields = {k: v.rstrip(".") if isinstance(v, str) else v for k, v in order.items()}
+            fields["order_id"] = order_id
+
+        answer = _render(texts.get(key, texts["default"]), fields)
+        if answer is None:
+            # В записи заказа нет поля, нужного шаблону статуса
+            key, answer = "default", _render(texts["default"], {"status": "", **fields})
+        rendered_actions = [a for a in (_render(t, fields) for t in actions.get(key, [])) if a]
+        return self._reply(answer, rendered_actions)
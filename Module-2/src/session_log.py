@@ -0,0 +1,186 @@
+"""
+Буферизованная запись логов сессий в фоновом потоке
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+LOGS_DIR = Path(__file__).parent.parent / "logs"
+
+FSYNC_POLICIES = ("never", "flush", "always")
+
+_STOP = object()
+
+
+def format_session_record(record: dict) -> dict:
+    """Приводит запись шага диалога к формату logs/session_<id>.jsonl"""
+    bot_reply = json.dumps(record.pop("bot_reply"), ensure_ascii=False, indent=4)
+    return {"dialog": f"User: {record.pop('user_input')}\nBot: {bot_reply}", **record}
+
+
+class SessionLogSink:
+    """
+    Пишет записи сессий в logs/session_<id>.jsonl из фонового потока.
+
+    Вызывающий поток только кладёт запись в очередь; сериализация и запись выполняются
+    пачками раз в flush_interval секунд (или при накоплении max_batch записей). Файлы
+    держатся открытыми (не более max_open_files), при превышении max_bytes файл ротируется.
+    """
+
+    def __init__(self, logs_dir: Path = LOGS_DIR, flush_interval: float = 1.0, max_batch: int = 1000,
+                 fsync: str = "never", max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                 max_open_files: int = 256):
+        """
+        Args:
+            logs_dir (Path): Каталог для файлов сессий
+            flush_interval (float): Максимальная задержка записи на диск, с
+            max_batch (int): Сколько записей накапливать до внеочередной записи
+            fsync (str): "never" — не вызывать fsync, "flush" — после каждой пачки, "always" — после каждой записи
+            max_bytes (int): Размер файла, после которого он ротируется. 0 — без ротации
+            backup_count (int): Сколько ротированных файлов хранить
+            max_open_files (int): Сколько файлов держать открытыми одновременно
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Неизвестная политика fsync '{fsync}', допустимые: {', '.join(FSYNC_POLICIES)}")
+        self.logs_dir = Path(logs_dir)
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_open_files = max_open_files
+        self.written = 0
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._files: "OrderedDict[Path, object]" = OrderedDict()
+        self._closed = False
+        self._flushed = threading.Condition()
+        self._enqueued = 0
+        self._processed = 0
+        self._thread = threading.Thread(target=self._run, name="session-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, session_id: str, record: dict):
+        """
+        Ставит запись в очередь на запись в файл сессии
+
+        Args:
+            session_id (str): Идентификатор сессии
+            record (dict): Запись; поля user_input и bot_reply (dict) сворачиваются в поле dialog
+        """
+        if self._closed:
+            raise RuntimeError("SessionLogSink уже закрыт")
+        with self._flushed:
+            self._enqueued += 1
+        self._queue.put((session_id, record))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Ждёт, пока все поставленные в очередь записи будут записаны на диск"""
+        with self._flushed:
+            target = self._enqueued
+            return self._flushed.wait_for(lambda: self._processed >= target, timeout)
+
+    def close(self):
+        """Дописывает очередь, закрывает файлы и останавливает фоновый поток"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch: List[Tuple[str, dict]] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    logging.error(f"Session log write failed: {e}")
+                with self._flushed:
+                    self._processed += len(batch)
+                    self._flushed.notify_all()
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def _write_batch(self, batch: List[Tuple[str, dict]]):
+        # Группируем по сессиям, чтобы писать в каждый файл одним вызовом write
+        lines: Dict[str, List[str]] = {}
+        for session_id, record in batch:
+            line = json.dumps(format_session_record(dict(record)), ensure_ascii=False)
+            lines.setdefault(session_id, []).append(line + "\n")
+        for session_id, session_lines in lines.items():
+            path = self.logs_dir / f"session_{session_id}.jsonl"
+            f = self._open(path)
+            if self.fsync == "always":
+                for line in session_lines:
+                    f.write(line)
+                    f.flush()
+                    os.fsync(f.fileno())
+            else:
+                f.write("".join(session_lines))
+                f.flush()
+                if self.fsync == "flush":
+                    os.fsync(f.fileno())
+            self.written += len(session_lines)
+            if self.max_bytes and f.tell() >= self.max_bytes:
+                self._rotate(path)
+
+    def _open(self, path: Path):
+        f = self._files.get(path)
+        if f is not None:
+            self._files.move_to_end(path)
+            return f
+        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        f = open(path, "a", encoding="utf-8")
+        self._files[path] = f
+        while len(self._files) > self.max_open_files:
+            _, oldest = self._files.popitem(last=False)
+            oldest.close()
+        return f
+
+    def _rotate(self, path: Path):
+        """Переименовывает session_x.jsonl -> .1 -> .2 ... и начинает новый файл"""
+        self._files.pop(path).close()
+        if self.backup_count <= 0:
+            path.unlink()
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            src = path.with_name(f"{path.name}.{i}")
+            if src.exists():
+                src.replace(path.with_name(f"{path.name}.{i + 1}"))
+        path.replace(path.with_name(f"{path.name}.1"))
+
+
+_sink: Optional[SessionLogSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_session_sink() -> SessionLogSink:
+    """Возвращает общий для процесса писатель логов сессий, создавая его при первом обращении"""
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = SessionLogSink()
+    return _sink
@@ -0,0 +1,342 @@
+"""
+Хранилища шагов диалога по session_id: в памяти процесса (для тестов) и в SQLite,
+общей для нескольких процессов-воркеров. Позволяют восстановить сессию после перезапуска.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_SESSIONS_DB = Path(__file__).parent.parent / "logs" / "sessions.sqlite"
+
+MEMORY_STORE = ":memory:"
+
+TURN_FIELDS = ("user_input", "answer", "bot_reply", "usage", "prompt_version", "prompt_hash", "created")
+
+_SESSION_FILE_RE = re.compile(r"^session_(?P<id>.+)\.jsonl(?:\.(?P<rotation>\d+))?$")
+
+
+def make_turn(user_input: str, bot_reply: dict, usage: int = 0, prompt_version: Optional[str] = None,
+              prompt_hash: Optional[str] = None, created: Optional[float] = None) -> dict:
+    """
+    Собирает запись одного шага диалога
+
+    Args:
+        user_input (str): Ввод пользователя в том виде, в каком он попал в память диалога
+        bot_reply (dict): Ответ бота (BotResponse.model_dump())
+        usage (int): Токены шага
+        prompt_version (str): Версия промпта
+        prompt_hash (str): Хэш промпта
+        created (float): Время шага, unix time. По умолчанию текущее
+
+    Returns:
+        dict: Запись шага
+    """
+    return {
+        "user_input": user_input,
+        "answer": bot_reply.get("answer", ""),
+        "bot_reply": bot_reply,
+        "usage": usage,
+        "prompt_version": prompt_version,
+        "prompt_hash": prompt_hash,
+        "created": created if created is not None else time.time(),
+    }
+
+
+class SessionStore:
+    """
+    Базовый интерфейс хранилища сессий: шаги дописываются по одному, а при восстановлении
+    сессии последние N шагов читаются одним запросом
+    """
+
+    def append(self, session_id: str, turn: dict):
+        """
+        Дописывает шаг в конец сессии
+
+        Args:
+            session_id (str): Идентификатор сессии
+            turn (dict): Запись шага (make_turn)
+        """
+        raise NotImplementedError
+
+    def import_turns(self, session_id: str, turns: List[dict]) -> int:
+        """
+        Записывает шаги сессии с номерами 1..n; уже записанные шаги с теми же номерами не меняются,
+        поэтому повторный импорт тех же логов не создаёт дублей
+
+        Returns:
+            int: Количество добавленных шагов
+        """
+        raise NotImplementedError
+
+    def load(self, session_id: str, last_n: Optional[int] = None) -> List[dict]:
+        """
+        Возвращает последние шаги сессии в хронологическом порядке
+
+        Args:
+            session_id (str): Идентификатор сессии
+            last_n (int): Сколько последних шагов вернуть. None — все
+
+        Returns:
+            List[dict]: Записи шагов; пустой список для неизвестной сессии
+        """
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        """Количество сессий"""
+        raise NotImplementedError
+
+    def __contains__(self, session_id: str) -> bool:
+        return bool(self.load(session_id, 1))
+
+    def close(self):
+        """Освобождает ресурсы хранилища"""
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Сессии в словаре процесса: без диска, для тестов и бенчмарков
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, List[dict]] = {}
+        self._lock = threading.Lock()
+
+    def append(self, session_id: str, turn: dict):
+        with self._lock:
+            self._sessions.setdefault(session_id, []).append(dict(turn))
+
+    def import_turns(self, session_id: str, turns: List[dict]) -> int:
+        with self._lock:
+            stored = self._sessions.setdefault(session_id, [])
+            added = turns[len(stored):]
+            stored.extend(dict(turn) for turn in added)
+            return len(added)
+
+    def load(self, session_id: str, last_n: Optional[int] = None) -> List[dict]:
+        with self._lock:
+            turns = self._sessions.get(session_id, [])
+            if last_n is not None:
+                turns = turns[-last_n:] if last_n > 0 else []
+            return [dict(turn) for turn in turns]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+# Сколько раз пытаться записать шаг, если база занята дольше busy_timeout, и пауза между попытками, с
+APPEND_ATTEMPTS = 3
+APPEND_BACKOFF = 0.05
+
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    """База занята другим соединением (SQLITE_BUSY / SQLITE_LOCKED)"""
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Сессии в SQLite: таблица с первичным ключом (session_id, seq), поэтому последние N шагов
+    сессии читаются одним индексным запросом. Журнал WAL позволяет нескольким процессам
+    читать базу одновременно с записью. Соединения открываются отдельно для каждого потока.
+    """
+
+    def __init__(self, path: Path = DEFAULT_SESSIONS_DB, busy_timeout: float = 5.0):
+        """
+        Args:
+            path (Path): Путь к базе. Создаётся при первом открытии
+            busy_timeout (float): Сколько ждать, пока другой процесс держит блокировку записи, с
+        """
+        self.path = Path(path)
+        self.busy_timeout = busy_timeout
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            "session_id TEXT NOT NULL, seq INTEGER NOT NULL, created REAL NOT NULL, "
+            "user_input TEXT NOT NULL, answer TEXT NOT NULL, bot_reply TEXT NOT NULL, usage INTEGER NOT NULL, "
+            "prompt_version TEXT, prompt_hash TEXT, PRIMARY KEY (session_id, seq)) WITHOUT ROWID"
+        )
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+            # В режиме WAL synchronous=NORMAL не теряет целостность базы при сбое, но не делает fsync на каждый шаг
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(session_id: str, seq: int, turn: dict) -> tuple:
+        return (session_id, seq, turn.get("created") or time.time(), turn.get("user_input", ""),
+                turn.get("answer", ""), json.dumps(turn.get("bot_reply", {}), ensure_ascii=False),
+                turn.get("usage", 0), turn.get("prompt_version"), turn.get("prompt_hash"))
+
+    def append(self, session_id: str, turn: dict):
+        conn = self._connection()
+        row = self._row(session_id, 0, turn)
+        for attempt in range(1, APPEND_ATTEMPTS + 1):
+            try:
+                # IMMEDIATE берёт блокировку записи в начале транзакции и ждёт её busy_timeout:
+                # отложенная транзакция, уже прочитавшая базу, при записи другого воркера получила бы
+                # SQLITE_BUSY без ожидания. Номер шага вычисляется в том же операторе, поэтому
+                # два воркера не получат одинаковый seq
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "INSERT INTO turns SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ?, ?, ?, ?, ? "
+                    "FROM turns WHERE session_id = ?",
+                    (row[0], *row[2:], session_id),
+                )
+                conn.commit()
+                return
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                if attempt == APPEND_ATTEMPTS or not _is_busy(e):
+                    raise
+                time.sleep(APPEND_BACKOFF * attempt)
+
+    def import_turns(self, session_id: str, turns: List[dict]) -> int:
+        conn = self._connection()
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO turns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [self._row(session_id, seq, turn) for seq, turn in enumerate(turns, start=1)],
+        )
+        conn.commit()
+        return conn.total_changes - before
+
+    def load(self, session_id: str, last_n: Optional[int] = None) -> List[dict]:
+        limit = -1 if last_n is None else max(last_n, 0)
+        rows = self._connection().execute(
+            "SELECT user_input, answer, bot_reply, usage, prompt_version, prompt_hash, created "
+            "FROM turns WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+            (session_id, limit),
+        ).fetchall()
+        turns = []
+        for row in reversed(rows):
+            turn = dict(zip(TURN_FIELDS, row))
+            turn["bot_reply"] = json.loads(turn["bot_reply"])
+            turns.append(turn)
+        return turns
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(DISTINCT session_id) FROM turns").fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def open_session_store(path: Optional[Path] = None) -> Optional[SessionStore]:
+    """
+    Открывает хранилище сессий. По умолчанию путь берётся из переменной окружения SESSION_STORE;
+    если она не задана, сессии не сохраняются и возвращается None.
+
+    Args:
+        path (Path): Путь к базе SQLite или ":memory:" для хранилища в памяти процесса
+
+    Returns:
+        Optional[SessionStore]: Хранилище сессий
+    """
+    if path is None:
+        path = os.getenv("SESSION_STORE") or None
+        if path is None:
+            return None
+    if str(path) == MEMORY_STORE:
+        return MemorySessionStore()
+    return SqliteSessionStore(Path(path))
+
+
+def parse_session_record(record: dict) -> dict:
+    """
+    Восстанавливает запись шага из строки logs/session_<id>.jsonl
+
+    Args:
+        record (dict): Запись с полем dialog вида "User: ...\\nBot: {...}"
+
+    Returns:
+        dict: Запись шага (make_turn)
+    """
+    dialog = record["dialog"]
+    if not dialog.startswith("User: "):
+        raise ValueError("Поле dialog должно начинаться с 'User: '")
+    # Ответ бота — JSON-объект, а ввод пользователя может содержать переводы строк
+    separator = dialog.find("\nBot: {")
+    if separator < 0:
+        raise ValueError("В поле dialog нет ответа бота")
+    user_input = dialog[len("User: "):separator]
+    bot_reply = json.loads(dialog[separator + len("\nBot: "):])
+    return make_turn(user_input, bot_reply, record.get("usage") or 0, record.get("prompt_version"),
+                     record.get("prompt_hash"))
+
+
+def iter_session_logs(logs_dir: Path) -> Iterator[Tuple[str, List[Path]]]:
+    """
+    Находит файлы логов сессий вместе с ротированными частями
+
+    Yields:
+        Tuple[str, List[Path]]: session_id и файлы сессии от самого старого к текущему
+    """
+    sessions: Dict[str, List[Tuple[int, Path]]] = {}
+    for path in Path(logs_dir).iterdir():
+        match = _SESSION_FILE_RE.match(path.name)
+        if match:
+            rotation = int(match.group("rotation") or 0)
+            sessions.setdefault(match.group("id"), []).append((rotation, path))
+    for session_id, files in sorted(sessions.items()):
+        # session_x.jsonl.5 старше session_x.jsonl.1, а текущий файл — самый новый
+        yield session_id, [path for _, path in sorted(files, reverse=True)]
+
+
+def read_session_files(paths: Iterable[Path]) -> Tuple[List[dict], int]:
+    """
+    Читает шаги сессии из её файлов логов
+
+    Returns:
+        Tuple[List[dict], int]: Шаги и количество пропущенных повреждённых строк
+    """
+    turns, skipped = [], 0
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    turns.append(parse_session_record(json.loads(line)))
+                except (ValueError, KeyError, TypeError):
+                    skipped += 1
+    return turns, skipped
+
+
+def import_session_logs(logs_dir: Path, store: SessionStore) -> Dict[str, int]:
+    """
+    Импортирует существующие logs/session_<id>.jsonl в хранилище сессий. Повторный запуск
+    дописывает только шаги, которых ещё нет в хранилище.
+
+    Args:
+        logs_dir (Path): Каталог с логами сессий
+        store (SessionStore): Хранилище, куда импортируются шаги
+
+    Returns:
+        Dict[str, int]: Количество сессий, прочитанных и добавленных шагов, пропущенных строк
+    """
+    stats = {"sessions": 0, "turns": 0, "imported": 0, "skipped": 0}
+    for session_id, paths in iter_session_logs(logs_dir):
+        turns, skipped = read_session_files(paths)
+        stats["sessions"] += 1
+        stats["turns"] += len(turns)
+        stats["skipped"] += skipped
+        stats["imported"] += store.import_turns(session_id, turns)
+    return stats
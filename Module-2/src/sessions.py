@@ -0,0 +1,162 @@
+"""
+Менеджер множества одновременных сессий поверх общих данных чат-бота
+"""
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from src.brand_chain import ChatBot
+from src.schema import BotResponse
+
+
+class SessionManager:
+    """
+    Хранит сессии ChatBot по session_id. Все сессии разделяют FAQ, заказы, промпт и модель
+    базового бота; у каждой своя память. Неактивные сессии вытесняются по LRU и idle_ttl.
+    """
+
+    def __init__(self, base_bot: Optional[ChatBot] = None, max_sessions: int = 10000,
+                 idle_ttl: Optional[float] = 1800, **chatbot_kwargs):
+        """
+        Args:
+            base_bot (ChatBot): Бот, чьи данные разделяются между сессиями. По умолчанию ChatBot(**chatbot_kwargs)
+            max_sessions (int): Максимум одновременно хранимых сессий
+            idle_ttl (float): Через сколько секунд простоя сессия вытесняется. None — без ограничения
+        """
+        self.base_bot = base_bot or ChatBot(**chatbot_kwargs)
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.evicted = 0
+        # session_id -> (бот, время последнего обращения)
+        self._sessions: "OrderedDict[str, Tuple[ChatBot, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Создание сессии (fork и чтение истории из хранилища) идёт под замком этой сессии, а не общим
+        self._creation_locks: Dict[str, threading.Lock] = {}
+        self._async_locks: Dict[str, asyncio.Lock] = {}
+        # Сколько шагов сессии выполняется сейчас; такие сессии не вытесняются
+        self._in_flight: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def peek(self, session_id: str) -> Optional[ChatBot]:
+        """Бот сессии, если она хранится; не создаёт сессию и не обновляет время обращения"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return entry[0] if entry is not None else None
+
+    def _touch(self, session_id: str) -> Optional[ChatBot]:
+        """Отмечает обращение к хранимой сессии; None — сессии нет"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (entry[0], time.monotonic())
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def get(self, session_id: str) -> ChatBot:
+        """
+        Возвращает бота сессии, создавая его при первом обращении
+
+        Args:
+            session_id (str): Идентификатор сессии
+
+        Returns:
+            ChatBot: Бот сессии
+        """
+        bot = self._touch(session_id)
+        if bot is not None:
+            return bot
+        with self._lock:
+            creation_lock = self._creation_locks.setdefault(session_id, threading.Lock())
+        with creation_lock:
+            bot = self._touch(session_id)
+            if bot is None:
+                # Чтение истории из хранилища не держит общий замок: остальные сессии не ждут
+                bot = self.base_bot.fork(session_id)
+                now = time.monotonic()
+                with self._lock:
+                    self._sessions[session_id] = (bot, now)
+                    self._evict(now)
+            with self._lock:
+                self._creation_locks.pop(session_id, None)
+        return bot
+
+    async def aget(self, session_id: str) -> ChatBot:
+        """Асинхронная версия get: новая сессия создаётся в потоке, не блокируя event loop"""
+        bot = self._touch(session_id)
+        if bot is None:
+            bot = await asyncio.to_thread(self.get, session_id)
+        return bot
+
+    def _evict(self, now: float):
+        """
+        Вытесняет самые давние сессии сверх лимита и простаивающие дольше idle_ttl.
+        Сессии с выполняющимся шагом пропускаются. Вызывается под self._lock
+        """
+        victims = []
+        over = len(self._sessions) - self.max_sessions
+        for session_id, (_, last_used) in self._sessions.items():
+            idle = self.idle_ttl is not None and now - last_used > self.idle_ttl
+            if not idle and over <= 0:
+                break
+            if self._in_flight.get(session_id):
+                continue
+            victims.append(session_id)
+            over -= 1
+        for session_id in victims:
+            del self._sessions[session_id]
+            self._async_locks.pop(session_id, None)
+            self.evicted += 1
+            logging.info(f"Session {session_id} evicted")
+
+    def close(self, session_id: str):
+        """Завершает сессию и освобождает её память"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if not self._in_flight.get(session_id):
+                self._async_locks.pop(session_id, None)
+
+    def _begin_turn(self, session_id: str) -> asyncio.Lock:
+        """Отмечает шаг сессии выполняющимся и возвращает замок, упорядочивающий её асинхронные шаги"""
+        with self._lock:
+            self._in_flight[session_id] = self._in_flight.get(session_id, 0) + 1
+            return self._async_locks.setdefault(session_id, asyncio.Lock())
+
+    def _end_turn(self, session_id: str):
+        with self._lock:
+            count = self._in_flight.pop(session_id) - 1
+            if count:
+                self._in_flight[session_id] = count
+            elif session_id not in self._sessions:
+                # Сессия закрыта во время шага: замок больше не нужен
+                self._async_locks.pop(session_id, None)
+
+    def chat(self, session_id: str, user_input: str) -> Tuple[BotResponse, int]:
+        """Обрабатывает ввод пользователя в рамках сессии"""
+        # Шаг отмечается до get, чтобы сессию не вытеснили между созданием и вызовом
+        self._begin_turn(session_id)
+        try:
+            return self.get(session_id).chat(user_input)
+        finally:
+            self._end_turn(session_id)
+
+    async def achat(self, session_id: str, user_input: str) -> Tuple[BotResponse, int]:
+        """
+        Асинхронно обрабатывает ввод пользователя. Шаги одной сессии выполняются
+        по очереди, разные сессии — конкурентно.
+        """
+        lock = self._begin_turn(session_id)
+        try:
+            bot = await self.aget(session_id)
+            async with lock:
+                return await bot.achat(user_input)
+        finally:
+            self._end_turn(session_id)
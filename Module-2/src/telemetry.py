@@ -0,0 +1,266 @@
+"""
+Трассировка этапов и метрики чат-бота: спаны с замером времени, счётчики, гистограммы задержек.
+Экспорт в текстовый формат Prometheus и в локальный JSONL-файл трассы.
+"""
+import os
+import json
+import time
+import uuid
+import atexit
+import bisect
+import threading
+import contextvars
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Границы бакетов гистограммы задержек, с
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_PREFIX = "chatbot_"
+
+_trace_id: contextvars.ContextVar = contextvars.ContextVar("trace_id", default=None)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _NoopSpan:
+    """Пустой контекст для выключенной телеметрии: без замеров и аллокаций. as-цель равна None"""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами бакетов"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Telemetry:
+    """
+    Сборщик спанов и метрик. При enabled=False span() возвращает общий пустой контекст,
+    а inc()/observe() завершаются после одной проверки флага.
+    """
+
+    def __init__(self, enabled: bool = True, trace_path: Optional[Path] = None):
+        """
+        Args:
+            enabled (bool): Включить сбор
+            trace_path (Path): JSONL-файл, куда дописываются завершённые спаны. None — без файла трассы
+        """
+        self.enabled = enabled
+        self.trace_path = Path(trace_path) if trace_path else None
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+        self._trace_file = None
+        if self.enabled and self.trace_path:
+            self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+            self._trace_file = open(self.trace_path, "a", encoding="utf-8")
+            atexit.register(self.close)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Увеличивает счётчик chatbot_<name>_total"""
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        """Добавляет значение в гистограмму chatbot_<name>"""
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def count_tokens(self, prompt_tokens: int, completion_tokens: int):
+        """Учитывает токены запроса и ответа модели"""
+        if not self.enabled:
+            return
+        self.inc("tokens", prompt_tokens, kind="prompt")
+        self.inc("tokens", completion_tokens, kind="completion")
+
+    def span(self, stage: str, **attrs):
+        """
+        Контекст замера одного этапа: время попадает в гистограмму stage_seconds{stage=...},
+        исключение — в счётчик errors_total{stage=...}, спан — в файл трассы
+
+        Args:
+            stage (str): Название этапа (prepare, llm, parse, memory, log, ...)
+            **attrs: Дополнительные поля спана в трассе
+        """
+        if not self.enabled:
+            return _NOOP
+        return self._span(stage, attrs)
+
+    @contextmanager
+    def _span(self, stage: str, attrs: dict) -> Iterator[dict]:
+        start_wall = time.time()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            self.inc("errors", stage=stage, error=error)
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start, start_wall, error, attrs)
+
+    def record(self, stage: str, seconds: float, start_wall: Optional[float] = None,
+               error: Optional[str] = None, attrs: Optional[dict] = None):
+        """Учитывает этап, время которого замерено вызывающим кодом (например, потоковый вызов LLM)"""
+        if not self.enabled:
+            return
+        self.observe("stage_seconds", seconds, stage=stage)
+        if self._trace_file is None:
+            return
+        span = {
+            "trace_id": _trace_id.get(),
+            "stage": stage,
+            "start": round(start_wall if start_wall is not None else time.time() - seconds, 6),
+            "duration_ms": round(seconds * 1000, 3),
+            **(attrs or {}),
+        }
+        if error:
+            span["error"] = error
+        line = json.dumps(span, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.write(line)
+
+    def trace(self, stage: str, **attrs):
+        """
+        Корневой спан: все спаны внутри получают общий trace_id
+
+        Args:
+            stage (str): Название операции (chat, eval.item, ...)
+        """
+        if not self.enabled:
+            return _NOOP
+        return self._trace(stage, attrs)
+
+    @contextmanager
+    def _trace(self, stage: str, attrs: dict) -> Iterator[dict]:
+        token = _trace_id.set(uuid.uuid4().hex)
+        try:
+            with self._span(stage, attrs) as span_attrs:
+                yield span_attrs
+        finally:
+            _trace_id.reset(token)
+
+    def render_prometheus(self) -> str:
+        """Текущие метрики в текстовом формате Prometheus"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            histograms = [(key, list(h.counts), h.sum, h.count, h.buckets) for key, h in histograms]
+        lines: List[str] = []
+        seen = set()
+        for (name, labels), value in counters:
+            metric = f"{METRIC_PREFIX}{name}_total"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+        for (name, labels), counts, total, count, buckets in histograms:
+            metric = f"{METRIC_PREFIX}{name}"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{metric}_bucket{_format_labels(labels, (('le', le),))} {cumulative}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {total:.6f}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write_prometheus(self, path: Path):
+        """Атомарно записывает метрики в файл (для textfile-коллектора node_exporter)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(self.render_prometheus(), encoding="utf-8")
+        tmp.replace(path)
+
+    def summary(self) -> dict:
+        """Краткая сводка: счётчики и средняя задержка этапов в мс"""
+        with self._lock:
+            counters = {f"{name}{_format_labels(labels)}": value for (name, labels), value in self._counters.items()}
+            stages = {
+                dict(labels).get("stage", name): round(h.sum / h.count * 1000, 3)
+                for (name, labels), h in self._histograms.items() if name == "stage_seconds" and h.count
+            }
+        return {"counters": counters, "stage_mean_ms": stages}
+
+    def flush(self):
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.flush()
+
+    def close(self):
+        """Дописывает и закрывает файл трассы"""
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.close()
+                self._trace_file = None
+        atexit.unregister(self.close)
+
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """
+    Возвращает общий для процесса сборщик. Включается переменной TELEMETRY_ENABLED=1,
+    файл трассы задаётся TELEMETRY_TRACE_PATH, файл метрик Prometheus — TELEMETRY_METRICS_PATH
+    (записывается при завершении процесса)
+    """
+    global _telemetry
+    if _telemetry is None:
+        with _telemetry_lock:
+            if _telemetry is None:
+                enabled = os.getenv("TELEMETRY_ENABLED", "").lower() in ("1", "true", "yes")
+                trace_path = os.getenv("TELEMETRY_TRACE_PATH") or None
+                telemetry = Telemetry(enabled=enabled, trace_path=trace_path)
+                metrics_path = os.getenv("TELEMETRY_METRICS_PATH")
+                if enabled and metrics_path:
+                    atexit.register(telemetry.write_prometheus, Path(metrics_path))
+                _telemetry = telemetry
+    return _telemetry
@@ -0,0 +1,72 @@
+"""
+Локальный подсчёт токенов для промптов и истории диалога
+"""
+import re
+from functools import lru_cache
+from typing import Iterable, Optional
+
+# Грубая оценка: слово или отдельный знак препинания. Для кириллицы BPE-токенайзеры
+# OpenAI в среднем дают ~2 токена на слово, поэтому длинные слова режем на куски.
+_APPROX_RE = re.compile(r"\w{1,4}|[^\w\s]", re.UNICODE)
+
+# Служебные токены, которые OpenAI добавляет на каждое сообщение чата
+MESSAGE_OVERHEAD = 4
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model_name: Optional[str]):
+    """Возвращает кодировку tiktoken для модели или None, если tiktoken недоступен"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name or "gpt-4o-mini")
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Нет сети для загрузки словаря BPE — работаем на приближённой оценке
+        return None
+
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """
+    Считает количество токенов в тексте без обращения к API.
+
+    Если установлен tiktoken и словарь модели доступен, используется точный подсчёт,
+    иначе — приближённая оценка по регулярному выражению.
+
+    Args:
+        text (str): Текст для подсчёта
+        model_name (str): Название модели OpenAI
+
+    Returns:
+        int: Количество токенов
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model_name)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(_APPROX_RE.findall(text))
+
+
+def count_message_tokens(messages: Iterable, model_name: Optional[str] = None) -> int:
+    """
+    Считает токены списка сообщений LangChain с учётом служебных токенов на сообщение.
+
+    Args:
+        messages: Сообщения (BaseMessage) или строки
+        model_name (str): Название модели OpenAI
+
+    Returns:
+        int: Количество токенов
+    """
+    total = 0
+    for message in messages:
+        content = getattr(message, "content", message)
+        if not isinstance(content, str):
+            content = str(content)
+        total += count_tokens(content, model_name) + MESSAGE_OVERHEAD
+    return total
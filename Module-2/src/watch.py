@@ -0,0 +1,70 @@
+"""
+Отслеживание изменений файлов данных опросом mtime для перезагрузки без перезапуска процесса
+"""
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+FileStamp = Tuple[int, int]
+
+
+def file_stamp(path: Path) -> Optional[FileStamp]:
+    """(mtime_ns, размер) файла или None, если файла нет"""
+    try:
+        stat = Path(path).stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class PollingReloader:
+    """
+    Основа для источников данных, которые перечитываются при изменении файлов. Проверка выполняется
+    при обращении, не чаще check_interval секунд и только одним потоком: остальные потоки в это время
+    продолжают читать предыдущий снимок и не ждут. Новый снимок подменяется одним присваиванием.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        """
+        Args:
+            check_interval (float): Как часто (в секундах) проверять файлы
+        """
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._checked_at = time.monotonic()
+        self._reload_lock = threading.Lock()
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Проверяет файлы и применяет изменения
+
+        Args:
+            force (bool): Проверить независимо от check_interval
+
+        Returns:
+            bool: True, если снимок был подменён
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            self._checked_at = now
+            try:
+                changed = self._reload()
+            except Exception as e:
+                # Продолжаем работать с предыдущим снимком
+                logging.error(f"{type(self).__name__} reload failed, keeping previous data: {e}")
+                return False
+            if changed:
+                self.reloads += 1
+            return changed
+        finally:
+            self._reload_lock.release()
+
+    def _reload(self) -> bool:
+        """Перечитывает изменившиеся файлы и подменяет снимок. Возвращает True, если снимок подменён"""
+        raise NotImplementedError
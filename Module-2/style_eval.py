@@ -1,17 +1,32 @@
-import os, json, pathlib, re, statistics
-from typing import List
-from dotenv import load_dotenv
+import os, json, pathlib, re, statistics, argparse, time, logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Union
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from src.brand_chain import ChatBot, STYLE
+from src.brand_chain import ChatBot, create_llm, get_registry, load_env
+from src.cache import stable_hash
+from src.eval_runner import EvalRunner
+from src.eval_store import EvalStore, make_eval_key
+from src.rate_limit import RateLimiter
+from src.resilience import CallPolicy, ResilientCaller
+from src.telemetry import get_telemetry
+from src.tokens import count_tokens
 
-chatbot = ChatBot()
-ask = chatbot.chat
-
-load_dotenv(override=True)
 REPORTS = pathlib.Path("reports")
-REPORTS.mkdir(exist_ok=True)
+# Результаты прошлых прогонов по ключу содержимого, см. src/eval_store.py
+EVAL_STORE = pathlib.Path("cache") / "style_eval.sqlite"
+
+# Ответ-заглушка при сбое модели не должен оцениваться и сохраняться как настоящий ответ:
+# ошибка доходит до EvalRunner, который сам делает повторы
+CHAT_POLICY = CallPolicy(max_attempts=1, fallback=False)
+
+# Чат-бот, модель и грейдеры создаются при первом использовании, а не при импорте модуля
+@lru_cache(maxsize=1)
+def get_chatbot() -> ChatBot:
+    return ChatBot(llm_policy=CHAT_POLICY, persist_sessions=False)
+
+def ask(user_input: str):
+    return get_chatbot().chat(user_input)
 
 # Простые проверки до LLM
 def rule_checks(text: str) -> int:
@@ -32,43 +47,384 @@ class Grade(BaseModel):
     score: int = Field(..., ge=0, le=100)
     notes: str
 
-LLM = ChatOpenAI(model=os.getenv("OPENAI_MODEL","gpt-4o-mini"), temperature=0)
+# Пакетная оценка: K ответов в одном запросе, системный промпт отправляется один раз
+class BatchGradeItem(Grade):
+    id: int
+
+class BatchGrade(BaseModel):
+    grades: List[BatchGradeItem]
+
+# Оценка токенов одного запроса для лимита tpm до получения фактического расхода
+REQUEST_TOKENS_ESTIMATE = 1500
+
+@dataclass(frozen=True)
+class Graders:
+    single: Any
+    batch: Any
+    # Хэш промптов и модели грейдера: входит в ключ сохранённого результата
+    grader_hash: str
+
+@lru_cache(maxsize=1)
+def get_graders() -> Graders:
+    # Парсеры структурированного вывода собираются один раз, а не на каждый вызов
+    from langchain_core.prompts import ChatPromptTemplate
+    style = get_registry().style_guide
+    # Без дублирования грейдер вызывается в текущем потоке: попытку ограничивает таймаут клиента
+    llm = create_llm(os.getenv("OPENAI_MODEL","gpt-4o-mini"), temperature=0, request_timeout=GRADER_POLICY.attempt_timeout)
+    grade_prompt = ChatPromptTemplate.from_messages([
+        ("system", f"Ты — строгий ревьюер соответствия голосу бренда {style['brand']}"),
+        ("system", f"Тон: {style['tone']['persona']}. Избегай: {', '.join(style['tone']['avoid'])}. "
+                   f"Обязательно: {', '.join(style['tone']['must_include'])}."),
+        ("human", "Ответ ассистента:\n{answer}\n\nДай целочисленный score 0..100 и краткие заметки почему.")
+    ])
+    batch_grade_prompt = ChatPromptTemplate.from_messages([
+        *grade_prompt.messages[:2],
+        ("human", "Ответы ассистента, каждый с номером в квадратных скобках:\n\n{answers}\n\n"
+                  "Оцени каждый ответ независимо: для каждого номера дай целочисленный score 0..100 "
+                  "и краткие заметки почему. Верни оценки всех ответов с их номерами в поле id.")
+    ])
+    grader_hash = stable_hash([
+        [m.prompt.template for m in grade_prompt.messages + batch_grade_prompt.messages[2:]],
+        type(llm).__name__, getattr(llm, "model_name", None),
+    ])
+    return Graders(grade_prompt | llm.with_structured_output(Grade),
+                   batch_grade_prompt | llm.with_structured_output(BatchGrade), grader_hash)
+
+# Повторы с ожиданием лимитов делает EvalRunner; здесь — таймаут попытки, дублирование
+# запросов медленнее p95 и автомат отключения. Ответа-заглушки у грейдера нет
+GRADER_POLICY = CallPolicy(max_attempts=1, deadline=None, attempt_timeout=60.0, hedge_quantile=0.95, fallback=False)
+
+@lru_cache(maxsize=2)
+def get_grader_caller(kind: str) -> ResilientCaller:
+    # Одиночная и пакетная оценка — отдельные окна задержек: пакет заметно дольше
+    return ResilientCaller(GRADER_POLICY, name=f"grader.{kind}")
+
+def hedge_gate(limiter: Optional[RateLimiter], tokens: int) -> Optional[Callable[[], bool]]:
+    # Дублирующий запрос грейдера расходует тот же лимит, что и основной: без свободного токена он не отправляется
+    return (lambda: limiter.try_acquire(tokens)) if limiter is not None else None
+
+def llm_grade(text: str, limiter: Optional[RateLimiter] = None) -> Grade:
+    with get_telemetry().span("eval.grade"):
+        return get_grader_caller("single").call(get_graders().single.invoke, {"answer": text},
+                                                hedge_gate=hedge_gate(limiter, REQUEST_TOKENS_ESTIMATE))
+
+# Ограничение на суммарный размер ответов в одном пакетном запросе
+BATCH_MAX_TOKENS = 6000
+
+def batch_tokens(texts: List[str]) -> int:
+    return REQUEST_TOKENS_ESTIMATE + sum(map(count_tokens, texts))
+
+def llm_grade_batch(texts: List[str], limiter: Optional[RateLimiter] = None) -> List[Optional[Grade]]:
+    answers = "\n\n".join(f"[{i}] {t}" for i, t in enumerate(texts))
+    with get_telemetry().span("eval.grade_batch", size=len(texts)):
+        batch = get_grader_caller("batch").call(get_graders().batch.invoke, {"answers": answers},
+                                                hedge_gate=hedge_gate(limiter, batch_tokens(texts)))
+    grades: List[Optional[Grade]] = [None] * len(texts)
+    for g in batch.grades:
+        if 0 <= g.id < len(texts) and grades[g.id] is None:
+            grades[g.id] = Grade(score=g.score, notes=g.notes)
+    return grades
+
+def split_batches(texts: List[str], batch_size: int, max_tokens: int = BATCH_MAX_TOKENS) -> List[List[int]]:
+    # Индексы ответов, разбитые на пакеты не больше batch_size штук и max_tokens токенов
+    batches, current, current_tokens = [], [], 0
+    for i, t in enumerate(texts):
+        tokens = count_tokens(t)
+        if current and (len(current) >= batch_size or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def grade_one(text: str, runner: EvalRunner) -> Union[Grade, str]:
+    # Ошибка оценки одного ответа возвращается строкой вместо Grade, а не исключением,
+    # чтобы не потерять оценки остальных ответов пакета
+    try:
+        return runner.call(llm_grade, text, limiter=runner.limiter, tokens=REQUEST_TOKENS_ESTIMATE)
+    except Exception as e:
+        logging.error(f"Grading failed: {e}")
+        return str(e)
+
+def grade_batch(texts: List[str], runner: EvalRunner) -> List[Union[Grade, str]]:
+    if len(texts) == 1:
+        return [grade_one(texts[0], runner)]
+    try:
+        grades = runner.call(llm_grade_batch, texts, limiter=runner.limiter, tokens=batch_tokens(texts))
+    except Exception:
+        # Пакет не прошёл (слишком большой ответ, невалидный JSON) — делим пополам
+        mid = len(texts) // 2
+        return grade_batch(texts[:mid], runner) + grade_batch(texts[mid:], runner)
+    # Ответы, которые модель пропустила в пакете, оцениваем по одному
+    return [g if g is not None else grade_one(t, runner) for g, t in zip(grades, texts)]
 
-GRADE_PROMPT = ChatPromptTemplate.from_messages([
-    ("system", f"Ты — строгий ревьюер соответствия голосу бренда {STYLE['brand']}"),
-    ("system", f"Тон: {STYLE['tone']['persona']}. Избегай: {', '.join(STYLE['tone']['avoid'])}. "
-               f"Обязательно: {', '.join(STYLE['tone']['must_include'])}."),
-    ("human", "Ответ ассистента:\n{answer}\n\nДай целочисленный score 0..100 и краткие заметки почему.")
-])
+def timed_chat(bot: ChatBot, p: str):
+    # Задержка одной попытки, без ожидания лимитов и повторов
+    start = time.perf_counter()
+    reply, tokens = bot.chat(p)
+    if bot.last_route == "fallback":
+        # Бот, созданный с CallPolicy(fallback=True), ответил заглушкой вместо модели
+        raise RuntimeError(f"Модель не ответила на промпт: {p!r}")
+    return reply, tokens, time.perf_counter() - start
 
-def llm_grade(text: str) -> Grade:
-    parser = LLM.with_structured_output(Grade)
-    return (GRADE_PROMPT | parser).invoke({"answer": text})
+def answer_item(p: str, runner: EvalRunner, base: Optional[ChatBot] = None) -> dict:
+    # Каждый промпт оценивается в отдельной сессии, чтобы результат не зависел от порядка выполнения
+    bot = (base or get_chatbot()).fork()
+    estimate = REQUEST_TOKENS_ESTIMATE + count_tokens(p)
+    with get_telemetry().span("eval.answer"):
+        reply, tokens, latency = runner.call(timed_chat, bot, p, tokens=estimate)
+    runner.limiter.settle(estimate, tokens)
+    return {
+        "prompt": p,
+        "answer": reply.answer,
+        "actions": reply.actions,
+        "tone_model": reply.tone,
+        "rule_score": rule_checks(reply.answer),
+        "tokens": tokens,
+        "latency_s": round(latency, 3)
+    }
 
-def eval_batch(prompts: List[str]) -> dict:
+def apply_grade(item: dict, g: Grade) -> dict:
+    item["llm_score"] = g.score
+    item["final"] = int(0.4 * item["rule_score"] + 0.6 * g.score)
+    item["notes"] = g.notes
+    return item
+
+def eval_item(p: str, runner: EvalRunner) -> dict:
+    item = answer_item(p, runner)
+    return apply_grade(item, runner.call(llm_grade, item["answer"], limiter=runner.limiter,
+                                         tokens=REQUEST_TOKENS_ESTIMATE))
+
+def eval_key(p: str, bot: Optional[ChatBot] = None) -> str:
+    # Ключ меняется при изменении промпта, версии шаблона, стиля, модели, грейдера, FAQ,
+    # примеров few-shot и их настроек или бюджета промпта
+    bot = bot or get_chatbot()
+    compiled = bot.registry.get(bot.prompt_version)
+    model = f"{type(bot.llm).__name__}:{bot.model_name}"
+    return make_eval_key(p, compiled.version, compiled.prompt_hash, model, get_graders().grader_hash,
+                         stable_hash(bot.answer_context()))
+
+def reuse_item(stored: dict) -> dict:
+    # Правила проверяются локально и бесплатно, поэтому пересчитываем их по текущему коду
+    item = dict(stored, rule_score=rule_checks(stored["answer"]))
+    return apply_grade(item, Grade(score=stored["llm_score"], notes=stored["notes"]))
+
+def run_items(prompts: List[str], runner: EvalRunner, grade_batch_size: int) -> List[dict]:
+    if grade_batch_size <= 1:
+        results = runner.map(lambda p: eval_item(p, runner), prompts)
+    else:
+        results = runner.map(lambda p: answer_item(p, runner), prompts)
+        answered = [r for r in results if "error" not in r]
+        batches = split_batches([r["answer"] for r in answered], grade_batch_size)
+
+        def grade(batch: List[int]) -> dict:
+            grades = grade_batch([answered[i]["answer"] for i in batch], runner)
+            for i, g in zip(batch, grades):
+                if isinstance(g, Grade):
+                    apply_grade(answered[i], g)
+                else:
+                    answered[i]["error"] = g
+            return {}
+
+        for batch, outcome in zip(batches, runner.map(grade, batches)):
+            if "error" in outcome:
+                for i in batch:
+                    answered[i]["error"] = outcome["error"]
+    for p, r in zip(prompts, results):
+        r.setdefault("prompt", p)
+    return results
+
+def eval_batch(prompts: List[str], workers: int = 4, rpm: Optional[float] = None,
+               tpm: Optional[float] = None, retries: int = 3, grade_batch_size: int = 1,
+               report_path: Optional[pathlib.Path] = None, store_path: Optional[pathlib.Path] = EVAL_STORE,
+               reuse: bool = True) -> dict:
+    # Создаём общие бот и грейдеры до старта потоков, чтобы они не собирались параллельно
+    load_env()
+    get_chatbot()
+    get_graders()
+    telemetry = get_telemetry()
+    runner = EvalRunner(workers=workers, limiter=RateLimiter(rpm=rpm, tpm=tpm), retries=retries)
+    start = time.perf_counter()
+
+    # Элементы с неизменившимся ключом берём из хранилища, остальные прогоняем заново
+    store = EvalStore(store_path) if store_path else None
+    keys = [eval_key(p) for p in prompts]
+    stored = store.get_many(keys) if store is not None and reuse else {}
+    todo = [i for i, k in enumerate(keys) if k not in stored]
+    fresh = dict(zip(todo, run_items([prompts[i] for i in todo], runner, grade_batch_size)))
     results = []
-    for p in prompts:
-        reply, tokens = ask(p)  # Распаковываем кортеж
-        rule = rule_checks(reply.answer)
-        g = llm_grade(reply.answer)
-        final = int(0.4 * rule + 0.6 * g.score)
-        results.append({
-            "prompt": p,
-            "answer": reply.answer,
-            "actions": reply.actions,
-            "tone_model": reply.tone,
-            "rule_score": rule,
-            "llm_score": g.score,
-            "final": final,
-            "notes": g.notes
+    for i, key in enumerate(keys):
+        item = fresh[i] if i in fresh else reuse_item(stored[key])
+        results.append({**item, "key": key, "reused": i not in fresh})
+    if store is not None:
+        store.put_many({keys[i]: item for i, item in fresh.items() if "error" not in item})
+        store.close()
+    elapsed = time.perf_counter() - start
+
+    scored = [r for r in results if "error" not in r]
+    telemetry.inc("eval_items", len(scored), status="ok")
+    telemetry.inc("eval_items", len(results) - len(scored), status="error")
+    mean_final = round(statistics.mean(r["final"] for r in scored), 2) if scored else 0.0
+    out = {
+        "mean_final": mean_final,
+        "errors": len(results) - len(scored),
+        "reused": len(results) - len(fresh),
+        "evaluated": len(fresh),
+        "grade_batch_size": grade_batch_size,
+        "elapsed_s": round(elapsed, 2),
+        "items_per_s": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "items": results
+    }
+    if telemetry.enabled:
+        out["telemetry"] = telemetry.summary()
+    report_path = report_path or REPORTS / "style_eval.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+    return out
+
+def distribution(values: List[float]) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(len(values) * q))]
+    return {"mean": round(statistics.mean(values), 3), "p50": pick(0.5), "p90": pick(0.9),
+            "min": values[0], "max": values[-1]}
+
+def grade_answers(answers: List[str], runner: EvalRunner, grade_batch_size: int) -> dict:
+    # Оценивает уникальные ответы; ошибка оценки сохраняется вместо Grade только у ответа,
+    # который не удалось оценить, — оценки остальных ответов пакета остаются
+    if grade_batch_size <= 1:
+        batches = [[i] for i in range(len(answers))]
+        outcomes = runner.map(lambda b: {"grades": [grade_one(answers[b[0]], runner)]}, batches)
+    else:
+        batches = split_batches(answers, grade_batch_size)
+        outcomes = runner.map(lambda b: {"grades": grade_batch([answers[i] for i in b], runner)}, batches)
+    grades = {}
+    for batch, outcome in zip(batches, outcomes):
+        for j, i in enumerate(batch):
+            grades[answers[i]] = outcome["grades"][j] if "grades" in outcome else outcome["error"]
+    return grades
+
+def eval_matrix(prompts: List[str], versions: Optional[List[str]] = None, models: Optional[List[str]] = None,
+                workers: int = 4, rpm: Optional[float] = None, tpm: Optional[float] = None, retries: int = 3,
+                grade_batch_size: int = 1, report_path: Optional[pathlib.Path] = None,
+                store_path: Optional[pathlib.Path] = EVAL_STORE, reuse: bool = True) -> dict:
+    # Все версии промпта × модели на одном наборе промптов: один пул потоков и один лимитер на всё,
+    # одинаковые ответы разных ячеек оцениваются один раз
+    load_env()
+    base = get_chatbot()
+    get_graders()
+    telemetry = get_telemetry()
+    versions = versions or base.registry.versions()
+    models = models or [base.model_name]
+    cells = [(v, m) for v in versions for m in models]
+    bots = {(v, m): ChatBot(model_name=m, prompt_version=v, order_store=base.order_store, registry=base.registry,
+                            llm_policy=CHAT_POLICY, persist_sessions=False)
+            for v, m in cells}
+    runner = EvalRunner(workers=workers, limiter=RateLimiter(rpm=rpm, tpm=tpm), retries=retries)
+    start = time.perf_counter()
+
+    tasks = [(cell, i) for cell in cells for i in range(len(prompts))]
+    keys = {t: eval_key(prompts[t[1]], bots[t[0]]) for t in tasks}
+    store = EvalStore(store_path) if store_path else None
+    stored = store.get_many(keys.values()) if store is not None and reuse else {}
+    todo = [t for t in tasks if keys[t] not in stored]
+    fresh = dict(zip(todo, runner.map(lambda t: answer_item(prompts[t[1]], runner, bots[t[0]]), todo)))
+
+    # Оценки уже сохранённых ответов переиспользуем, новые уникальные ответы оцениваем
+    grades = {item["answer"]: Grade(score=item["llm_score"], notes=item["notes"]) for item in stored.values()}
+    answered = [item for item in fresh.values() if "error" not in item]
+    pending = list(dict.fromkeys(item["answer"] for item in answered if item["answer"] not in grades))
+    grades.update(grade_answers(pending, runner, grade_batch_size))
+    for item in answered:
+        grade = grades[item["answer"]]
+        if isinstance(grade, Grade):
+            apply_grade(item, grade)
+        else:
+            item["error"] = grade
+    if store is not None:
+        store.put_many({keys[t]: item for t, item in fresh.items() if "error" not in item})
+        store.close()
+    elapsed = time.perf_counter() - start
+
+    report_cells, items = [], [{"prompt": p, "results": {}} for p in prompts]
+    for v, m in cells:
+        results = []
+        for i, p in enumerate(prompts):
+            t = ((v, m), i)
+            item = fresh[t] if t in fresh else reuse_item(stored[keys[t]])
+            results.append({**item, "prompt": p, "key": keys[t], "reused": t not in fresh})
+            items[i]["results"][f"{v}/{m}"] = {k: item.get(k) for k in ("answer", "final", "llm_score", "rule_score",
+                                                                         "tokens", "latency_s", "error")}
+        scored = [r for r in results if "error" not in r]
+        report_cells.append({
+            "version": v,
+            "model": m,
+            "mean_final": round(statistics.mean(r["final"] for r in scored), 2) if scored else 0.0,
+            "final": distribution([r["final"] for r in scored]),
+            "tokens": distribution([r["tokens"] for r in scored if r.get("tokens") is not None]),
+            "latency_s": distribution([r["latency_s"] for r in scored if r.get("latency_s") is not None]),
+            "errors": len(results) - len(scored),
+            "reused": sum(r["reused"] for r in results),
         })
-    mean_final = round(statistics.mean(r["final"] for r in results), 2)
-    out = {"mean_final": mean_final, "items": results}
-    (REPORTS / "style_eval.json").write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+        telemetry.inc("eval_items", len(scored), status="ok")
+        telemetry.inc("eval_items", len(results) - len(scored), status="error")
+
+    out = {
+        "prompts": len(prompts),
+        "versions": versions,
+        "models": models,
+        "elapsed_s": round(elapsed, 2),
+        "evaluated": len(fresh),
+        "reused": len(tasks) - len(fresh),
+        "grading": {"answers": len(answered), "graded": len(pending), "grade_reused": len(answered) - len(pending)},
+        "cells": report_cells,
+        "items": items
+    }
+    if telemetry.enabled:
+        out["telemetry"] = telemetry.summary()
+    report_path = report_path or REPORTS / "style_eval_matrix.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
     return out
 
+def print_matrix(report: dict):
+    print(f"{'версия/модель':<28} {'балл':>6} {'p50':>5} {'токены p50':>11} {'задержка p50, с':>16} {'ошибки':>7}")
+    for c in report["cells"]:
+        print(f"{c['version'] + '/' + c['model']:<28} {c['mean_final']:>6} {c['final'].get('p50', '-'):>5} "
+              f"{c['tokens'].get('p50', '-'):>11} {c['latency_s'].get('p50', '-'):>16} {c['errors']:>7}")
+
 if __name__ == "__main__":
-    eval_prompts = pathlib.Path("data/eval_prompts.txt").read_text(encoding="utf-8").strip().splitlines()
-    report = eval_batch(eval_prompts)
+    parser = argparse.ArgumentParser(description="Оценка соответствия ответов бренд-стилю")
+    parser.add_argument("--prompts", default="data/eval_prompts.txt", help="Файл с промптами, по одному в строке")
+    parser.add_argument("--workers", type=int, default=4, help="Количество параллельных потоков")
+    parser.add_argument("--rpm", type=float, default=None, help="Лимит запросов к LLM в минуту")
+    parser.add_argument("--tpm", type=float, default=None, help="Лимит токенов в минуту")
+    parser.add_argument("--retries", type=int, default=3, help="Повторы неудачного вызова LLM")
+    parser.add_argument("--grade-batch-size", type=int, default=1,
+                        help="Сколько ответов оценивать одним запросом (1 — по одному, как раньше)")
+    parser.add_argument("--store", type=pathlib.Path, default=EVAL_STORE,
+                        help="Хранилище результатов прошлых прогонов")
+    parser.add_argument("--no-reuse", action="store_true",
+                        help="Прогнать все промпты заново, не используя сохранённые результаты")
+    parser.add_argument("--matrix", action="store_true",
+                        help="Сравнить версии промпта (и модели) на одном наборе промптов")
+    parser.add_argument("--versions", default=None, help="Версии промпта через запятую (по умолчанию все)")
+    parser.add_argument("--models", default=None, help="Модели через запятую (по умолчанию OPENAI_MODEL)")
+    args = parser.parse_args()
+    eval_prompts = pathlib.Path(args.prompts).read_text(encoding="utf-8").strip().splitlines()
+    if args.matrix:
+        report = eval_matrix(eval_prompts, versions=args.versions and args.versions.split(","),
+                             models=args.models and args.models.split(","), workers=args.workers, rpm=args.rpm,
+                             tpm=args.tpm, retries=args.retries, grade_batch_size=args.grade_batch_size,
+                             store_path=args.store, reuse=not args.no_reuse)
+        print_matrix(report)
+        print("Отчёт:", REPORTS / "style_eval_matrix.json")
+        raise SystemExit
+    report = eval_batch(eval_prompts, workers=args.workers, rpm=args.rpm, tpm=args.tpm, retries=args.retries,
+                        grade_batch_size=args.grade_batch_size, store_path=args.store, reuse=not args.no_reuse)
+    print(f"Оценено заново: {report['evaluated']}, из сохранённых результатов: {report['reused']}")
     print("Средний балл:", report["mean_final"])
     print("Отчёт:", REPORTS / "style_eval.json")
@@ -0,0 +1,25 @@
+"""
+Бенчмарки запускаются до конца на модели-заглушке
+"""
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+BASE = Path(__file__).parent.parent
+
+
+def test_pipeline_benchmark_runs_on_fake_llm(tmp_path):
+    output = tmp_path / "bench_pipeline.json"
+    env = dict(os.environ, LLM_BACKEND="fake", OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "test"))
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.pipeline", "--latency", "0", "--turns", "5", "--long-session", "10",
+         "--eval-prompts", "2", "--eval-workers", "2", "--output", str(output)],
+        cwd=BASE, env=env, check=True, capture_output=True, timeout=120,
+    )
+    result = json.loads(output.read_text(encoding="utf-8"))
+    assert set(result["stages_ms"]) == {"prepare", "llm", "parse", "memory", "log", "total"}
+    assert result["throughput"]["turns"] == 5
+    assert result["memory_growth"]["points"]
+    assert result["eval"]["prompts"] == 2
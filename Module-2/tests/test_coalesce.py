@@ -0,0 +1,62 @@
+"""
+Объединение одинаковых одновременных запросов: общий результат, ошибки и отмена ведущего
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.coalesce import SingleFlight
+from src.fake_llm import FakeChatModel, FakeLLMError
+from src.schema import BotResponse
+from src.telemetry import Telemetry
+
+PROMPT = "Где мой заказ?"
+
+
+def test_concurrent_calls_share_one_result():
+    llm = FakeChatModel(latency=0.2)
+    flight = SingleFlight(telemetry=Telemetry())
+    structured = llm.with_structured_output(BotResponse)
+    with ThreadPoolExecutor(10) as pool:
+        results = list(pool.map(lambda _: flight.do("k", structured.invoke, PROMPT), range(10)))
+    assert llm.calls == 1
+    assert sum(shared for _, shared in results) == 9
+    assert flight.stats()["followers"] == 9
+
+
+def test_error_reaches_all_waiters():
+    llm = FakeChatModel(latency=0.1, error_rate=1.0)
+    flight = SingleFlight(telemetry=Telemetry())
+
+    async def main():
+        structured = llm.with_structured_output(BotResponse)
+        return await asyncio.gather(*(flight.ado("k", structured.ainvoke, PROMPT) for _ in range(5)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, FakeLLMError) for r in results)
+    assert llm.failures == 1
+
+
+def test_cancelled_leader_hands_over_to_follower():
+    llm = FakeChatModel(latency=0.1)
+    flight = SingleFlight(telemetry=Telemetry())
+
+    async def main():
+        structured = llm.with_structured_output(BotResponse)
+        leader = asyncio.create_task(flight.ado("k", structured.ainvoke, PROMPT))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.ado("k", structured.ainvoke, PROMPT)) for _ in range(3)]
+        await asyncio.sleep(0.02)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    results = asyncio.run(main())
+    assert all(reply.answer for reply, _ in results)
+    # Один из ожидающих повторил вызов, остальные получили его результат
+    assert [shared for _, shared in results].count(False) == 1
+    assert llm.calls == 1
+    assert flight.stats() == {"leaders": 1, "followers": 2, "collapsed_rate": round(2 / 3, 4)}
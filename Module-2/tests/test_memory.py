@@ -0,0 +1,44 @@
+"""
+Бюджет истории: последние ходы важнее краткого содержания старой части диалога
+"""
+from src.memory import SUMMARY_HEADER, TokenBudgetMemory
+
+
+def fill(memory: TokenBudgetMemory, turns: int):
+    for i in range(turns):
+        memory.add_user_message(f"Вопрос номер {i} про доставку, оплату и возврат заказа")
+        memory.add_ai_message(f"Ответ номер {i}: подробности в разделе помощи на сайте")
+
+
+def test_recent_turns_are_kept_and_summary_is_cut_to_the_rest():
+    memory = TokenBudgetMemory(max_tokens=10_000, keep_last_turns=2, summary_max_tokens=10_000)
+    fill(memory, 8)
+    full = memory.messages
+    assert full[0].content.startswith(SUMMARY_HEADER)
+    assert memory.last_stats.turns_summarized == 6
+
+    # Бюджет меньше полной истории: содержание сокращается, дословные ходы остаются
+    memory.max_tokens = memory.last_stats.history_tokens - 1
+    messages = memory.messages
+    stats = memory.last_stats
+    assert stats.history_tokens <= memory.max_tokens
+    assert stats.turns_verbatim == 2
+    assert 0 < stats.turns_summarized < 6
+    assert stats.turns_dropped == 6 - stats.turns_summarized
+    assert messages[1:] == full[1:]
+    # Остаются самые новые строки содержания
+    assert messages[0].content.endswith(full[0].content.splitlines()[-1])
+    assert "Вопрос номер 0 " not in messages[0].content
+
+
+def test_summary_is_omitted_when_recent_turns_fill_the_budget():
+    memory = TokenBudgetMemory(max_tokens=10_000, keep_last_turns=2, summary_max_tokens=10_000)
+    fill(memory, 4)
+    verbatim = memory.messages[1:]
+    memory.max_tokens = sum(memory._count(message) for message in verbatim)
+
+    # Содержание не вытесняет дословные ходы: для него не осталось бюджета
+    assert memory.messages == verbatim
+    assert memory.last_stats.turns_verbatim == 2
+    assert memory.last_stats.turns_summarized == 0
+    assert memory.last_stats.history_tokens == memory.max_tokens
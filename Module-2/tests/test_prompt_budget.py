@@ -0,0 +1,53 @@
+"""
+Сокращение промпта до бюджета: история убирается целыми ходами, краткое содержание — последним
+"""
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from src.brand_chain import ChatBot
+from src.fake_llm import FakeChatModel
+from src.memory import SUMMARY_HEADER
+from src.prompt_budget import PromptParts
+from src.telemetry import Telemetry
+
+QUESTIONS = [
+    "Сколько идёт доставка в Казань и можно ли выбрать удобный интервал?",
+    "Как оформить возврат товара, купленного по акции?",
+    "Можно ли оплатить заказ при получении картой?",
+    "Есть ли у вас пункты выдачи в Новосибирске?",
+    "Как изменить адрес доставки после оформления заказа?",
+]
+
+
+def test_history_is_trimmed_by_turns_keeping_summary_last():
+    summary = SystemMessage(content=f"{SUMMARY_HEADER}\n- Пользователь: привет → Бот: здравствуйте")
+    parts = PromptParts(history=[summary, HumanMessage(content="q1"), AIMessage(content="a1"),
+                                 HumanMessage(content="q2"), AIMessage(content="a2")])
+
+    assert parts.trim("history") == 2
+    assert [m.content for m in parts.history] == [summary.content, "q2", "a2"]
+    assert parts.trim("history") == 2
+    assert parts.history == [summary]
+    assert parts.trim("history") == 1
+    assert parts.trim("history") == 0
+
+
+def test_bot_trims_history_within_budget():
+    bot = ChatBot(llm=FakeChatModel(latency=0), fast_path=False, coalesce=False, few_shot_k=0,
+                  memory_max_tokens=5000, memory_keep_turns=3, telemetry=Telemetry(), persist_sessions=False)
+    for question in QUESTIONS:
+        bot.chat(question)
+    full = bot.profile_prompt(QUESTIONS[0])
+    assert not full.trimmed
+    assert full.sections["history"] > 0
+
+    # На токен меньше полного промпта: достаточно убрать самый старый дословный ход
+    bot.prompt_budget.max_tokens = full.total - 1
+    turn = bot._prepare_turn(QUESTIONS[0])
+    profile = bot.last_profile
+    assert turn.route == "llm"
+    assert profile.total <= profile.max_tokens
+    assert profile.trimmed == {"history": 2}
+
+    history = [m for m in turn.prompt if m.type in ("human", "ai")][:-1]
+    assert turn.prompt[1].content.startswith(SUMMARY_HEADER)
+    assert [m.type for m in history] == ["human", "ai"] * 2
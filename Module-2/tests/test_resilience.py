@@ -0,0 +1,231 @@
+"""
+Повторы, дедлайн, дублирующие запросы и автомат отключения на модели-заглушке с внедрёнными сбоями
+"""
+import time
+import asyncio
+import threading
+
+import pytest
+from pydantic import ValidationError
+
+from src.brand_chain import ChatBot
+from src.fake_llm import FakeChatModel, FakeLLMError
+from src.rate_limit import RateLimiter
+from src.resilience import CallPolicy, CircuitOpenError, ResilientCaller
+from src.schema import BotResponse
+from src.telemetry import Telemetry
+
+PROMPT = "Сколько идёт доставка?"
+
+
+def make_caller(**policy) -> ResilientCaller:
+    return ResilientCaller(CallPolicy(**policy), name="test", telemetry=Telemetry())
+
+
+def counter(caller: ResilientCaller, key: str) -> float:
+    return caller.telemetry.summary()["counters"].get(key, 0)
+
+
+def test_breaker_opens_then_half_opens_and_closes():
+    llm = FakeChatModel(latency=0, error_rate=1.0)
+    structured = llm.with_structured_output(BotResponse)
+    caller = make_caller(max_attempts=1, failure_threshold=2, reset_timeout=0.1)
+
+    for _ in range(2):
+        with pytest.raises(FakeLLMError):
+            caller.call(structured.invoke, PROMPT)
+    assert caller.breaker.state == "open"
+
+    # Разомкнутый автомат не пропускает вызов к модели
+    with pytest.raises(CircuitOpenError):
+        caller.call(structured.invoke, PROMPT)
+    assert llm.failures == 2
+
+    time.sleep(0.15)
+    llm.error_rate = 0.0
+    assert caller.call(structured.invoke, PROMPT).answer
+    assert caller.breaker.state == "closed"
+    assert counter(caller, 'circuit_transitions{site="test",state="half_open"}') == 1
+    assert counter(caller, 'circuit_transitions{site="test",state="closed"}') == 1
+
+
+def test_failed_probe_reopens_breaker():
+    llm = FakeChatModel(latency=0, error_rate=1.0)
+    structured = llm.with_structured_output(BotResponse)
+    caller = make_caller(max_attempts=1, failure_threshold=1, reset_timeout=0.05)
+
+    with pytest.raises(FakeLLMError):
+        caller.call(structured.invoke, PROMPT)
+    time.sleep(0.1)
+    with pytest.raises(FakeLLMError):
+        caller.call(structured.invoke, PROMPT)
+    assert caller.breaker.state == "open"
+    assert llm.failures == 2
+
+
+def test_client_error_is_not_retried():
+    llm = FakeChatModel(latency=0, error_rate=1.0, error_status=400)
+    structured = llm.with_structured_output(BotResponse)
+    caller = make_caller(max_attempts=5, backoff_base=0)
+
+    with pytest.raises(FakeLLMError):
+        caller.call(structured.invoke, PROMPT)
+    assert llm.failures == 1
+    # Модель ответила: ошибка запроса не размыкает автомат
+    assert caller.breaker.failures == 0
+
+
+def test_rate_limit_is_retried():
+    llm = FakeChatModel(latency=0, error_rate=1.0, error_status=429)
+    caller = make_caller(max_attempts=3, backoff_base=0)
+
+    with pytest.raises(FakeLLMError):
+        caller.call(llm.with_structured_output(BotResponse).invoke, PROMPT)
+    assert llm.failures == 3
+
+
+def test_validation_error_is_not_retried():
+    calls = []
+
+    def invalid_reply():
+        calls.append(1)
+        return BotResponse(answer="", tone="да", actions=[])
+
+    caller = make_caller(max_attempts=5, backoff_base=0)
+    with pytest.raises(ValidationError):
+        caller.call(invalid_reply)
+    assert len(calls) == 1
+
+
+def test_deadline_cuts_off_retries():
+    llm = FakeChatModel(latency=0.1, error_rate=1.0)
+    caller = make_caller(max_attempts=100, deadline=0.35, backoff_base=0.01, backoff_max=0.01)
+
+    start = time.monotonic()
+    with pytest.raises((FakeLLMError, TimeoutError)):
+        caller.call(llm.with_structured_output(BotResponse).invoke, PROMPT)
+    assert time.monotonic() - start < 0.6
+    assert llm.failures <= 4
+
+
+def test_hedged_request_wins_over_slow_primary():
+    slow, fast = FakeChatModel(latency=2.0), FakeChatModel(latency=0.01)
+    models = iter([slow, fast])
+
+    def invoke(prompt):
+        return next(models).with_structured_output(BotResponse).invoke(prompt)
+
+    caller = make_caller(hedge_after=0.05)
+    start = time.monotonic()
+    reply = caller.call(invoke, PROMPT)
+    assert reply.answer
+    assert time.monotonic() - start < 1.0
+    assert fast.calls == 1
+    assert counter(caller, 'llm_hedges{site="test"}') == 1
+    assert counter(caller, 'llm_hedge_results{site="test",winner="hedge"}') == 1
+
+
+def test_async_hedged_request_wins_over_slow_primary():
+    slow, fast = FakeChatModel(latency=2.0), FakeChatModel(latency=0.01)
+    models = iter([slow, fast])
+
+    def ainvoke(prompt):
+        return next(models).with_structured_output(BotResponse).ainvoke(prompt)
+
+    caller = make_caller(hedge_after=0.05)
+    start = time.monotonic()
+    reply = asyncio.run(caller.acall(ainvoke, PROMPT))
+    assert reply.answer
+    assert time.monotonic() - start < 1.0
+    # Проигравший медленный запрос отменён
+    assert slow.calls == 0
+    assert counter(caller, 'llm_hedge_results{site="test",winner="hedge"}') == 1
+
+
+def test_chatbot_falls_back_after_retries():
+    llm = FakeChatModel(latency=0, error_rate=1.0)
+    bot = ChatBot(llm=llm, fast_path=False, telemetry=Telemetry(),
+                  llm_policy=CallPolicy(max_attempts=2, backoff_base=0))
+    reply, tokens = bot.chat(PROMPT)
+    assert bot.last_route == "fallback"
+    assert reply.answer == bot.style_guide["fallback"]["no_data"]
+    assert tokens == 0
+    assert llm.failures == 2
+
+    bot.llm_caller = ResilientCaller(CallPolicy(max_attempts=1, fallback=False), telemetry=Telemetry())
+    with pytest.raises(FakeLLMError):
+        bot.chat(PROMPT)
+
+
+def test_call_without_hedge_runs_in_caller_thread():
+    threads = []
+
+    def invoke(prompt):
+        threads.append(threading.current_thread())
+        return prompt
+
+    # Дедлайн по умолчанию не уводит вызов в пул потоков
+    caller = make_caller()
+    assert caller.policy.deadline is not None
+    assert caller.call(invoke, PROMPT) == PROMPT
+    assert threads == [threading.current_thread()]
+
+
+def test_hedge_needs_rate_limit_token():
+    slow, fast = FakeChatModel(latency=0.3), FakeChatModel(latency=0.01)
+    models = iter([slow, fast])
+    limiter = RateLimiter(rpm=1)
+    limiter.acquire()
+
+    def invoke(prompt):
+        return next(models).with_structured_output(BotResponse).invoke(prompt)
+
+    caller = make_caller(hedge_after=0.05)
+    assert caller.call(invoke, PROMPT, hedge_gate=limiter.try_acquire).answer
+    assert fast.calls == 0
+    assert counter(caller, 'llm_hedges_skipped{reason="rate_limit",site="test"}') == 1
+
+
+class FakeStream:
+    def __init__(self, delay: float = 0.0, error: bool = False):
+        self.delay, self.error, self.closed = delay, error, False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        time.sleep(self.delay)
+        if self.error:
+            raise FakeLLMError("обрыв до первого фрагмента")
+        raise StopIteration
+
+    def close(self):
+        self.closed = True
+
+
+def test_losing_hedge_result_is_closed():
+    slow, fast = FakeStream(), FakeStream()
+    delays = iter([(0.3, slow), (0.0, fast)])
+
+    def open_stream():
+        delay, stream = next(delays)
+        time.sleep(delay)
+        return stream
+
+    caller = make_caller(hedge_after=0.05)
+    assert caller.call(open_stream) is fast
+    time.sleep(0.4)
+    assert slow.closed and not fast.closed
+
+
+def test_failed_stream_is_closed_before_retry():
+    streams = iter([FakeStream(error=True), FakeStream()])
+    opened = []
+
+    def open_stream(prompt):
+        opened.append(next(streams))
+        return opened[-1]
+
+    caller = make_caller(max_attempts=2, backoff_base=0)
+    assert list(caller.open_stream(open_stream, PROMPT)) == []
+    assert [s.closed for s in opened] == [True, False]
@@ -0,0 +1,47 @@
+"""
+Ответы маршрутизатора без вызова модели и отказ от быстрого пути, когда ответ не укладывается в схему
+"""
+from typing import Optional
+
+from src.order_store import OrderStore
+from src.router import ANSWER_MAX_LENGTH, FastPathRouter
+
+STYLE = {"templates": {"tone": "да, вежливый деловой тон"}}
+
+
+class DictOrderStore(OrderStore):
+    def __init__(self, orders: dict):
+        self.orders = orders
+
+    def get(self, order_id: str) -> Optional[dict]:
+        return self.orders.get(order_id)
+
+
+def make_router(faq: list, orders: Optional[dict] = None, style: Optional[dict] = None) -> FastPathRouter:
+    return FastPathRouter(lambda: faq, DictOrderStore(orders or {}), lambda: style or STYLE)
+
+
+def test_exact_faq_question_is_answered():
+    router = make_router([{"q": "Сколько идёт доставка?", "a": "2–5 рабочих дней."}])
+    route = router.route("сколько идёт доставка")
+    assert route.intent == "faq"
+    assert route.reply.answer == "2–5 рабочих дней."
+
+
+def test_long_faq_answer_goes_to_llm():
+    router = make_router([{"q": "Как оформить возврат?", "a": "Очень подробно. " * 50}])
+    assert len(router.faq) == 0
+    assert router.route("Как оформить возврат?") is None
+
+
+def test_faq_answer_at_schema_limit_is_answered():
+    answer = "а" * ANSWER_MAX_LENGTH
+    router = make_router([{"q": "Вопрос", "a": answer}])
+    assert router.route("Вопрос").reply.answer == answer
+
+
+def test_order_reply_that_breaks_schema_goes_to_llm():
+    style = {"templates": {"order": {"in_transit": "Заказ {order_id} в пути. " + "x" * 600}}}
+    router = make_router([], {"12345": {"status": "in_transit"}}, style)
+    assert router.route("/order 12345") is None
+    assert router.route("/order 99999").intent == "order"
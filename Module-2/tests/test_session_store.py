@@ -0,0 +1,67 @@
+"""
+Запись шагов в SQLite при конкурентных писателях: ожидание блокировки, повтор и видимая ошибка
+"""
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src.brand_chain import ChatBot
+from src.fake_llm import FakeChatModel
+from src.session_store import SqliteSessionStore, make_turn
+from src.telemetry import Telemetry
+
+
+def hold_write_lock(path, seconds: float) -> threading.Thread:
+    """Держит блокировку записи базы из другого соединения"""
+    locked = threading.Event()
+
+    def hold():
+        conn = sqlite3.connect(path)
+        conn.execute("BEGIN IMMEDIATE")
+        locked.set()
+        time.sleep(seconds)
+        conn.rollback()
+        conn.close()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    locked.wait()
+    return thread
+
+
+def test_append_waits_for_other_writer(tmp_path):
+    path = tmp_path / "sessions.sqlite"
+    store = SqliteSessionStore(path, busy_timeout=0.05)
+    store.append("s", make_turn("первый", {"answer": "a"}))
+
+    holder = hold_write_lock(path, 0.15)
+    store.append("s", make_turn("второй", {"answer": "b"}))
+    holder.join()
+    assert [t["user_input"] for t in store.load("s")] == ["первый", "второй"]
+
+
+def test_append_raises_when_database_stays_locked(tmp_path):
+    path = tmp_path / "sessions.sqlite"
+    store = SqliteSessionStore(path, busy_timeout=0.01)
+
+    holder = hold_write_lock(path, 1.0)
+    with pytest.raises(sqlite3.OperationalError):
+        store.append("s", make_turn("вопрос", {"answer": "a"}))
+    holder.join()
+    assert store.load("s") == []
+
+
+def test_failed_write_is_counted(tmp_path):
+    path = tmp_path / "sessions.sqlite"
+    telemetry = Telemetry()
+    bot = ChatBot(llm=FakeChatModel(latency=0), fast_path=False, coalesce=False, telemetry=telemetry,
+                  session_store=SqliteSessionStore(path, busy_timeout=0.01))
+
+    holder = hold_write_lock(path, 1.0)
+    reply, _ = bot.chat("Сколько идёт доставка?")
+    holder.join()
+    assert reply.answer
+    counters = telemetry.summary()["counters"]
+    assert counters['session_store_errors{error="OperationalError",op="append"}'] == 1
@@ -0,0 +1,82 @@
+"""
+SessionManager: чтение истории не держит общий замок, запись не блокирует event loop,
+сессии с выполняющимся шагом не вытесняются
+"""
+import time
+import asyncio
+import threading
+
+from src.brand_chain import ChatBot
+from src.fake_llm import FakeChatModel
+from src.sessions import SessionManager
+from src.session_store import MemorySessionStore
+from src.telemetry import Telemetry
+
+PROMPT = "Сколько идёт доставка?"
+
+
+class SlowStore(MemorySessionStore):
+    def __init__(self, load_delay: float = 0.0):
+        super().__init__()
+        self.load_delay = load_delay
+        self.append_threads = []
+
+    def load(self, session_id, last_n=None):
+        time.sleep(self.load_delay)
+        return super().load(session_id, last_n)
+
+    def append(self, session_id, turn):
+        self.append_threads.append(threading.current_thread())
+        super().append(session_id, turn)
+
+
+def make_manager(store: SlowStore, latency: float = 0.0, max_sessions: int = 100) -> SessionManager:
+    bot = ChatBot(llm=FakeChatModel(latency=latency), fast_path=False, coalesce=False, telemetry=Telemetry(),
+                  session_store=store)
+    return SessionManager(bot, max_sessions=max_sessions)
+
+
+def test_slow_resume_does_not_block_other_sessions():
+    store = SlowStore()
+    manager = make_manager(store)
+    manager.get("fast")
+    store.load_delay = 0.5
+
+    creating = threading.Thread(target=manager.get, args=("slow",))
+    creating.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    manager.get("fast")
+    assert time.monotonic() - start < 0.2
+    creating.join()
+    assert "slow" in manager
+
+
+def test_async_turn_writes_store_off_the_event_loop():
+    store = SlowStore()
+    manager = make_manager(store)
+
+    async def run():
+        await manager.achat("s1", PROMPT)
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(run())
+    assert len(store.append_threads) == 1
+    assert store.append_threads[0] is not loop_thread
+
+
+def test_session_in_flight_is_not_evicted():
+    manager = make_manager(SlowStore(), latency=0.3, max_sessions=1)
+
+    async def run():
+        turn = asyncio.create_task(manager.achat("busy", PROMPT))
+        await asyncio.sleep(0.1)
+        manager.get("other")
+        assert "busy" in manager
+        await turn
+
+    asyncio.run(run())
+    # Шаг завершён: теперь сессия вытесняется как обычно
+    manager.get("third")
+    assert "busy" not in manager
+    assert manager.peek("busy") is None
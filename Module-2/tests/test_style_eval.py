@@ -0,0 +1,45 @@
+"""
+Ошибка оценки одного ответа не отменяет оценки остальных ответов пакета
+"""
+import pytest
+
+import style_eval
+from src.eval_runner import EvalRunner
+from style_eval import Grade
+
+ANSWERS = ["ответ 1", "плохой ответ", "ответ 3", "ответ 4"]
+
+
+@pytest.fixture
+def runner(monkeypatch) -> EvalRunner:
+    def llm_grade_batch(texts, limiter=None):
+        raise ValueError("невалидный JSON пакета")
+
+    def llm_grade(text, limiter=None):
+        if text == "плохой ответ":
+            raise ValueError("грейдер не ответил")
+        return Grade(score=80, notes=text)
+
+    monkeypatch.setattr(style_eval, "llm_grade_batch", llm_grade_batch)
+    monkeypatch.setattr(style_eval, "llm_grade", llm_grade)
+    return EvalRunner(workers=2, retries=0, progress=None)
+
+
+def test_grade_batch_keeps_sibling_grades(runner):
+    grades = style_eval.grade_batch(ANSWERS, runner)
+    assert [g.notes for g in grades if isinstance(g, Grade)] == ["ответ 1", "ответ 3", "ответ 4"]
+    assert grades[1] == "грейдер не ответил"
+
+
+def test_run_items_marks_only_failed_item(runner, monkeypatch):
+    monkeypatch.setattr(style_eval, "answer_item", lambda p, runner: {"prompt": p, "answer": p, "rule_score": 100})
+    results = style_eval.run_items(ANSWERS, runner, grade_batch_size=4)
+    assert [r.get("error") for r in results] == [None, "грейдер не ответил", None, None]
+    assert [r["llm_score"] for r in results if "error" not in r] == [80, 80, 80]
+
+
+@pytest.mark.parametrize("grade_batch_size", [1, 4])
+def test_grade_answers_reports_error_only_for_failed_answer(runner, grade_batch_size):
+    grades = style_eval.grade_answers(ANSWERS, runner, grade_batch_size)
+    assert grades["плохой ответ"] == "грейдер не ответил"
+    assert all(isinstance(grades[a], Grade) for a in ANSWERS if a != "плохой ответ")